@@ -0,0 +1,36 @@
+"""user verification status
+
+Revision ID: 4c2e8a1f9b3d
+Revises: 7b7f97aa8fc5
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4c2e8a1f9b3d"
+down_revision: Union[str, None] = "7b7f97aa8fc5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+user_verification_status = sa.Enum("PENDING_VERIFICATION", "VERIFIED", "REJECTED", name="userverificationstatus")
+
+
+def upgrade() -> None:
+    user_verification_status.create(op.get_bind(), checkfirst=True)
+    op.add_column(
+        "user",
+        sa.Column("verification_status", user_verification_status, nullable=False, server_default="VERIFIED"),
+    )
+    op.alter_column("user", "verification_status", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("user", "verification_status")
+    user_verification_status.drop(op.get_bind(), checkfirst=True)
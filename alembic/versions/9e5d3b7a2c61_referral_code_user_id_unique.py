@@ -0,0 +1,35 @@
+"""referral code user id unique
+
+Revision ID: 9e5d3b7a2c61
+Revises: 4c2e8a1f9b3d
+Create Date: 2026-10-19 11:03:27.904512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9e5d3b7a2c61"
+down_revision: Union[str, None] = "4c2e8a1f9b3d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep only the latest code of each user before enforcing uniqueness
+    op.execute(
+        sa.text(
+            "DELETE FROM referralcode AS older USING referralcode AS newer "
+            "WHERE older.user_id = newer.user_id "
+            "AND (older.code_expiration, older.id) < (newer.code_expiration, newer.id)"
+        )
+    )
+    op.create_unique_constraint("referralcode_user_id_key", "referralcode", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("referralcode_user_id_key", "referralcode", type_="unique")
@@ -0,0 +1,39 @@
+"""user unverified status
+
+Revision ID: a3f9c6e1d257
+Revises: e5b8d1f3a946
+Create Date: 2026-10-20 09:41:53.216478
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f9c6e1d257"
+down_revision: Union[str, None] = "e5b8d1f3a946"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text("ALTER TYPE userverificationstatus ADD VALUE IF NOT EXISTS 'UNVERIFIED'"))
+
+
+def downgrade() -> None:
+    # postgres cannot drop an enum value, so the type is recreated without it
+    op.execute(
+        sa.text("UPDATE \"user\" SET verification_status = 'PENDING_VERIFICATION' WHERE verification_status = 'UNVERIFIED'")
+    )
+    op.execute(sa.text("ALTER TYPE userverificationstatus RENAME TO userverificationstatus_old"))
+    sa.Enum("PENDING_VERIFICATION", "VERIFIED", "REJECTED", name="userverificationstatus").create(op.get_bind())
+    op.execute(
+        sa.text(
+            'ALTER TABLE "user" ALTER COLUMN verification_status TYPE userverificationstatus '
+            "USING verification_status::text::userverificationstatus"
+        )
+    )
+    op.execute(sa.text("DROP TYPE userverificationstatus_old"))
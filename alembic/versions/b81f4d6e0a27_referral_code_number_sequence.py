@@ -0,0 +1,29 @@
+"""referral code number sequence
+
+Revision ID: b81f4d6e0a27
+Revises: 9e5d3b7a2c61
+Create Date: 2026-10-19 11:48:05.772630
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b81f4d6e0a27"
+down_revision: Union[str, None] = "9e5d3b7a2c61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the increment is the size of a block of numbers reserved by one nextval call,
+    # it must match REFERRAL_CODE_NUMBERS_BLOCK_SIZE in app/models/referral_code.py
+    op.execute(sa.schema.CreateSequence(sa.Sequence("referralcode_number_seq", increment=1000)))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence("referralcode_number_seq")))
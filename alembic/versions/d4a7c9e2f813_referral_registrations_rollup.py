@@ -0,0 +1,47 @@
+"""referral registrations rollup
+
+Revision ID: d4a7c9e2f813
+Revises: b81f4d6e0a27
+Create Date: 2026-10-19 14:21:37.504118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a7c9e2f813"
+down_revision: Union[str, None] = "b81f4d6e0a27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing users have no registration time, they are counted as registered at the time of the migration
+    op.add_column("user", sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+    op.alter_column("user", "created_at", server_default=None)
+    op.create_table(
+        "referralregistrationsrollup",
+        sa.Column("referrer_id", sa.Uuid(), nullable=False),
+        sa.Column("bucket", sa.Date(), nullable=False),
+        sa.Column("registrations_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["referrer_id"],
+            ["user.id"],
+        ),
+        sa.PrimaryKeyConstraint("referrer_id", "bucket"),
+    )
+    op.execute(
+        "INSERT INTO referralregistrationsrollup (referrer_id, bucket, registrations_count) "
+        'SELECT referrer_id, created_at::date, count(*) FROM "user" '
+        'WHERE referrer_id IN (SELECT id FROM "user") '
+        "GROUP BY referrer_id, created_at::date"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("referralregistrationsrollup")
+    op.drop_column("user", "created_at")
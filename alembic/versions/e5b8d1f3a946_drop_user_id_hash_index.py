@@ -0,0 +1,27 @@
+"""drop user id hash index
+
+Revision ID: e5b8d1f3a946
+Revises: d4a7c9e2f813
+Create Date: 2026-10-19 15:02:11.874530
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b8d1f3a946"
+down_revision: Union[str, None] = "d4a7c9e2f813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the primary key btree index already serves lookups by id, the hash index only doubled the write cost
+    op.drop_index("user_id_hash_index", table_name="user", postgresql_using="hash")
+
+
+def downgrade() -> None:
+    op.create_index("user_id_hash_index", "user", ["id"], unique=False, postgresql_using="hash")
@@ -1,13 +1,15 @@
 """модуль маршрутов API.
 
-модуль включает маршруты для работы с пользователями и реферальными кодами
+модуль включает маршруты для работы с пользователями, реферальными кодами, рейтингом рефереров
+и проверки токенов, а также маршруты метрик и проверки состояния приложения
+и открытых ключей проверки подписи jwt-токенов, а также маршруты профилирования запросов
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
 from fastapi import APIRouter
 
-from app.api.routes import referral_code, user
+from app.api.routes import health, leaderboard, metrics, profiler, referral_code, token, user, well_known
 
 api_router = APIRouter()
 
@@ -24,3 +26,45 @@ api_router.include_router(
     prefix="/referral_code",
     tags=["referral code"],
 )
+
+
+api_router.include_router(
+    leaderboard.leaderboard_router,
+    prefix="/leaderboard",
+    tags=["leaderboard"],
+)
+
+
+api_router.include_router(
+    token.token_router,
+    prefix="/token",
+    tags=["token"],
+)
+
+
+api_router.include_router(
+    metrics.metrics_router,
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+
+api_router.include_router(
+    health.health_router,
+    prefix="/health",
+    tags=["health"],
+)
+
+
+api_router.include_router(
+    well_known.well_known_router,
+    prefix="/.well-known",
+    tags=["well-known"],
+)
+
+
+api_router.include_router(
+    profiler.profiler_router,
+    prefix="/profiler",
+    tags=["profiler"],
+)
@@ -0,0 +1,97 @@
+"""модуль маршрутов проверки состояния приложения.
+
+модуль содержит пробы для балансировщика нагрузки и оркестратора: live отвечает, пока процесс обрабатывает запросы,
+а ready - только после прогрева процесса и при доступной базе данных, сообщая задержку базы данных и redis.
+недоступность redis не снимает процесс с балансировки, так как у путей, использующих redis, есть запасной вариант.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from fastapi import APIRouter, Request, Response, status
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import async_database_engine
+from app.core.redis import redis_client
+from app.models.health import HealthCheck
+
+health_router: APIRouter = APIRouter()
+
+
+async def measure_latency(check: Callable[[], Awaitable[object]]) -> float | None:
+    """выполняет проверку зависимости и измеряет ее задержку.
+
+    Args:
+        check (Callable[[], Awaitable[object]]): проверка зависимости
+
+    Returns:
+        float | None: задержка в миллисекундах или None, если зависимость не ответила вовремя или с ошибкой
+
+    """
+    started_at = time.perf_counter()
+
+    try:
+        async with asyncio.timeout(settings.HEALTH_CHECK_TIMEOUT):
+            await check()
+
+    except Exception:  # noqa: BLE001
+        return None
+
+    return round((time.perf_counter() - started_at) * 1000, 3)
+
+
+async def check_database() -> None:
+    """выполняет пустой запрос к базе данных через пул соединений."""
+    async with async_database_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+@health_router.get(
+    "/live",
+    summary="проверить, что процесс жив",
+    include_in_schema=False,
+)
+async def get_liveness() -> HealthCheck:
+    """сообщает, что процесс обрабатывает запросы.
+
+    Returns:
+        HealthCheck: состояние процесса
+
+    """
+    return HealthCheck(status="alive")
+
+
+@health_router.get(
+    "/ready",
+    summary="проверить готовность процесса принимать запросы",
+    include_in_schema=False,
+)
+async def get_readiness(request: Request, response: Response) -> HealthCheck:
+    """сообщает готовность процесса и задержку базы данных и redis.
+
+    Args:
+        request (Request): запрос для чтения признака завершения прогрева из состояния приложения
+        response (Response): ответ для установки кода 503, если процесс не готов
+
+    Returns:
+        HealthCheck: состояние процесса и задержки зависимостей
+
+    """
+    database_latency_ms, redis_latency_ms = await asyncio.gather(
+        measure_latency(check_database),
+        measure_latency(redis_client.ping),
+    )
+
+    if not getattr(request.app.state, "is_warmed_up", False) or database_latency_ms is None:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        health_status = "not_ready"
+    elif redis_latency_ms is None:
+        health_status = "degraded"
+    else:
+        health_status = "ready"
+
+    return HealthCheck(status=health_status, database_latency_ms=database_latency_ms, redis_latency_ms=redis_latency_ms)
@@ -0,0 +1,71 @@
+"""модуль маршрутов рейтинга рефереров.
+
+модуль содержит эндпоинты для постраничного получения рейтинга рефереров и места отдельного пользователя в нем.
+рейтинг читается из отсортированного множества redis без обращения к базе данных.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+
+from app.core.config import settings
+from app.crud.user import get_referrer_rank, get_referrers_leaderboard
+from app.dependences import RedisDependence
+from app.models.user import ReferrerRank
+
+leaderboard_router: APIRouter = APIRouter()
+
+
+@leaderboard_router.get(
+    "",
+    summary="получить рейтинг рефереров",
+    description=f"""
+        возвращает страницу рейтинга рефереров по убыванию количества рефералов.\n
+        страница задается параметрами offset и limit, limit - не более {settings.REFERRERS_LEADERBOARD_PAGE_LIMIT}.
+    """,
+)
+async def get_leaderboard(
+    redis: RedisDependence,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=settings.REFERRERS_LEADERBOARD_PAGE_LIMIT)] = 10,
+) -> list[ReferrerRank]:
+    """возвращает страницу рейтинга рефереров.
+
+    Args:
+        redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis
+        offset (int): количество пропускаемых позиций рейтинга
+        limit (int): количество позиций на странице
+
+    Returns:
+        list[ReferrerRank]: рефереры страницы с количеством рефералов и местом в рейтинге
+
+    """
+    return await get_referrers_leaderboard(offset, limit, redis)
+
+
+@leaderboard_router.get(
+    "/{user_id}",
+    summary="получить место пользователя в рейтинге рефереров",
+    description="""
+        возвращает количество рефералов пользователя и его место в рейтинге рефереров.\n
+        если у пользователя нет рефералов, возвращается 404.
+    """,
+)
+async def get_leaderboard_rank(
+    user_id: UUID,
+    redis: RedisDependence,
+) -> ReferrerRank:
+    """возвращает место пользователя в рейтинге рефереров.
+
+    Args:
+        user_id (UUID): идентификатор пользователя
+        redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis
+
+    Returns:
+        ReferrerRank: количество рефералов и место в рейтинге
+
+    """
+    return await get_referrer_rank(user_id, redis)
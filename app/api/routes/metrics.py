@@ -0,0 +1,29 @@
+"""модуль маршрута метрик.
+
+модуль содержит эндпоинт с метриками приложения в текстовом формате prometheus.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_metrics
+
+metrics_router: APIRouter = APIRouter()
+
+
+@metrics_router.get(
+    "",
+    summary="получить метрики приложения",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+async def get_metrics() -> str:
+    """возвращает метрики приложения в текстовом формате prometheus.
+
+    Returns:
+        str: метрики приложения
+
+    """
+    return await render_metrics()
@@ -0,0 +1,84 @@
+"""модуль маршрутов профилирования запросов.
+
+модуль содержит эндпоинты для доверенных сервисов: отметка пути для профилирования следующего запроса к нему,
+список сохраненных профилей и выдача профиля в формате speedscope.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.core.profiling import PROFILE_FILE_SUFFIX, request_profiler
+from app.dependences import ServiceKeyDependence
+from app.models.profiling import ProfilerArmedPath
+
+profiler_router: APIRouter = APIRouter()
+
+
+@profiler_router.post(
+    "/armed_paths",
+    summary="профилировать следующий запрос к пути",
+    description="""
+        следующий запрос к указанному пути, принятый этим процессом, будет профилирован,
+        а идентификатор профиля вернется в заголовке ответа x-profile-id.
+        эндпоинт доступен только доверенным сервисам с заголовком x-service-key.
+    """,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def arm_path(armed_path: ProfilerArmedPath, _: ServiceKeyDependence) -> None:
+    """отмечает путь для профилирования следующего запроса к нему.
+
+    Args:
+        armed_path (ProfilerArmedPath): путь запроса
+        _ (ServiceKeyDependence): зависимость, проверяющая ключ доверенного сервиса
+
+    """
+    request_profiler.armed_paths.add(armed_path.path)
+
+
+@profiler_router.get(
+    "/profiles",
+    summary="получить идентификаторы сохраненных профилей",
+)
+async def get_profiles(_: ServiceKeyDependence) -> list[str]:
+    """возвращает идентификаторы сохраненных профилей от новых к старым.
+
+    Args:
+        _ (ServiceKeyDependence): зависимость, проверяющая ключ доверенного сервиса
+
+    Returns:
+        list[str]: идентификаторы профилей
+
+    """
+    return [profile_path.name.removesuffix(PROFILE_FILE_SUFFIX) for profile_path in request_profiler.list_profiles()]
+
+
+@profiler_router.get(
+    "/profiles/{profile_id}",
+    summary="получить профиль запроса",
+    description="возвращает профиль в формате speedscope, который открывается как flamegraph на https://www.speedscope.app",
+    response_class=FileResponse,
+)
+async def get_profile(profile_id: UUID, _: ServiceKeyDependence) -> FileResponse:
+    """возвращает файл профиля.
+
+    Args:
+        profile_id (UUID): идентификатор профиля из заголовка x-profile-id
+        _ (ServiceKeyDependence): зависимость, проверяющая ключ доверенного сервиса
+
+    Returns:
+        FileResponse: профиль в формате speedscope
+
+    Raises:
+        HTTPException: если профиль не найден (404 not found)
+
+    """
+    profile_path = request_profiler.profile_path(profile_id)
+
+    if not profile_path.is_file():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "профиль не найден")
+
+    return FileResponse(profile_path, media_type="application/json", filename=profile_path.name)
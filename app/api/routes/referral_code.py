@@ -1,13 +1,17 @@
 """модуль маршрутов реферальных кодов.
 
-модуль содержит эндпоинты для создания реферальных кодов и получения реферального кода пользователя по его email.
+модуль содержит эндпоинты для создания реферальных кодов и получения реферальных кодов пользователей по их email.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
-from fastapi import APIRouter
+from typing import Annotated
 
-from app.crud.referral_code import create_referral_code, delete_referral_code
+from fastapi import APIRouter, Query, Response
+from pydantic import EmailStr
+
+from app.core.config import settings
+from app.crud.referral_code import create_referral_code, delete_referral_code, get_referral_codes_by_emails
 from app.dependences import AsyncDatabaseSessionDependence, CurrentAuthenticatedUserDependence, RedisDependence
 from app.models.referral_code import ReferralCode, ReferralCodeByEmail, ReferralCodeCreate
 from app.models.user import UserEmail
@@ -93,11 +97,13 @@ async def delete_code(
 )
 async def get_user_referral_code_by_referral_email(
     user_email: UserEmail,
+    database_session: AsyncDatabaseSessionDependence,
     redis: RedisDependence,
 ) -> ReferralCodeByEmail:
     """получает реферальный код пользователя по его email.
 
-    ищет в redis реферальный код, связанный с переданным email пользователя.
+    ищет в redis реферальный код, связанный с переданным email пользователя,
+    а при недоступности redis - в базе данных.
     так как эндпоинт открыт для неаутентифицированных пользователей,
     его реализация не возвращает никакой избыточной информации
     (например, если пользователь в системе не зарегистриван,
@@ -105,15 +111,58 @@ async def get_user_referral_code_by_referral_email(
 
     Args:
         user_email (UserEmail): email пользователя, для которого нужно получить реферальный код
+        database_session (AsyncDatabaseSessionDependence): зависимость, обеспечивающая асинхронную сессию
+            с базой данных на случай недоступности redis
         redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis
 
     Returns:
         UserReferralCode: объект, содержащий email пользователя и его реферальный код
 
     """
-    code = await redis.get(f"referrer:{user_email.email}")
+    [code] = await get_referral_codes_by_emails([user_email.email], database_session, redis)
 
     return ReferralCodeByEmail(
         email=user_email.email,
         referral_code=code,
     )
+
+
+@referrral_code_router.get(
+    "/get_users_referral_codes",
+    summary="получить реферальные коды нескольких пользователей",
+    description=f"""
+        получает реферальные коды пользователей по списку email.\n
+        email передаются повторяющимся параметром запроса emails, не более {settings.REFERRAL_CODES_LOOKUP_BATCH_LIMIT} за раз.
+        эндпоинт открыт для неаутентифицированных пользователей и, как и поиск по одному email,
+        не различает незарегистрированных пользователей и пользователей без активного кода.
+        ответ можно кэшировать в течение {settings.REFERRAL_CODES_LOOKUP_CACHE_MAX_AGE} секунд
+    """,
+)
+async def get_users_referral_codes_by_referrals_emails(
+    emails: Annotated[list[EmailStr], Query(min_length=1, max_length=settings.REFERRAL_CODES_LOOKUP_BATCH_LIMIT)],
+    database_session: AsyncDatabaseSessionDependence,
+    redis: RedisDependence,
+    response: Response,
+) -> list[ReferralCodeByEmail]:
+    """получает реферальные коды пользователей по их email.
+
+    все коды читаются из redis одной командой mget, а при недоступности redis - одним запросом к базе данных.
+    повторяющиеся email учитываются один раз
+
+    Args:
+        emails (list[EmailStr]): email пользователей, для которых нужно получить реферальные коды
+        database_session (AsyncDatabaseSessionDependence): зависимость, обеспечивающая асинхронную сессию
+            с базой данных на случай недоступности redis
+        redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis
+        response (Response): ответ для установки заголовков кэширования
+
+    Returns:
+        list[ReferralCodeByEmail]: email пользователей и их реферальные коды в порядке запроса
+
+    """
+    unique_emails = list(dict.fromkeys(emails))
+    codes = await get_referral_codes_by_emails(unique_emails, database_session, redis)
+
+    response.headers["Cache-Control"] = f"public, max-age={settings.REFERRAL_CODES_LOOKUP_CACHE_MAX_AGE}"
+
+    return [ReferralCodeByEmail(email=email, referral_code=code) for email, code in zip(unique_emails, codes, strict=True)]
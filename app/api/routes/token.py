@@ -0,0 +1,51 @@
+"""модуль маршрутов для проверки токенов.
+
+модуль содержит эндпоинт пакетной проверки jwt-токенов для api-шлюзов и других доверенных сервисов.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Body
+
+from app.core.config import settings
+from app.core.security import introspect_jwts
+from app.dependences import RedisDependence, ServiceKeyDependence
+from app.models.jwt import TokenIntrospection, TokenIntrospectionRequest
+
+token_router: APIRouter = APIRouter()
+
+
+@token_router.post(
+    "/introspect",
+    summary="проверить пачку jwt-токенов",
+    description=f"""
+        проверяет до {settings.TOKENS_INTROSPECTION_BATCH_LIMIT} jwt-токенов за один запрос
+        по тем же правилам, что и защищенные эндпоинты: подпись, тип, срок действия, user-agent и отзыв.\n
+        для каждого токена передается user-agent клиента, предъявившего его шлюзу.
+        эндпоинт доступен только доверенным сервисам с заголовком x-service-key
+        и не обращается к базе данных.
+    """,
+)
+async def introspect_tokens(
+    tokens: Annotated[
+        list[TokenIntrospectionRequest],
+        Body(min_length=1, max_length=settings.TOKENS_INTROSPECTION_BATCH_LIMIT),
+    ],
+    _: ServiceKeyDependence,
+    redis: RedisDependence,
+) -> list[TokenIntrospection]:
+    """проверяет пачку jwt-токенов.
+
+    Args:
+        tokens (list[TokenIntrospectionRequest]): токены с ожидаемым типом и user-agent клиента
+        _ (ServiceKeyDependence): зависимость, проверяющая ключ доверенного сервиса
+        redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis
+            для проверки отзыва токенов одной командой mget
+
+    Returns:
+        list[TokenIntrospection]: признак активности и владелец каждого токена в порядке запроса
+
+    """
+    return await introspect_jwts(tokens, redis)
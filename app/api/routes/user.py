@@ -1,17 +1,41 @@
 """модуль маршрутов для пользователей.
 
-модуль содержит эндпоинты для регистрации, авторизации, получения реферальных кодов и управления токенами пользователей.
+модуль содержит эндпоинты для регистрации, авторизации, получения реферальных кодов, рефералов, истории их регистраций
+и потока событий о новых рефералах, а также управления токенами пользователей.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
-from fastapi import APIRouter, HTTPException, Request
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncGenerator
+from datetime import date
 
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.redis import revoked_token_key
+from app.core.referrals_events import referrals_events_hub
 from app.core.security import TokenType, create_jwt, verify_jwt
-from app.core.utils import get_available_verifications_count
-from app.crud.user import authenticate_user, create_user, get_user_refferals
-from app.dependences import AsyncDatabaseSessionDependence, CurrentAuthenticatedUserDependence, RedisDependence
+from app.core.utils import ClosingStreamingResponse, get_available_verifications_count
+from app.crud.user import (
+    authenticate_user,
+    create_user,
+    get_referral_registrations_history,
+    get_referrals_version,
+    get_user_by_id,
+    get_user_refferals,
+)
+from app.dependences import (
+    AsyncDatabaseSessionDependence,
+    CurrentAuthenticatedUserDependence,
+    CurrentTokenPayloadDependence,
+    RedisDependence,
+)
 from app.models.jwt import JWTsPair
+from app.models.referral_analytics import ReferralRegistrationsBucket, ReferralsAnalyticsGranularity
 from app.models.user import LoginUser, RefreshLoginUser, RegisterUser, UserReferrals, UserRegistrationsAvailableCount, UserView
 
 user_router: APIRouter = APIRouter()
@@ -48,11 +72,14 @@ async def get_registrations_available_count() -> UserRegistrationsAvailableCount
         для этого нужно указать email, пароль и (необязательно) реферальный код реферала.
         если реферальный код не используется для регистрации, поле нужно заполнить значение null без ковычек.
         регистрация доступна даже аутентифицированным пользователям.
+        в асинхронном режиме проверки email пользователь создается в статусе pending_verification
+        и сможет войти в систему только после успешной проверки.
     """,
 )
 async def register_user(
     user: RegisterUser,
     database_session: AsyncDatabaseSessionDependence,
+    redis: RedisDependence,
 ) -> UserView:
     """регистрирует нового пользователя и возвращает информацию о созданном пользователя в случае успеха.
 
@@ -60,12 +87,14 @@ async def register_user(
         user (RegisterUser): объект с информацией для регистрации (email, password, referral_code (опционально))
         database_session (AsyncDatabaseSessionDependence): зависимость, обеспечивающая наличие активной сессии с базой данных
             для сохранения нового пользователя
+        redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis
+            для постановки email в очередь на проверку
 
     Returns:
         UserView: объект с информацией о зарегистрированном пользователе
 
     """
-    return await create_user(user, database_session)
+    return await create_user(user, database_session, redis)
 
 
 @user_router.post(
@@ -135,7 +164,7 @@ async def refresh_login_user(
         JWTsPair: пару токенов jwt (доступа и обновления)
 
     """
-    redis_key = f"revoked:{token.refresh_token}"
+    redis_key = revoked_token_key(token.refresh_token.removeprefix("bearer jwt "))
 
     jwt_payload = await verify_jwt(token.refresh_token, TokenType.REFRESH, request, redis)
 
@@ -168,7 +197,7 @@ async def logout_user(
         HTTPException: возвращает 200 с сообщением об успешном выходе из системы
 
     """
-    redis_key = f"revoked:{request.headers.get('authorization')}"
+    redis_key = revoked_token_key(request.headers.get("authorization").removeprefix("bearer jwt "))
     await redis.setex(redis_key, 60 * 60, request.headers.get("authorization"))
 
     raise HTTPException(200, detail="выход из системы, токен авторизации аннулирован")
@@ -179,21 +208,143 @@ async def logout_user(
     summary="получить информацию о пользователе и список его рефералов",
     description="""
         возвращает информацию о пользователе и  список рефералов.\n
-        для этого пользователь должен быть авторизован
+        для этого пользователь должен быть авторизован.
+        ответ содержит заголовок ETag с версией списка: при повторном запросе с If-None-Match
+        и неизменившимся списком возвращается 304 без загрузки рефералов
     """,
 )
 async def get_user_referrals(
-    user: CurrentAuthenticatedUserDependence,
+    token_payload: CurrentTokenPayloadDependence,
     database_session: AsyncDatabaseSessionDependence,
+    redis: RedisDependence,
+    request: Request,
+    response: Response,
 ) -> UserReferrals:
     """возвращает информацию о пользователе и  список рефералов.
 
+    версия списка читается до загрузки данных, поэтому изменение, зафиксированное во время загрузки,
+    в худшем случае приведет к лишней полной загрузке, но не к устаревшему ответу 304
+
     Args:
-        user (CurrentAuthenticatedUserDependence): зависимость, обеспечивающая наличие авторизованного пользователя
+        token_payload (CurrentTokenPayloadDependence): зависимость, обеспечивающая проверку токена доступа
         database_session (AsyncDatabaseSessionDependence): зависимость, обеспечивающая наличие активной сессии с базой данных
+        redis (RedisDependence): зависимость, обеспечивающая активное подключение к redis для чтения версии списка
+        request (Request): объект запроса для чтения заголовка If-None-Match
+        response (Response): ответ для установки заголовков ETag и Cache-Control
 
     Returns:
         UserReferrals: информация о пользователе и список рефералов
 
     """
+    referrals_version = await get_referrals_version(token_payload.token_subject, redis)
+
+    if referrals_version:
+        etag = f'"{referrals_version}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag in (tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+
+    user = await get_user_by_id(token_payload.token_subject, database_session)
+
     return await get_user_refferals(user, database_session)
+
+
+@user_router.get(
+    "/referrals/analytics",
+    summary="получить историю регистраций рефералов",
+    description=f"""
+        возвращает количество регистраций рефералов пользователя по дням или неделям за период.\n
+        период задается датами date_from и date_to включительно и не может быть длиннее
+        {settings.REFERRALS_ANALYTICS_MAX_TIMEDELTA.days} дней, неделя обозначается ее понедельником.
+        периоды без регистраций не возвращаются.
+        для этого пользователь должен быть авторизован
+    """,
+)
+async def get_user_referrals_analytics(
+    token_payload: CurrentTokenPayloadDependence,
+    database_session: AsyncDatabaseSessionDependence,
+    date_from: date,
+    date_to: date,
+    granularity: ReferralsAnalyticsGranularity = ReferralsAnalyticsGranularity.DAY,
+) -> list[ReferralRegistrationsBucket]:
+    """возвращает историю регистраций рефералов пользователя.
+
+    Args:
+        token_payload (CurrentTokenPayloadDependence): зависимость, обеспечивающая проверку токена доступа
+        database_session (AsyncDatabaseSessionDependence): зависимость, обеспечивающая наличие активной сессии с базой данных
+        date_from (date): первый день периода
+        date_to (date): последний день периода включительно
+        granularity (ReferralsAnalyticsGranularity): группировка по дням или неделям
+
+    Returns:
+        list[ReferralRegistrationsBucket]: количество регистраций рефералов по периодам
+
+    """
+    return await get_referral_registrations_history(
+        token_payload.token_subject,
+        date_from,
+        date_to,
+        granularity,
+        database_session,
+    )
+
+
+@user_router.get(
+    "/referrals/events",
+    summary="подписаться на события о новых рефералах",
+    description=f"""
+        открывает поток server-sent events, в который приходит событие referral
+        с информацией о каждом реферале, зарегистрированном по коду пользователя.\n
+        при отсутствии событий каждые {settings.REFERRALS_EVENTS_HEARTBEAT_INTERVAL:g} секунд отправляется комментарий,
+        чтобы прокси не закрывали соединение. поток закрывается при истечении токена доступа,
+        после чего клиент должен переподключиться с новым токеном, а также при остановке процесса сервера.
+        доставка не гарантирована: после переподключения список рефералов нужно перечитать через /user/referrals.
+        для этого пользователь должен быть авторизован
+    """,
+    response_class=StreamingResponse,
+)
+async def get_user_referrals_events(token_payload: CurrentTokenPayloadDependence) -> StreamingResponse:
+    """открывает поток событий о новых рефералах пользователя.
+
+    Args:
+        token_payload (CurrentTokenPayloadDependence): зависимость, обеспечивающая проверку токена доступа
+
+    Returns:
+        StreamingResponse: поток server-sent events
+
+    """
+
+    async def stream_referrals_events(referrals_events: asyncio.Queue[bytes]) -> AsyncGenerator[str]:
+        yield f"retry: {int(settings.REFERRALS_EVENTS_HEARTBEAT_INTERVAL * 1000)}\n\n"
+
+        while (time_to_expiration := token_payload.exp - time.time()) > 0:
+            try:
+                referral = await asyncio.wait_for(
+                    referrals_events.get(),
+                    min(settings.REFERRALS_EVENTS_HEARTBEAT_INTERVAL, time_to_expiration),
+                )
+
+            except TimeoutError:
+                yield ": heartbeat\n\n"
+
+                continue
+
+            except asyncio.QueueShutDown:
+                # процесс останавливается, клиент переподключится к другому процессу
+                return
+
+            yield f"event: referral\ndata: {referral.decode()}\n\n"
+
+    # подписка живет не в генераторе, а в ответе, который закрывает ее при любом завершении потока
+    subscription = contextlib.AsyncExitStack()
+    referrals_events = await subscription.enter_async_context(referrals_events_hub.subscribe(token_payload.token_subject))
+
+    return ClosingStreamingResponse(
+        stream_referrals_events(referrals_events),
+        subscription,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,35 @@
+"""модуль маршрутов /.well-known.
+
+модуль содержит эндпоинт с открытыми ключами проверки подписи jwt-токенов в формате jwks,
+по которому другие сервисы проверяют токены локально, без обращения к api.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from fastapi import APIRouter, Response
+
+from app.core.config import settings
+from app.core.signing_keys import get_signing_keyring
+
+well_known_router: APIRouter = APIRouter()
+
+
+@well_known_router.get(
+    "/jwks.json",
+    summary="получить открытые ключи проверки подписи jwt-токенов",
+    response_class=Response,
+)
+async def get_jwks() -> Response:
+    """возвращает открытые ключи проверки подписи jwt-токенов в формате jwks.
+
+    набор ключей сериализуется один раз при загрузке и кэшируется клиентами на JWKS_CACHE_MAX_AGE секунд
+
+    Returns:
+        Response: набор открытых ключей
+
+    """
+    return Response(
+        content=get_signing_keyring().jwks,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}"},
+    )
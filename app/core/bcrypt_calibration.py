@@ -0,0 +1,95 @@
+"""модуль подбора стоимости bcrypt под оборудование.
+
+каждое увеличение стоимости bcrypt на единицу удваивает время хеширования, а значит и задержку входа.
+команда замеряет медианное время хеширования на текущем хосте для возрастающей стоимости
+и выбирает наибольшую стоимость, которая укладывается в BCRYPT_CALIBRATION_TARGET_TIMEDELTA.
+найденное значение нужно записать в BCRYPT_ROUNDS: хеши с прежней стоимостью
+будут пересчитаны при следующем входе пользователей.
+
+запуск: python -m app.core.bcrypt_calibration --samples 5
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+import bcrypt
+
+from app.core.config import settings
+
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 31
+
+
+def measure_bcrypt_rounds(rounds: int, samples: int) -> float:
+    """замеряет медианное время хеширования пароля bcrypt.
+
+    Args:
+        rounds (int): стоимость bcrypt
+        samples (int): количество замеров
+
+    Returns:
+        float: медианное время хеширования в секундах
+
+    """
+    salt = bcrypt.gensalt(rounds)
+    durations: list[float] = []
+
+    for _ in range(samples):
+        started_at = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", salt)
+        durations.append(time.perf_counter() - started_at)
+
+    return statistics.median(durations)
+
+
+def calibrate_bcrypt_rounds(target: timedelta, samples: int) -> tuple[int, dict[int, float]]:
+    """подбирает наибольшую стоимость bcrypt, время хеширования которой не превышает целевое.
+
+    замеры прекращаются на первой стоимости, превысившей целевое время, так как следующие будут еще медленнее
+
+    Args:
+        target (timedelta): целевое время хеширования пароля
+        samples (int): количество замеров каждой стоимости
+
+    Returns:
+        tuple[int, dict[int, float]]: подобранная стоимость и медианное время хеширования по стоимостям
+
+    """
+    durations: dict[int, float] = {}
+    calibrated_rounds = BCRYPT_MIN_ROUNDS
+
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        durations[rounds] = measure_bcrypt_rounds(rounds, samples)
+
+        if durations[rounds] > target.total_seconds():
+            break
+
+        calibrated_rounds = rounds
+
+    return calibrated_rounds, durations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=settings.BCRYPT_CALIBRATION_TARGET_TIMEDELTA.total_seconds() * 1000,
+    )
+    parser.add_argument("--samples", type=int, default=5)
+    arguments = parser.parse_args()
+
+    calibrated_rounds, durations = calibrate_bcrypt_rounds(
+        timedelta(milliseconds=arguments.target_ms),
+        arguments.samples,
+    )
+
+    for rounds, duration in durations.items():
+        print(f"rounds {rounds}: {duration * 1000:,.1f} ms")  # noqa: T201
+
+    print(f"current BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}")  # noqa: T201
+    print(f"BCRYPT_ROUNDS={calibrated_rounds}")  # noqa: T201
@@ -0,0 +1,170 @@
+"""модуль предохранителя (circuit breaker) для вызовов внешних зависимостей.
+
+предохранитель считает подряд идущие ошибки и таймауты вызовов и после заданного порога размыкается:
+вызовы сразу отклоняются, не дожидаясь таймаута сокета, и вызывающий код переходит на запасной путь.
+по истечении времени восстановления предохранитель пропускает ограниченное число пробных вызовов
+и замыкается после успешного пробного вызова или снова размыкается после неудачного.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from enum import StrEnum
+
+from app.core.metrics import MetricSample, register_metrics_collector
+
+
+class CircuitBreakerState(StrEnum):
+    """перечисление состояний предохранителя."""
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+class CircuitBreakerOpenError(Exception):
+    """вызов отклонен разомкнутым предохранителем."""
+
+
+class CircuitBreaker:
+    """предохранитель для вызовов внешней зависимости."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_timedelta: timedelta,
+        half_open_max_calls: int,
+        call_timeout: float,
+        failure_exceptions: tuple[type[BaseException], ...],
+    ) -> None:
+        """инициализирует предохранитель.
+
+        Args:
+            name (str): имя зависимости для метрик
+            failure_threshold (int): количество ошибок подряд, после которого предохранитель размыкается
+            recovery_timedelta (timedelta): время, через которое разомкнутый предохранитель пропускает пробные вызовы
+            half_open_max_calls (int): количество одновременных пробных вызовов
+            call_timeout (float): таймаут одного вызова в секундах, превышение считается ошибкой
+            failure_exceptions (tuple[type[BaseException], ...]): исключения, которые считаются ошибкой зависимости
+
+        """
+        self.name: str = name
+        self.failure_threshold: int = failure_threshold
+        self.recovery_timedelta: timedelta = recovery_timedelta
+        self.half_open_max_calls: int = half_open_max_calls
+        self.call_timeout: float = call_timeout
+        self.failure_exceptions: tuple[type[BaseException], ...] = (*failure_exceptions, TimeoutError)
+
+        self._state: CircuitBreakerState = CircuitBreakerState.CLOSED
+        self._consecutive_failures: int = 0
+        self._opened_at: float = 0.0
+        self._half_open_calls: int = 0
+        self.calls_count: dict[str, int] = {"success": 0, "failure": 0, "rejected": 0}
+
+        circuit_breakers.append(self)
+
+    @property
+    def state(self) -> CircuitBreakerState:
+        """возвращает текущее состояние предохранителя с учетом истечения времени восстановления."""
+        if (
+            self._state == CircuitBreakerState.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timedelta.total_seconds()
+        ):
+            self._state = CircuitBreakerState.HALF_OPEN
+            self._half_open_calls = 0
+
+        return self._state
+
+    def _open(self) -> None:
+        self._state = CircuitBreakerState.OPEN
+        self._opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """выполняет вызов зависимости под защитой предохранителя.
+
+        Yields:
+            None: управление блоку с вызовом зависимости
+
+        Raises:
+            CircuitBreakerOpenError: если предохранитель разомкнут или пробные вызовы уже выполняются
+
+        """
+        state = self.state
+        is_probe = state == CircuitBreakerState.HALF_OPEN
+
+        if state == CircuitBreakerState.OPEN or (is_probe and self._half_open_calls >= self.half_open_max_calls):
+            self.calls_count["rejected"] += 1
+            raise CircuitBreakerOpenError(self.name)
+
+        if is_probe:
+            self._half_open_calls += 1
+
+        try:
+            async with asyncio.timeout(self.call_timeout):
+                yield
+
+        except self.failure_exceptions:
+            self.calls_count["failure"] += 1
+            self._consecutive_failures += 1
+
+            if is_probe or self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+            raise
+
+        else:
+            self.calls_count["success"] += 1
+            self._consecutive_failures = 0
+
+            if is_probe:
+                self._state = CircuitBreakerState.CLOSED
+
+        finally:
+            if is_probe:
+                self._half_open_calls -= 1
+
+
+circuit_breakers: list[CircuitBreaker] = []
+
+
+@register_metrics_collector
+async def collect_circuit_breakers_metrics() -> list[MetricSample]:
+    """собирает метрики состояния и вызовов всех предохранителей.
+
+    Returns:
+        list[MetricSample]: значения метрик
+
+    """
+    samples: list[MetricSample] = []
+
+    for circuit_breaker in circuit_breakers:
+        current_state = circuit_breaker.state
+
+        samples.extend(
+            MetricSample(
+                "circuit_breaker_state",
+                "gauge",
+                "текущее состояние предохранителя (1 - активное состояние)",
+                {"name": circuit_breaker.name, "state": state},
+                float(state == current_state),
+            )
+            for state in CircuitBreakerState
+        )
+        samples.extend(
+            MetricSample(
+                "circuit_breaker_calls_total",
+                "counter",
+                "количество вызовов через предохранитель по результату",
+                {"name": circuit_breaker.name, "result": result},
+                float(count),
+            )
+            for result, count in circuit_breaker.calls_count.items()
+        )
+
+    return samples
@@ -0,0 +1,221 @@
+"""модуль адаптивного ограничения одновременных запросов.
+
+процесс одновременно обрабатывает не больше limit запросов, а limit подстраивается по времени ответа (aimd):
+каждый путь хранит сглаженное обычное время ответа, и если запрос выполнялся дольше него
+в CONCURRENCY_LIMIT_LATENCY_TOLERANCE раз или завершился ошибкой сервера, limit умножается
+на CONCURRENCY_LIMIT_BACKOFF_RATIO (не чаще раза за время такого запроса), а иначе, пока процесс
+загружен хотя бы наполовину, limit растет примерно на единицу за каждые limit запросов.
+
+пути получают приоритет из CONCURRENCY_LIMIT_ROUTE_PRIORITIES, а приоритет - долю limit
+из CONCURRENCY_LIMIT_PRIORITY_SHARES, которую могут занять его запросы. поэтому при перегрузке
+первыми отклоняются запросы с низким приоритетом (регистрация), а вход и поиск реферальных кодов
+продолжают обслуживаться. запросы сверх доли не ждут в очереди, а сразу получают ответ 503.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import json
+import time
+
+from fastapi import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import RequestPriority, settings
+from app.core.metrics import MetricSample, register_metrics_collector
+
+
+class AdaptiveConcurrencyLimit:
+    """адаптивный лимит одновременных запросов процесса."""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        backoff_ratio: float,
+        latency_tolerance: float,
+        baseline_smoothing: float,
+    ) -> None:
+        """инициализирует лимит.
+
+        Args:
+            initial_limit (int): начальный лимит
+            min_limit (int): минимальный лимит
+            max_limit (int): максимальный лимит
+            backoff_ratio (float): множитель уменьшения лимита при перегрузке
+            latency_tolerance (float): во сколько раз время ответа может превышать обычное без уменьшения лимита
+            baseline_smoothing (float): вес нового замера в сглаженном обычном времени ответа пути
+
+        """
+        self.limit: float = initial_limit
+        self.min_limit: int = min_limit
+        self.max_limit: int = max_limit
+        self.backoff_ratio: float = backoff_ratio
+        self.latency_tolerance: float = latency_tolerance
+        self.baseline_smoothing: float = baseline_smoothing
+
+        self.in_flight: int = 0
+        self.shed_count: dict[RequestPriority, int] = dict.fromkeys(RequestPriority, 0)
+
+        self._baseline_latencies: dict[str, float] = {}
+        self._last_decreased_at: float = float("-inf")
+
+    def try_acquire(self, priority: RequestPriority) -> bool:
+        """занимает место для запроса, если запросы его приоритета не превысили свою долю лимита.
+
+        Args:
+            priority (RequestPriority): приоритет запроса
+
+        Returns:
+            bool: True, если запрос можно обрабатывать, иначе False
+
+        """
+        if self.in_flight >= max(self.limit * settings.CONCURRENCY_LIMIT_PRIORITY_SHARES[priority], 1):
+            self.shed_count[priority] += 1
+
+            return False
+
+        self.in_flight += 1
+
+        return True
+
+    def release(self, path: str, latency: float, *, is_failed: bool) -> None:
+        """освобождает место запроса и пересчитывает лимит по времени его обработки.
+
+        Args:
+            path (str): шаблон пути маршрута запроса
+            latency (float): время обработки запроса в секундах
+            is_failed (bool): запрос завершился ошибкой сервера или не завершился
+
+        """
+        in_flight = self.in_flight
+        self.in_flight -= 1
+
+        baseline_latency = self._baseline_latencies.setdefault(path, latency)
+        self._baseline_latencies[path] += (latency - baseline_latency) * self.baseline_smoothing
+        now = time.monotonic()
+
+        if is_failed or latency > baseline_latency * self.latency_tolerance:
+            if now - self._last_decreased_at >= latency:
+                self.limit = max(self.limit * self.backoff_ratio, self.min_limit)
+                self._last_decreased_at = now
+
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+
+
+concurrency_limit = AdaptiveConcurrencyLimit(
+    initial_limit=settings.CONCURRENCY_LIMIT_INITIAL,
+    min_limit=settings.CONCURRENCY_LIMIT_MIN,
+    max_limit=settings.CONCURRENCY_LIMIT_MAX,
+    backoff_ratio=settings.CONCURRENCY_LIMIT_BACKOFF_RATIO,
+    latency_tolerance=settings.CONCURRENCY_LIMIT_LATENCY_TOLERANCE,
+    baseline_smoothing=settings.CONCURRENCY_LIMIT_BASELINE_SMOOTHING,
+)
+
+
+class ConcurrencyLimitMiddleware:
+    """промежуточный слой asgi, отклоняющий запросы сверх адаптивного лимита процесса."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """оборачивает приложение.
+
+        Args:
+            app (ASGIApp): приложение asgi
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """обрабатывает запрос, если для него есть место, иначе отвечает 503.
+
+        Args:
+            scope (Scope): параметры соединения
+            receive (Receive): получение сообщений клиента
+            send (Send): отправка сообщений клиенту
+
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+
+            return
+
+        path = scope["path"]
+        priority = settings.CONCURRENCY_LIMIT_ROUTE_PRIORITIES.get(path, RequestPriority.NORMAL)
+
+        if priority == RequestPriority.EXEMPT:
+            await self.app(scope, receive, send)
+
+            return
+
+        if not concurrency_limit.try_acquire(priority):
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": json.dumps({"detail": "сервер перегружен, попробуйте позже"}, ensure_ascii=False).encode(),
+            })
+
+            return
+
+        response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_status_tracking(message: Message) -> None:
+            nonlocal response_status
+
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+
+            await send(message)
+
+        started_at = time.monotonic()
+
+        try:
+            await self.app(scope, receive, send_with_status_tracking)
+
+        finally:
+            concurrency_limit.release(
+                # шаблон пути найденного маршрута, чтобы пути с параметрами не плодили отдельные замеры
+                getattr(scope.get("route"), "path", ""),
+                time.monotonic() - started_at,
+                is_failed=response_status >= status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+@register_metrics_collector
+async def collect_concurrency_limit_metrics() -> list[MetricSample]:
+    """собирает метрики адаптивного лимита одновременных запросов.
+
+    Returns:
+        list[MetricSample]: значения метрик
+
+    """
+    return [
+        MetricSample(
+            "concurrency_limit",
+            "gauge",
+            "текущий лимит одновременных запросов процесса",
+            {},
+            concurrency_limit.limit,
+        ),
+        MetricSample(
+            "concurrency_limit_in_flight",
+            "gauge",
+            "количество обрабатываемых запросов",
+            {},
+            float(concurrency_limit.in_flight),
+        ),
+        *(
+            MetricSample(
+                "concurrency_limit_shed_total",
+                "counter",
+                "количество запросов, отклоненных из-за лимита, по приоритету",
+                {"priority": priority},
+                float(count),
+            )
+            for priority, count in concurrency_limit.shed_count.items()
+        ),
+    ]
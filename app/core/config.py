@@ -6,12 +6,84 @@ copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
 from datetime import timedelta
+from enum import StrEnum
+from pathlib import Path
 
 from pydantic import PostgresDsn, computed_field
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class EmailVerificationMode(StrEnum):
+    """перечисление режимов верификации email при регистрации.
+
+    sync - email проверяется во время запроса на регистрацию,
+    async - пользователь создается в статусе ожидания, а проверка выполняется воркером
+    """
+
+    SYNC = "sync"
+    ASYNC = "async"
+
+
+class RevokedTokensFallbackPolicy(StrEnum):
+    """перечисление политик проверки отзыва токенов при недоступности redis.
+
+    allow - токен считается неотозванным, deny - запрос отклоняется
+    """
+
+    ALLOW = "allow"
+    DENY = "deny"
+
+
+class EmailVerificationFallbackPolicy(StrEnum):
+    """перечисление политик регистрации при недоступности hunter.io.
+
+    allow - пользователь создается в статусе unverified без проверки email, deny - регистрация отклоняется,
+    defer - пользователь создается в статусе ожидания, а email проверяет воркер, как в асинхронном режиме
+    """
+
+    ALLOW = "allow"
+    DENY = "deny"
+    DEFER = "defer"
+
+
+class RedisMode(StrEnum):
+    """перечисление режимов подключения к redis.
+
+    standalone - один узел REDIS_HOST:REDIS_PORT, sentinel - ведущий узел, адрес которого сообщают REDIS_SENTINELS,
+    cluster - redis cluster, узлы которого узнаются от REDIS_CLUSTER_NODES
+    """
+
+    STANDALONE = "standalone"
+    SENTINEL = "sentinel"
+    CLUSTER = "cluster"
+
+
+class RequestPriority(StrEnum):
+    """перечисление приоритетов запросов при адаптивном ограничении одновременных запросов.
+
+    exempt - запрос не ограничивается (пробы и метрики), high, normal и low - запрос занимает
+    не больше своей доли лимита из CONCURRENCY_LIMIT_PRIORITY_SHARES
+    """
+
+    EXEMPT = "exempt"
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
+class TracingExporter(StrEnum):
+    """перечисление способов экспорта трасс.
+
+    none - трассировка отключена, file - спаны пишутся в файл TRACING_FILE_PATH,
+    otlp - спаны отправляются в коллектор otlp по http
+    """
+
+    NONE = "none"
+    FILE = "file"
+    OTLP = "otlp"
+
+
 class Settings(BaseSettings):
     """класс настроек приложения.
 
@@ -33,10 +105,43 @@ class Settings(BaseSettings):
     EMAIL_HUNTER_API_URL: str
     EMAIL_HUNTER_API_KEY: str
 
+    EMAIL_VERIFICATION_MODE: EmailVerificationMode = EmailVerificationMode.SYNC
+    EMAIL_VERIFICATION_STREAM: str = "email_verification"
+    EMAIL_VERIFICATION_STREAM_MAXLEN: int = 100_000
+    EMAIL_VERIFICATION_CONSUMER_GROUP: str = "email_verification_workers"
+    EMAIL_VERIFICATION_BATCH_SIZE: int = 10
+    EMAIL_VERIFICATION_READ_BLOCK_TIMEDELTA: timedelta = timedelta(seconds=5)
+    EMAIL_VERIFICATION_REDIS_RETRY_BACKOFF: float = 0.5
+    EMAIL_VERIFICATION_REDIS_RETRY_MAX_BACKOFF: float = 30.0
+    EMAIL_VERIFICATION_RATE_LIMIT: float = 5.0
+    EMAIL_VERIFICATION_CLAIM_IDLE_TIMEDELTA: timedelta = timedelta(minutes=1)
+    EMAIL_VERIFICATION_ORPHAN_TIMEDELTA: timedelta = timedelta(minutes=10)
+    EMAIL_VERIFICATION_FALLBACK_POLICY: EmailVerificationFallbackPolicy = EmailVerificationFallbackPolicy.DENY
+    EMAIL_HUNTER_CONNECT_TIMEOUT: float = 1.0
+    EMAIL_HUNTER_READ_TIMEOUT: float = 3.0
+    EMAIL_HUNTER_RETRIES: int = 2
+    EMAIL_HUNTER_RETRY_BACKOFF: float = 0.2
+    EMAIL_HUNTER_HEDGING_ENABLED: bool = False
+    EMAIL_HUNTER_HEDGING_DELAY: float = 1.0
+    EMAIL_HUNTER_HEDGING_LATENCY_WINDOW: int = 200
+    EMAIL_HUNTER_CIRCUIT_BREAKER_CALL_TIMEOUT: float = 8.0
+    EMAIL_HUNTER_CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    EMAIL_HUNTER_CIRCUIT_BREAKER_RECOVERY_TIMEDELTA: timedelta = timedelta(seconds=30)
+
     SECRET_KEY: str
+    REFERRAL_CODE_SECRET_KEY: str | None = None
     SIGNING_ALGORITHM: str
+    SIGNING_KEYS_DIRECTORY: Path = Path("keys")
+    SIGNING_KEY_ID: str | None = None
+    JWKS_CACHE_MAX_AGE: int = 300
     ACCESS_TOKEN_TIMEDELTA: timedelta = timedelta(minutes=60)
     REFRESH_TOKEN_TIMEDELTA: timedelta = timedelta(days=3)
+    JWT_ISSUER: str = "referral-system-api"
+    TOKENS_INTROSPECTION_BATCH_LIMIT: int = 100
+    SERVICE_API_KEY: str | None = None
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_CALIBRATION_TARGET_TIMEDELTA: timedelta = timedelta(milliseconds=250)
+    PASSWORD_HASHES_METRICS_TIMEDELTA: timedelta = timedelta(minutes=5)
 
     TIMEZONE: str
 
@@ -45,9 +150,88 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
+    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_POOL_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_WARM_UP_CONNECTIONS: int = 5
+    POSTGRES_PREPARED_STATEMENTS_CACHE_SIZE: int = 500
 
+    REDIS_MODE: RedisMode = RedisMode.STANDALONE
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_SENTINELS: list[str] = []
+    REDIS_SENTINEL_MASTER_NAME: str = "mymaster"
+    REDIS_CLUSTER_NODES: list[str] = []
+    REDIS_KEY_SHARDS: int = 16
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 1.0
+    REDIS_CIRCUIT_BREAKER_CALL_TIMEOUT: float = 0.25
+    REDIS_CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    REDIS_CIRCUIT_BREAKER_RECOVERY_TIMEDELTA: timedelta = timedelta(seconds=10)
+    REDIS_CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+    REVOKED_TOKENS_FALLBACK_POLICY: RevokedTokensFallbackPolicy = RevokedTokensFallbackPolicy.ALLOW
+
+    REFERRAL_CODES_LOOKUP_BATCH_LIMIT: int = 100
+    REFERRAL_CODES_LOOKUP_CACHE_MAX_AGE: int = 30
+    REFERRAL_CODES_FALLBACK_CACHE_TIMEDELTA: timedelta = timedelta(seconds=30)
+    REFERRAL_CODES_FALLBACK_CACHE_MAX_SIZE: int = 10_000
+    REFERRAL_CODES_CACHE_BATCH_SIZE: int = 1000
+    REFERRAL_CODES_CACHE_WARM_ON_STARTUP: bool = True
+    REFERRAL_CODES_CACHE_RECONCILE_TIMEDELTA: timedelta | None = timedelta(minutes=15)
+    REFERRALS_VERSION_TIMEDELTA: timedelta = timedelta(minutes=1)
+    REFERRERS_LEADERBOARD_PAGE_LIMIT: int = 100
+    REFERRERS_LEADERBOARD_BATCH_SIZE: int = 1000
+    REFERRALS_ANALYTICS_MAX_TIMEDELTA: timedelta = timedelta(days=366)
+    REFERRALS_EVENTS_HEARTBEAT_INTERVAL: float = 15.0
+    REFERRALS_EVENTS_QUEUE_SIZE: int = 16
+
+    SERVER_HOST: str = "0.0.0.0"  # noqa: S104
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None
+    SERVER_KEEPALIVE_TIMEOUT: int = 5
+    SERVER_DRAIN_TIMEOUT: int = 20
+    SERVER_SHUTDOWN_TIMEOUT: int = 30
+
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    WARM_UP_RETRY_BACKOFF: float = 1.0
+    WARM_UP_RETRY_MAX_BACKOFF: float = 30.0
+    REQUEST_DEADLINE: float | None = 10.0
+    REQUEST_DEADLINES: dict[str, float | None] = {"/user/referrals/events": None}
+
+    CONCURRENCY_LIMIT_INITIAL: int = 20
+    CONCURRENCY_LIMIT_MIN: int = 4
+    CONCURRENCY_LIMIT_MAX: int = 200
+    CONCURRENCY_LIMIT_BACKOFF_RATIO: float = 0.9
+    CONCURRENCY_LIMIT_LATENCY_TOLERANCE: float = 2.0
+    CONCURRENCY_LIMIT_BASELINE_SMOOTHING: float = 0.05
+    CONCURRENCY_LIMIT_ROUTE_PRIORITIES: dict[str, RequestPriority] = {
+        "/health/live": RequestPriority.EXEMPT,
+        "/health/ready": RequestPriority.EXEMPT,
+        "/metrics": RequestPriority.EXEMPT,
+        "/user/referrals/events": RequestPriority.EXEMPT,
+        "/user/login": RequestPriority.HIGH,
+        "/user/refresh_login": RequestPriority.HIGH,
+        "/referral_code/get_user_referral_code": RequestPriority.HIGH,
+        "/referral_code/get_users_referral_codes": RequestPriority.HIGH,
+        "/token/introspect": RequestPriority.HIGH,
+        "/user/registration": RequestPriority.LOW,
+    }
+    CONCURRENCY_LIMIT_PRIORITY_SHARES: dict[RequestPriority, float] = {
+        RequestPriority.EXEMPT: 1.0,
+        RequestPriority.HIGH: 1.0,
+        RequestPriority.NORMAL: 0.8,
+        RequestPriority.LOW: 0.5,
+    }
+
+    TRACING_EXPORTER: TracingExporter = TracingExporter.NONE
+    TRACING_FILE_PATH: Path = Path("traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SAMPLING_RATIO: float = 0.1
+
+    PROFILES_DIRECTORY: Path = Path("profiles")
+    PROFILER_INTERVAL: float = 0.001
+    PROFILER_MIN_TIMEDELTA: timedelta = timedelta(seconds=10)
+    PROFILER_MAX_PROFILES: int = 20
 
     @computed_field
     @property
@@ -1,29 +1,96 @@
 """модуль конфигурации базы данных.
 
 модуль предоставляет конфигурацию движка базы данных
-и управление сессиями для асинхронных операций sqlalchemy
+и управление сессиями для асинхронных операций sqlalchemy.
+каждое соединение хранит подготовленные asyncpg запросы, поэтому повторный запрос не разбирается postgres заново.
+при работе через pgbouncer в режиме transaction кэш нужно отключить (POSTGRES_PREPARED_STATEMENTS_CACHE_SIZE=0).
+
+сессия берет соединение из пула только при первом запросе, а функции crud, отмеченные releases_database_connection,
+возвращают его в пул сразу после завершения, поэтому соединение не удерживается на время проверки токена,
+обращений к redis и сериализации ответа.
+
+каждая транзакция, начатая при обработке запроса к api, получает statement_timeout по оставшемуся сроку запроса
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
-from collections.abc import AsyncGenerator
+import functools
+import inspect
+from collections.abc import AsyncGenerator, Awaitable, Callable
 
+from sqlalchemy import Connection, event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.asyncio.engine import AsyncEngine
 
 from app.core.config import settings
+from app.core.deadline import get_remaining_time
+
+async_database_engine: AsyncEngine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.POSTGRES_POOL_SIZE,
+    max_overflow=settings.POSTGRES_POOL_MAX_OVERFLOW,
+    connect_args={"prepared_statement_cache_size": settings.POSTGRES_PREPARED_STATEMENTS_CACHE_SIZE},
+)
+
+
+set_statement_timeout_statement = text("SELECT set_config('statement_timeout', :statement_timeout, true)")
+
+
+@event.listens_for(async_database_engine.sync_engine, "begin")
+def set_statement_timeout(connection: Connection) -> None:
+    """ограничивает запросы транзакции оставшимся временем обработки запроса к api.
+
+    значение передается параметром, поэтому не создает новых подготовленных запросов в кэше соединения.
+    вне обработки запроса к api (воркеры, команды) транзакция не ограничивается
+
+    Args:
+        connection (Connection): соединение, начавшее транзакцию
+
+    """
+    remaining_time = get_remaining_time()
 
-async_database_engine: AsyncEngine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    if remaining_time is not None:
+        connection.execute(set_statement_timeout_statement, {"statement_timeout": f"{max(int(remaining_time * 1000), 1)}ms"})
 
 
 database_async_sessionmaker: async_sessionmaker[AsyncSession] = async_sessionmaker(async_database_engine, class_=AsyncSession)
 
 
+def releases_database_connection[**P, R](crud_function: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    """возвращает соединение сессии в пул сразу после завершения функции crud.
+
+    функция должна принимать сессию в параметре database_session и сама фиксировать свои изменения:
+    после ее завершения сессия закрывается, незафиксированная транзакция откатывается,
+    а следующий запрос той же сессии возьмет соединение из пула заново
+
+    Args:
+        crud_function (Callable[P, Awaitable[R]]): асинхронная функция crud
+
+    Returns:
+        Callable[P, Awaitable[R]]: функция, закрывающая сессию после выполнения
+
+    """
+    signature = inspect.signature(crud_function)
+
+    @functools.wraps(crud_function)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        database_session: AsyncSession = signature.bind(*args, **kwargs).arguments["database_session"]
+
+        try:
+            return await crud_function(*args, **kwargs)
+        finally:
+            await database_session.close()
+
+    return wrapper
+
+
 async def get_async_database_session() -> AsyncGenerator[AsyncSession]:
     """создает и возвращает асинхронную сессию базы данных.
 
     это зависимость, которая может быть использована в эндпоинтах fastapi для получения
-    сессии базы данных. сессия автоматически закрывается, когда генератор завершает работу
+    сессии базы данных. сессия автоматически закрывается, когда генератор завершает работу.
+    создание сессии не занимает соединение пула: оно берется только при первом запросе,
+    поэтому запросы, отклоненные при проверке токена или обслуженные из redis, не обращаются к пулу
 
     Yields:
         async_database_session: асинхронная сессия sqlalchemy,
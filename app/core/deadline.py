@@ -0,0 +1,120 @@
+"""модуль сроков обработки запросов.
+
+промежуточный слой задает каждому запросу срок обработки: REQUEST_DEADLINES для отдельных путей
+или REQUEST_DEADLINE для остальных. срок хранится в контекстной переменной и ограничивает вложенные вызовы:
+транзакции postgres получают statement_timeout по оставшемуся времени, запросы httpx - таймауты не больше него,
+а ожидание соединения пула, команды redis и все остальное прерываются отменой обработки запроса.
+по истечении срока обработка запроса отменяется, а клиент получает ответ 504,
+поэтому процесс не тратит время на запросы, ответ на которые уже никому не нужен.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+
+from fastapi import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+request_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+"""момент истечения срока обработки текущего запроса по time.monotonic или None вне запроса."""
+
+
+def get_remaining_time() -> float | None:
+    """возвращает время до истечения срока обработки текущего запроса.
+
+    Returns:
+        float | None: оставшееся время в секундах (не меньше нуля) или None, если срок не задан
+
+    """
+    deadline = request_deadline.get()
+
+    if deadline is None:
+        return None
+
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def limit_timeout(timeout: float) -> float:
+    """ограничивает таймаут вызова оставшимся временем обработки текущего запроса.
+
+    Args:
+        timeout (float): собственный таймаут вызова в секундах
+
+    Returns:
+        float: меньшее из таймаута и оставшегося времени
+
+    """
+    remaining_time = get_remaining_time()
+
+    return timeout if remaining_time is None else min(timeout, remaining_time)
+
+
+class DeadlineMiddleware:
+    """промежуточный слой asgi, ограничивающий время обработки запроса."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """оборачивает приложение.
+
+        Args:
+            app (ASGIApp): приложение asgi
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """обрабатывает запрос в пределах его срока и отвечает 504, если срок истек до начала ответа.
+
+        Args:
+            scope (Scope): параметры соединения
+            receive (Receive): получение сообщений клиента
+            send (Send): отправка сообщений клиенту
+
+        Raises:
+            TimeoutError: если таймаут возник внутри обработки запроса, а не из-за истечения его срока
+
+        """
+        if (
+            scope["type"] != "http"
+            or (deadline := settings.REQUEST_DEADLINES.get(scope["path"], settings.REQUEST_DEADLINE)) is None
+        ):
+            await self.app(scope, receive, send)
+
+            return
+
+        is_response_started = False
+
+        async def send_with_response_tracking(message: Message) -> None:
+            nonlocal is_response_started
+
+            is_response_started = is_response_started or message["type"] == "http.response.start"
+
+            await send(message)
+
+        request_deadline_token = request_deadline.set(time.monotonic() + deadline)
+
+        try:
+            async with asyncio.timeout(deadline) as deadline_timeout:
+                await self.app(scope, receive, send_with_response_tracking)
+
+        except TimeoutError:
+            if not deadline_timeout.expired():
+                raise
+
+            if not is_response_started:
+                await send({
+                    "type": "http.response.start",
+                    "status": status.HTTP_504_GATEWAY_TIMEOUT,
+                    "headers": [(b"content-type", b"application/json")],
+                })
+                await send({
+                    "type": "http.response.body",
+                    "body": json.dumps({"detail": "истек срок обработки запроса"}, ensure_ascii=False).encode(),
+                })
+
+        finally:
+            request_deadline.reset(request_deadline_token)
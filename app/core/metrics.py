@@ -0,0 +1,67 @@
+"""модуль метрик приложения.
+
+модуль содержит реестр сборщиков метрик и их вывод в текстовом формате prometheus.
+сборщик - асинхронная функция, которая в момент запроса метрик возвращает их текущие значения,
+поэтому модулям приложения не нужно самостоятельно обновлять значения метрик при каждом изменении.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+
+class MetricSample(NamedTuple):
+    """значение метрики с набором меток."""
+
+    name: str
+    metric_type: str
+    documentation: str
+    labels: dict[str, str]
+    value: float
+
+
+MetricsCollector = Callable[[], Awaitable[list[MetricSample]]]
+
+metrics_collectors: list[MetricsCollector] = []
+
+
+def register_metrics_collector(collector: MetricsCollector) -> MetricsCollector:
+    """регистрирует сборщик метрик, может использоваться как декоратор.
+
+    Args:
+        collector (MetricsCollector): асинхронная функция, возвращающая значения метрик
+
+    Returns:
+        MetricsCollector: тот же сборщик метрик
+
+    """
+    metrics_collectors.append(collector)
+
+    return collector
+
+
+async def render_metrics() -> str:
+    """собирает метрики всех сборщиков и выводит их в текстовом формате prometheus.
+
+    Returns:
+        str: метрики в текстовом формате prometheus
+
+    """
+    samples_by_name: dict[str, list[MetricSample]] = {}
+
+    for collector in metrics_collectors:
+        for sample in await collector():
+            samples_by_name.setdefault(sample.name, []).append(sample)
+
+    lines: list[str] = []
+
+    for name, samples in samples_by_name.items():
+        lines.append(f"# HELP {name} {samples[0].documentation}")
+        lines.append(f"# TYPE {name} {samples[0].metric_type}")
+
+        for sample in samples:
+            labels = ",".join(f'{label}="{value}"' for label, value in sample.labels.items())
+            lines.append(f"{name}{{{labels}}} {sample.value}" if labels else f"{name} {sample.value}")
+
+    return "\n".join(lines) + "\n"
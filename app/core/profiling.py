@@ -0,0 +1,196 @@
+"""модуль профилирования отдельных запросов.
+
+промежуточный слой запускает семплирующий профилировщик pyinstrument только для запроса,
+который пришел с заголовком x-profile-request и ключом доверенного сервиса в x-service-key,
+или для следующего запроса к пути, заранее отмеченному через POST /profiler/armed_paths.
+остальные запросы проходят слой без накладных расходов, кроме проверки заголовка.
+
+профиль сохраняется в каталог PROFILES_DIRECTORY в формате speedscope (открывается на https://www.speedscope.app
+как flamegraph), его идентификатор возвращается в заголовке ответа x-profile-id.
+чтобы профилирование нельзя было использовать для деградации сервиса, процесс профилирует
+не больше одного запроса одновременно и не чаще раза в PROFILER_MIN_TIMEDELTA,
+а в каталоге хранятся только последние PROFILER_MAX_PROFILES профилей.
+
+отметки путей хранятся в памяти процесса, поэтому при нескольких процессах отметка
+срабатывает только в процессе, принявшем запрос на нее.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from pyinstrument.session import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import verify_service_key
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FILE_SUFFIX = ".speedscope.json"
+
+
+class RequestProfiler:
+    """ограничитель и хранилище профилей отдельных запросов процесса."""
+
+    def __init__(self, profiles_directory: Path, min_timedelta_seconds: float, max_profiles: int) -> None:
+        """создает ограничитель профилирования.
+
+        Args:
+            profiles_directory (Path): каталог профилей
+            min_timedelta_seconds (float): минимальный интервал между началами профилирования в секундах
+            max_profiles (int): количество хранимых профилей
+
+        """
+        self.profiles_directory = profiles_directory
+        self.min_timedelta_seconds = min_timedelta_seconds
+        self.max_profiles = max_profiles
+        self.armed_paths: set[str] = set()
+
+        self._is_profiling = False
+        self._last_started_at = float("-inf")
+
+    def acquire(self, path: str, headers: Headers) -> bool:
+        """решает, профилировать ли запрос, и занимает профилировщик процесса.
+
+        Args:
+            path (str): путь запроса
+            headers (Headers): заголовки запроса
+
+        Returns:
+            bool: True, если запрос нужно профилировать и профилировщик занят для него, иначе False
+
+        """
+        is_armed = path in self.armed_paths
+
+        if not is_armed and "x-profile-request" not in headers:
+            return False
+
+        if not is_armed:
+            try:
+                verify_service_key(headers.get("x-service-key"))
+
+            except HTTPException:
+                return False
+
+        if self._is_profiling or time.monotonic() - self._last_started_at < self.min_timedelta_seconds:
+            logger.info("profiling of %s skipped by the rate limit", path)
+
+            return False
+
+        self.armed_paths.discard(path)
+        self._is_profiling = True
+        self._last_started_at = time.monotonic()
+
+        return True
+
+    def release(self) -> None:
+        """освобождает профилировщик процесса."""
+        self._is_profiling = False
+
+    def profile_path(self, profile_id: UUID) -> Path:
+        """возвращает путь файла профиля.
+
+        Args:
+            profile_id (UUID): идентификатор профиля
+
+        Returns:
+            Path: путь файла профиля
+
+        """
+        return self.profiles_directory / f"{profile_id.hex}{PROFILE_FILE_SUFFIX}"
+
+    def list_profiles(self) -> list[Path]:
+        """возвращает файлы профилей от новых к старым.
+
+        Returns:
+            list[Path]: файлы профилей
+
+        """
+        if not self.profiles_directory.is_dir():
+            return []
+
+        return sorted(
+            self.profiles_directory.glob(f"*{PROFILE_FILE_SUFFIX}"),
+            key=lambda profile_path: profile_path.stat().st_mtime,
+            reverse=True,
+        )
+
+    def save(self, profile_id: UUID, session: Session) -> None:
+        """сохраняет профиль в формате speedscope и удаляет профили сверх PROFILER_MAX_PROFILES.
+
+        Args:
+            profile_id (UUID): идентификатор профиля
+            session (Session): результат профилирования
+
+        """
+        self.profiles_directory.mkdir(parents=True, exist_ok=True)
+        self.profile_path(profile_id).write_text(SpeedscopeRenderer().render(session), encoding="utf-8")
+
+        for outdated_profile_path in self.list_profiles()[self.max_profiles :]:
+            outdated_profile_path.unlink(missing_ok=True)
+
+
+request_profiler = RequestProfiler(
+    settings.PROFILES_DIRECTORY,
+    settings.PROFILER_MIN_TIMEDELTA.total_seconds(),
+    settings.PROFILER_MAX_PROFILES,
+)
+
+
+class RequestProfilingMiddleware:
+    """промежуточный слой asgi, профилирующий запросы, выбранные request_profiler."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """оборачивает приложение.
+
+        Args:
+            app (ASGIApp): приложение asgi
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """обрабатывает запрос, профилируя его при необходимости.
+
+        Args:
+            scope (Scope): параметры соединения
+            receive (Receive): получение сообщений клиента
+            send (Send): отправка сообщений клиенту
+
+        """
+        if scope["type"] != "http" or not request_profiler.acquire(scope["path"], Headers(scope=scope)):
+            await self.app(scope, receive, send)
+
+            return
+
+        profile_id = uuid4()
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.hex.encode())]
+
+            await send(message)
+
+        profiler = Profiler(interval=settings.PROFILER_INTERVAL, async_mode="enabled")
+
+        try:
+            profiler.start()
+
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                session = profiler.stop()
+
+            await asyncio.to_thread(request_profiler.save, profile_id, session)
+
+        finally:
+            request_profiler.release()
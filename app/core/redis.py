@@ -1,24 +1,322 @@
 """модуль для работы с redis.
 
-модуль содержит функции для инициализации, получения и закрытия соединения с redis,
-используя параметры подключения из конфигурации приложения.
+модуль содержит общий для процесса клиент redis с пулом соединений, созданный по параметрам подключения
+из конфигурации приложения, а также функции формирования ключей.
+
+клиент подключается в режиме REDIS_MODE: к одному узлу, к ведущему узлу, адрес которого сообщает sentinel
+(после переключения ведущего клиент сам переподключается к новому), или к redis cluster.
+в кластере ключ хранится в слоте, вычисленном по его хеш-тегу - части имени в фигурных скобках,
+поэтому ключи строятся так, чтобы команды над несколькими ключами не расходились по множеству слотов:
+- ключи реферальных кодов и отозванных токенов распределены по REDIS_KEY_SHARDS шардам
+  (referrer:{шард}:email, revoked:{шард}:токен), поэтому пачка ключей читается не больше чем
+  REDIS_KEY_SHARDS командами mget, а ключи равномерно расходятся по узлам;
+- ключи пользователя собраны в его слоте (user:{идентификатор}:...).
+каналы pub/sub не привязаны к слотам, поэтому их имена остаются прежними.
+раскладка ключей одинакова во всех режимах, поэтому переход на кластер не требует переноса ключей,
+а при переходе со старой раскладки или изменении REDIS_KEY_SHARDS ключи переносит
+команда python -m app.workers.redis_keys_migration.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
+import random
+import zlib
+from itertools import starmap
+from typing import Any
+from uuid import UUID
+
 from redis.asyncio.client import Redis
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.asyncio.connection import Connection, ConnectionPool
+from redis.asyncio.sentinel import Sentinel
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
+from app.core.config import RedisMode, settings
+
+REFERRER_KEY_PATTERN = "referrer:*"
+REVOKED_TOKEN_KEY_PATTERN = "revoked:*"  # noqa: S105
+REFERRALS_VERSION_KEY_PATTERN = "user:*:referrals_version"
+REFERRERS_LEADERBOARD_KEY = "referrers_leaderboard"
+
+redis_circuit_breaker = CircuitBreaker(
+    name="redis",
+    failure_threshold=settings.REDIS_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    recovery_timedelta=settings.REDIS_CIRCUIT_BREAKER_RECOVERY_TIMEDELTA,
+    half_open_max_calls=settings.REDIS_CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+    call_timeout=settings.REDIS_CIRCUIT_BREAKER_CALL_TIMEOUT,
+    failure_exceptions=(RedisError, OSError),
+)
+"""предохранитель для вызовов redis на путях, у которых есть запасной вариант."""
+
+REDIS_UNAVAILABLE_ERRORS = (CircuitBreakerOpenError, RedisError, OSError)
+"""исключения, означающие, что redis недоступен и нужно перейти на запасной путь."""
+
+
+def parse_redis_nodes(nodes: list[str]) -> list[tuple[str, int]]:
+    """разбирает адреса узлов redis.
+
+    Args:
+        nodes (list[str]): адреса узлов в формате host:port
+
+    Returns:
+        list[tuple[str, int]]: хосты и порты узлов
+
+    """
+    return [(host, int(port)) for host, _, port in (node.rpartition(":") for node in nodes)]
+
+
+def create_redis_client(socket_timeout: float = settings.REDIS_SOCKET_TIMEOUT) -> Redis | RedisCluster:
+    """создает клиент redis в режиме REDIS_MODE.
+
+    Args:
+        socket_timeout (float): время ожидания ответа redis в секундах
+
+    Returns:
+        Redis | RedisCluster: клиент redis
+
+    """
+    connection_kwargs = {
+        "socket_timeout": socket_timeout,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+    }
+
+    if settings.REDIS_MODE == RedisMode.SENTINEL:
+        return Sentinel(parse_redis_nodes(settings.REDIS_SENTINELS), **connection_kwargs).master_for(
+            settings.REDIS_SENTINEL_MASTER_NAME,
+        )
+
+    if settings.REDIS_MODE == RedisMode.CLUSTER:
+        return RedisCluster(
+            startup_nodes=list(
+                starmap(
+                    ClusterNode,
+                    parse_redis_nodes(settings.REDIS_CLUSTER_NODES) or [(settings.REDIS_HOST, settings.REDIS_PORT)],
+                ),
+            ),
+            **connection_kwargs,
+        )
+
+    return Redis.from_url(f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}", encoding="utf-8", **connection_kwargs)
+
+
+class ClusterNodeConnection(Connection):
+    """соединение с любым доступным узлом redis cluster.
+
+    при каждом подключении узлы текущей топологии кластера перебираются в случайном порядке до первого доступного,
+    поэтому после отказа узла соединение восстанавливается с другим узлом, а соединения процессов
+    распределяются по узлам
+    """
+
+    def __init__(self, *, cluster: RedisCluster, **kwargs: Any) -> None:  # noqa: ANN401
+        """инициализирует соединение.
+
+        Args:
+            cluster (RedisCluster): клиент кластера, из которого берется топология
+            **kwargs (Any): параметры соединения redis
 
-from app.core.config import settings
+        """
+        super().__init__(**kwargs)
+        self.cluster: RedisCluster = cluster
 
+    async def _connect(self) -> None:
+        # топология известна после первой команды клиента кластера, до нее используются начальные узлы
+        nodes = list({**self.cluster.nodes_manager.startup_nodes, **self.cluster.nodes_manager.nodes_cache}.values())
+        connect_error: Exception | None = None
 
-async def get_redis() -> Redis:
-    """возвращает подключение к redis.
+        for node in random.sample(nodes, len(nodes)):
+            self.host, self.port = node.host, node.port
+
+            try:
+                await super()._connect()
+
+            except (OSError, TimeoutError) as error:
+                connect_error = error
+
+            else:
+                return
+
+        raise connect_error or RedisConnectionError("redis cluster has no nodes")
+
+
+def create_redis_pubsub_client(redis: Redis | RedisCluster) -> Redis:
+    """создает клиент redis для pub/sub.
+
+    клиент кластера не поддерживает pub/sub, но сообщение, опубликованное на любом узле кластера,
+    получают подписчики на всех узлах, поэтому в кластере pub/sub работает через соединения с любым доступным узлом.
+    в остальных режимах используется общий клиент процесса
+
+    Args:
+        redis (Redis | RedisCluster): общий клиент redis
 
     Returns:
-        redis: подключение к redis
+        Redis: клиент redis
 
     """
-    return Redis.from_url(
-        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
-        encoding="utf-8",
+    if not isinstance(redis, RedisCluster):
+        return redis
+
+    return Redis(
+        connection_pool=ConnectionPool(
+            connection_class=ClusterNodeConnection,
+            cluster=redis,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        ),
     )
+
+
+redis_client: Redis | RedisCluster = create_redis_client()
+"""общий для процесса клиент redis, соединения открываются в пуле по мере необходимости."""
+
+redis_pubsub_client: Redis = create_redis_pubsub_client(redis_client)
+"""клиент redis для публикации и подписки на события."""
+
+
+async def get_redis() -> Redis | RedisCluster:
+    """возвращает общий для процесса клиент redis.
+
+    Returns:
+        Redis | RedisCluster: подключение к redis
+
+    """
+    return redis_client
+
+
+async def close_redis() -> None:
+    """закрывает соединения клиентов redis процесса."""
+    await redis_client.aclose()
+
+    if redis_pubsub_client is not redis_client:
+        await redis_pubsub_client.aclose()
+
+
+async def mget(redis: Redis | RedisCluster, keys: list[str] | list[bytes]) -> list[bytes | None]:
+    """читает значения ключей.
+
+    в кластере ключи группируются по слотам и читаются одной командой mget на слот,
+    поэтому ключи с общим хеш-тегом шарда читаются вместе
+
+    Args:
+        redis (Redis | RedisCluster): экземпляр redis
+        keys (list[str] | list[bytes]): ключи
+
+    Returns:
+        list[bytes | None]: значения в порядке ключей, None - если ключа нет
+
+    """
+    if isinstance(redis, RedisCluster):
+        return await redis.mget_nonatomic(keys)
+
+    return await redis.mget(keys)
+
+
+def key_shard(value: str) -> int:
+    """возвращает шард ключа для значения.
+
+    Args:
+        value (str): значение, по которому строится ключ
+
+    Returns:
+        int: номер шарда от 0 до REDIS_KEY_SHARDS - 1
+
+    """
+    return zlib.crc32(value.encode()) % settings.REDIS_KEY_SHARDS
+
+
+def remove_key_shard(key: str) -> str:
+    """удаляет хеш-тег шарда из ключа без префикса, если он есть.
+
+    Args:
+        key (str): ключ без префикса в формате {шард}:значение или значение
+
+    Returns:
+        str: значение
+
+    """
+    if key.startswith("{") and "}:" in key:
+        return key.partition("}:")[2]
+
+    return key
+
+
+def referrer_key(email: str) -> str:
+    """возвращает ключ redis, под которым хранится активный реферальный код пользователя.
+
+    Args:
+        email (str): email владельца реферального кода
+
+    Returns:
+        str: ключ redis
+
+    """
+    return f"referrer:{{{key_shard(email)}}}:{email}"
+
+
+def revoked_token_key(token: str) -> str:
+    """возвращает ключ redis, наличие которого означает, что jwt-токен отозван.
+
+    Args:
+        token (str): jwt-токен без префикса схемы
+
+    Returns:
+        str: ключ redis
+
+    """
+    return f"revoked:{{{key_shard(token)}}}:{token}"
+
+
+def referrals_version_key(user_id: UUID | str) -> str:
+    """возвращает ключ redis, под которым хранится версия списка рефералов пользователя.
+
+    Args:
+        user_id (UUID | str): идентификатор пользователя
+
+    Returns:
+        str: ключ redis
+
+    """
+    return f"user:{{{user_id}}}:referrals_version"
+
+
+def referrals_events_channel(user_id: UUID | str) -> str:
+    """возвращает канал redis pub/sub, в который публикуются регистрации рефералов пользователя.
+
+    Args:
+        user_id (UUID | str): идентификатор пользователя
+
+    Returns:
+        str: канал redis
+
+    """
+    return f"user:{user_id}:referrals_events"
+
+
+def email_from_referrer_key(key: bytes) -> str:
+    """возвращает email владельца реферального кода по ключу redis.
+
+    Args:
+        key (bytes): ключ redis, сформированный функцией referrer_key, в том числе в прежней раскладке без шарда
+
+    Returns:
+        str: email владельца реферального кода
+
+    """
+    return remove_key_shard(key.decode().removeprefix("referrer:"))
+
+
+def token_from_revoked_token_key(key: bytes) -> str:
+    """возвращает jwt-токен по ключу redis отозванного токена.
+
+    Args:
+        key (bytes): ключ redis, сформированный функцией revoked_token_key,
+            в том числе в прежней раскладке revoked:bearer jwt токен
+
+    Returns:
+        str: jwt-токен без префикса схемы
+
+    """
+    return remove_key_shard(key.decode().removeprefix("revoked:")).removeprefix("bearer jwt ")
@@ -0,0 +1,111 @@
+"""модуль генерации реферальных кодов.
+
+код получается из порядкового номера ключевой перестановкой (сеть фейстеля с ключевым blake2b в качестве раундовой функции)
+и кодируется в base62 до 16 символов. перестановка взаимно однозначна, поэтому разные номера всегда дают разные коды,
+а без ключа код нельзя ни угадать, ни связать с номером. номера выделяются из последовательности postgres блоками,
+поэтому обращение к базе данных происходит один раз на блок, а не на каждый код.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import hashlib
+import string
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import settings
+from app.models.referral_code import REFERRAL_CODE_NUMBERS_BLOCK_SIZE, referral_code_number_sequence
+
+REFERRAL_CODE_ALPHABET = string.ascii_letters + string.digits
+REFERRAL_CODE_LENGTH = 16
+
+FEISTEL_HALF_BITS = 47
+FEISTEL_HALF_MASK = (1 << FEISTEL_HALF_BITS) - 1
+FEISTEL_ROUNDS = 6
+
+
+class ReferralCodeGenerator:
+    """генератор уникальных реферальных кодов.
+
+    перестановка работает на 94-битных числах, а 62 ** 16 > 2 ** 94,
+    поэтому любой результат перестановки помещается в 16 символов base62
+    """
+
+    def __init__(self, secret_key: str) -> None:
+        """инициализирует генератор.
+
+        Args:
+            secret_key (str): ключ перестановки
+
+        """
+        self._round_keys: list[bytes] = [
+            hashlib.blake2b(f"referral_code:{round_number}:{secret_key}".encode(), digest_size=32).digest()
+            for round_number in range(FEISTEL_ROUNDS)
+        ]
+        self._next_number: int = 0
+        self._block_end: int = 0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def permute(self, number: int) -> int:
+        """переставляет число в пределах 94 бит.
+
+        Args:
+            number (int): неотрицательное число меньше 2 ** 94
+
+        Returns:
+            int: результат ключевой перестановки
+
+        """
+        left, right = number >> FEISTEL_HALF_BITS, number & FEISTEL_HALF_MASK
+
+        for round_key in self._round_keys:
+            round_value = int.from_bytes(hashlib.blake2b(right.to_bytes(6), key=round_key, digest_size=6).digest())
+            left, right = right, left ^ (round_value & FEISTEL_HALF_MASK)
+
+        return (left << FEISTEL_HALF_BITS) | right
+
+    def encode(self, number: int) -> str:
+        """превращает порядковый номер в реферальный код.
+
+        Args:
+            number (int): порядковый номер кода
+
+        Returns:
+            str: реферальный код из 16 символов base62
+
+        """
+        value = self.permute(number)
+        characters = []
+
+        for _ in range(REFERRAL_CODE_LENGTH):
+            value, index = divmod(value, len(REFERRAL_CODE_ALPHABET))
+            characters.append(REFERRAL_CODE_ALPHABET[index])
+
+        return "".join(reversed(characters))
+
+    async def generate(self, database_session: AsyncSession) -> str:
+        """возвращает новый реферальный код.
+
+        когда номера текущего блока заканчиваются, новый блок выделяется одним вызовом nextval
+
+        Args:
+            database_session (AsyncSession): асинхронная сессия базы данных
+
+        Returns:
+            str: реферальный код, не совпадающий ни с одним ранее выданным
+
+        """
+        async with self._lock:
+            if self._next_number >= self._block_end:
+                self._next_number = await database_session.scalar(select(referral_code_number_sequence.next_value()))
+                self._block_end = self._next_number + REFERRAL_CODE_NUMBERS_BLOCK_SIZE
+
+            number = self._next_number
+            self._next_number += 1
+
+        return self.encode(number)
+
+
+referral_code_generator = ReferralCodeGenerator(settings.REFERRAL_CODE_SECRET_KEY or settings.SECRET_KEY)
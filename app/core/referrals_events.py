@@ -0,0 +1,158 @@
+"""модуль событий о новых рефералах.
+
+регистрация по реферальному коду публикуется в канал redis pub/sub реферера, поэтому событие получит
+подписчик, подключенный к любому процессу. каждый процесс держит одно соединение pub/sub на всех
+своих подписчиков: канал пользователя подписывается при появлении его первого подписчика в процессе
+и отписывается при уходе последнего, а события раскладываются по небольшим очередям подписчиков.
+поток событий (server-sent events) для подписчика - это очередь и генератор ответа,
+поэтому процесс держит тысячи простаивающих соединений без заметного расхода памяти.
+
+при недоступности redis регистрация не прерывается, а события, опубликованные в это время, теряются:
+поток служит сигналом к обновлению списка рефералов, а не его источником.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from app.core.config import settings
+from app.core.redis import REDIS_UNAVAILABLE_ERRORS, redis_circuit_breaker, redis_pubsub_client, referrals_events_channel
+from app.models.user import UserView
+
+logger = logging.getLogger(__name__)
+
+
+class ReferralsEventsHub:
+    """раздача событий о новых рефералах подписчикам процесса через одно соединение redis pub/sub."""
+
+    def __init__(self, redis: Redis, queue_size: int) -> None:
+        """инициализирует раздачу событий.
+
+        Args:
+            redis (Redis): экземпляр redis для pub/sub
+            queue_size (int): размер очереди подписчика, события сверх нее отбрасываются для медленного подписчика
+
+        """
+        self.queue_size: int = queue_size
+        self._redis: Redis = redis
+        self._pubsub: PubSub = redis.pubsub(ignore_subscribe_messages=True)
+        self._subscribers: dict[str, set[asyncio.Queue[bytes]]] = {}
+        self._listening: asyncio.Task[None] | None = None
+        self._has_subscriptions = asyncio.Event()
+        self._is_closed: bool = False
+
+    async def publish(self, referrer_id: UUID, referral: UserView) -> None:
+        """публикует событие о регистрации реферала в канал реферера.
+
+        Args:
+            referrer_id (UUID): идентификатор реферера
+            referral (UserView): зарегистрированный реферал
+
+        """
+        try:
+            async with redis_circuit_breaker.guard():
+                await self._redis.publish(referrals_events_channel(referrer_id), referral.model_dump_json())
+
+        except REDIS_UNAVAILABLE_ERRORS:
+            logger.warning("referral registration event for %s is not published, redis is unavailable", referrer_id)
+
+    def start(self) -> None:
+        """запускает чтение соединения pub/sub."""
+        self._listening = asyncio.create_task(self._listen())
+
+    def close(self) -> None:
+        """завершает очереди всех подписчиков процесса, чтобы их потоки закончились до остановки процесса.
+
+        очереди новых подписчиков завершаются сразу, а события, уже попавшие в очереди, будут прочитаны.
+        """
+        self._is_closed = True
+
+        for subscribers in self._subscribers.values():
+            for queue in subscribers:
+                queue.shutdown()
+
+    async def stop(self) -> None:
+        """останавливает чтение и закрывает соединение pub/sub."""
+        if self._listening:
+            self._listening.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listening
+
+        await self._pubsub.aclose()
+
+    async def _listen(self) -> None:
+        while True:
+            if not self._pubsub.subscribed:
+                # соединение pub/sub создается первой подпиской, до нее читать нечего
+                self._has_subscriptions.clear()
+                await self._has_subscriptions.wait()
+
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+
+            except REDIS_UNAVAILABLE_ERRORS:
+                logger.warning("referrals events subscription is lost, reconnecting", exc_info=True)
+                await asyncio.sleep(1.0)
+
+                continue
+
+            if not message or message["type"] != "message":
+                continue
+
+            for queue in self._subscribers.get(message["channel"].decode(), ()):
+                with contextlib.suppress(asyncio.QueueFull):
+                    queue.put_nowait(message["data"])
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: UUID | str) -> AsyncIterator[asyncio.Queue[bytes]]:
+        """подписывает на события о новых рефералах пользователя.
+
+        Args:
+            user_id (UUID | str): идентификатор пользователя
+
+        Yields:
+            asyncio.Queue[bytes]: очередь событий в формате json, завершаемая (QueueShutDown) при закрытии раздачи
+
+        """
+        channel = referrals_events_channel(user_id)
+        queue: asyncio.Queue[bytes] = asyncio.Queue(self.queue_size)
+
+        if self._is_closed:
+            # процесс останавливается: поток сразу завершится, подписываться на канал не нужно
+            queue.shutdown()
+
+            yield queue
+
+            return
+
+        subscribers = self._subscribers.setdefault(channel, set())
+        subscribers.add(queue)
+
+        try:
+            if len(subscribers) == 1:
+                await self._pubsub.subscribe(channel)
+                self._has_subscriptions.set()
+
+            yield queue
+
+        finally:
+            subscribers.discard(queue)
+
+            if not subscribers:
+                del self._subscribers[channel]
+
+                with contextlib.suppress(*REDIS_UNAVAILABLE_ERRORS):
+                    await self._pubsub.unsubscribe(channel)
+
+
+referrals_events_hub = ReferralsEventsHub(redis_pubsub_client, settings.REFERRALS_EVENTS_QUEUE_SIZE)
+"""раздача событий о новых рефералах подписчикам процесса."""
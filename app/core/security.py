@@ -1,23 +1,31 @@
 """модуль для работы с jwt-токенами и паролями.
 
 модуль содержит функции для создания, верификации jwt-токенов, хеширования паролей и их верификации,
-а также для работы с redis для проверки отозванных токенов.
+а также для работы с redis для проверки отозванных токенов, в том числе пачкой для api-шлюзов.
+
+стоимость bcrypt задается BCRYPT_ROUNDS и подбирается под оборудование командой python -m app.core.bcrypt_calibration.
+хеши с другой стоимостью считаются устаревшими и пересчитываются при успешном входе пользователя.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
-from datetime import datetime, timedelta
+import secrets
+from datetime import UTC, datetime, timedelta
 from enum import StrEnum
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import HTTPException, Request, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import APIKeyHeader
-from jwt import PyJWTError, decode, encode
+from jwt import ExpiredSignatureError, PyJWTError, decode, encode, get_unverified_header
 from passlib.context import CryptContext
 from redis.asyncio import Redis
 
-from app.core.config import settings
-from app.models.jwt import JWT, JWTPayload
+from app.core.config import RevokedTokensFallbackPolicy, settings
+from app.core.redis import REDIS_UNAVAILABLE_ERRORS, mget, redis_circuit_breaker, revoked_token_key
+from app.core.signing_keys import get_signing_keyring
+from app.core.tracing import tracer
+from app.models.jwt import JWT, JWTPayload, TokenIntrospection, TokenIntrospectionRequest
 
 
 class TokenType(StrEnum):
@@ -30,7 +38,7 @@ class TokenType(StrEnum):
     REFRESH = "refresh"
 
 
-password_crypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_crypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 
 def create_jwt(
@@ -41,6 +49,10 @@ def create_jwt(
     """создает jwt-токен.
 
     эта функция создает новый jwt-токен для указанного пользователя с определенным типом токена.
+    при асимметричном алгоритме подписи в заголовок kid токена записывается идентификатор активного ключа.
+    токен содержит зарегистрированные поля iss, sub, iat и exp (секунды unix-времени в utc), поэтому его срок действия
+    и субъект проверяют стандартные библиотеки jwt других сервисов. token_subject и token_expiration
+    (местное время) сохранены для совместимости с клиентами, которые их читают
 
     Args:
         subject_id (uuid): идентификатор субъекта (пользователя)
@@ -57,59 +69,103 @@ def create_jwt(
         settings.ACCESS_TOKEN_TIMEDELTA if token_type == TokenType.ACCESS else settings.REFRESH_TOKEN_TIMEDELTA
     )
 
-    token_expiration_datetime: datetime = datetime.now() + token_timedelta
+    issued_at: datetime = datetime.now(UTC)
+    token_expiration_datetime: datetime = issued_at + token_timedelta
 
     jwt_payload: JWTPayload = JWTPayload(
+        iss=settings.JWT_ISSUER,
+        sub=str(subject_id),
+        iat=int(issued_at.timestamp()),
+        exp=int(token_expiration_datetime.timestamp()),
         token_type=token_type,
         token_subject=str(subject_id),
-        token_expiration=str(token_expiration_datetime),
+        token_expiration=str(token_expiration_datetime.astimezone().replace(tzinfo=None)),
         token_subject_user_agent=token_subject_user_agent,
     )
 
-    encoded_jwt: str = encode(jwt_payload.model_dump(), settings.SECRET_KEY, algorithm=settings.SIGNING_ALGORITHM)
+    signing_keyring = get_signing_keyring()
+
+    encoded_jwt: str = encode(
+        jwt_payload.model_dump(),
+        signing_keyring.signing_key,
+        algorithm=signing_keyring.algorithm,
+        headers={"kid": signing_keyring.active_key_id} if signing_keyring.active_key_id else None,
+    )
 
     return JWT(token=f"bearer jwt {encoded_jwt}")
 
 
-async def verify_jwt(
-    token: str,
-    token_type: TokenType,
-    request: Request,
-    redis: Redis,
-) -> JWTPayload:
-    """проверяет валидность jwt-токена.
+async def get_tokens_revocation(tokens: list[str], redis: Redis) -> list[bool]:
+    """проверяет отзыв jwt-токенов одной командой mget (в кластере - одной на шард ключей).
 
-    эта функция проверяет jwt-токен на предмет его отозвания, истечения срока действия,
-    а также соответствие типа токена и user-agent.
+    если redis недоступен, проверка выполняется согласно политике REVOKED_TOKENS_FALLBACK_POLICY
+
+    Args:
+        tokens (list[str]): jwt-токены
+        redis (Redis): экземпляр redis для проверки отозванных токенов
+
+    Returns:
+        list[bool]: признаки отзыва в порядке токенов
+
+    Raises:
+        HTTPException: если отзыв невозможно проверить и политика запрещает пропускать такие токены
+
+    """
+    if not tokens:
+        return []
+
+    try:
+        async with redis_circuit_breaker.guard():
+            revoked_tokens = await mget(redis, [revoked_token_key(token) for token in tokens])
+
+    except REDIS_UNAVAILABLE_ERRORS as redis_error:
+        if settings.REVOKED_TOKENS_FALLBACK_POLICY == RevokedTokensFallbackPolicy.DENY:
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "не удалось проверить отзыв токена, попробуйте позже",
+            ) from redis_error
+
+        return [False] * len(tokens)
+
+    return [revoked_token is not None for revoked_token in revoked_tokens]
+
+
+def decode_jwt(token: str, token_type: TokenType, user_agent: str | None) -> JWTPayload:
+    """проверяет подпись, тип, срок действия и привязку jwt-токена к user-agent без проверки отзыва.
+
+    срок действия и издатель проверяются по зарегистрированным полям exp и iss, токены без них отклоняются
 
     Args:
         token (str): jwt-токен
-        token_type (tokentype): тип токена (access или refresh)
-        request (request): объект запроса для получения user-agent
-        redis (redis): экземпляр redis для проверки отозванных токенов
+        token_type (TokenType): ожидаемый тип токена (access или refresh)
+        user_agent (str | None): user-agent клиента, предъявившего токен
 
     Returns:
-        jwtpayload: данные из токена
+        JWTPayload: данные из токена
 
     Raises:
-        HTTPException: если токен отозван, истек или некорректен
+        HTTPException: если токен истек или некорректен
 
     """
-    if await redis.get(f"revoked:bearer jwt {token}"):
-        raise HTTPException(
-            status.HTTP_401_UNAUTHORIZED,
-            "токен отозван",
-        )
+    signing_keyring = get_signing_keyring()
 
     try:
         token_payload: JWTPayload = JWTPayload(
             **decode(
                 token,
-                settings.SECRET_KEY,
-                settings.SIGNING_ALGORITHM,
+                signing_keyring.verification_key(get_unverified_header(token).get("kid")),
+                [signing_keyring.algorithm],
+                issuer=settings.JWT_ISSUER,
+                options={"require": ["iss", "sub", "iat", "exp"]},
             ),
         )
 
+    except ExpiredSignatureError as expiration_error:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN,
+            "токен истек",
+        ) from expiration_error
+
     except PyJWTError as jwt_error:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
@@ -122,19 +178,95 @@ async def verify_jwt(
             "передан неверный тип токена",
         )
 
-    if datetime.strptime(token_payload.token_expiration, "%Y-%m-%d %H:%M:%S.%f") <= datetime.now():
+    if token_payload.token_subject_user_agent != user_agent:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
-            "токен истек",
+            "токен был выпущен с использованием другого user-agent",
         )
 
-    if token_payload.token_subject_user_agent != request.headers.get("User-Agent"):
+    return token_payload
+
+
+async def verify_jwt(
+    token: str,
+    token_type: TokenType,
+    request: Request,
+    redis: Redis,
+) -> JWTPayload:
+    """проверяет валидность jwt-токена.
+
+    эта функция проверяет jwt-токен на предмет его отозвания, истечения срока действия,
+    а также соответствие типа токена и user-agent.
+    если redis недоступен, проверка отзыва выполняется согласно политике REVOKED_TOKENS_FALLBACK_POLICY
+
+    Args:
+        token (str): jwt-токен
+        token_type (tokentype): тип токена (access или refresh)
+        request (request): объект запроса для получения user-agent
+        redis (redis): экземпляр redis для проверки отозванных токенов
+
+    Returns:
+        jwtpayload: данные из токена
+
+    Raises:
+        HTTPException: если токен отозван, истек или некорректен,
+            а также если отзыв невозможно проверить и политика запрещает пропускать такие токены
+
+    """
+    [is_revoked] = await get_tokens_revocation([token], redis)
+
+    if is_revoked:
         raise HTTPException(
-            status.HTTP_403_FORBIDDEN,
-            "токен был выпущен с использованием другого user-agent",
+            status.HTTP_401_UNAUTHORIZED,
+            "токен отозван",
         )
 
-    return token_payload
+    return decode_jwt(token, token_type, request.headers.get("User-Agent"))
+
+
+async def introspect_jwts(
+    tokens: list[TokenIntrospectionRequest],
+    redis: Redis,
+) -> list[TokenIntrospection]:
+    """проверяет пачку jwt-токенов по тем же правилам, что и verify_jwt.
+
+    подпись, тип, срок действия и user-agent проверяются локально,
+    а отзыв всех токенов, прошедших эти проверки, - командой mget, без обращения к базе данных.
+    если отзыв невозможно проверить и политика запрещает пропускать такие токены,
+    вызывающему передается HTTPException из get_tokens_revocation
+
+    Args:
+        tokens (list[TokenIntrospectionRequest]): токены с ожидаемым типом и user-agent клиента
+        redis (Redis): экземпляр redis для проверки отозванных токенов
+
+    Returns:
+        list[TokenIntrospection]: результаты проверки в порядке токенов
+
+    """
+    raw_tokens = [token.token.removeprefix("bearer jwt ") for token in tokens]
+    tokens_payloads: list[JWTPayload | None] = []
+
+    for raw_token, token in zip(raw_tokens, tokens, strict=True):
+        try:
+            tokens_payloads.append(decode_jwt(raw_token, TokenType(token.token_type), token.user_agent))
+
+        except HTTPException:
+            tokens_payloads.append(None)
+
+    decoded_tokens = [raw_token for raw_token, payload in zip(raw_tokens, tokens_payloads, strict=True) if payload]
+    revoked_tokens = iter(await get_tokens_revocation(decoded_tokens, redis))
+
+    return [
+        TokenIntrospection(
+            active=True,
+            token_type=token_payload.token_type,
+            token_subject=token_payload.token_subject,
+            token_expiration=token_payload.token_expiration,
+        )
+        if token_payload and not next(revoked_tokens)
+        else TokenIntrospection(active=False)
+        for token_payload in tokens_payloads
+    ]
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
@@ -150,7 +282,21 @@ def verify_password(password: str, hashed_password: str) -> bool:
         bool: True, если пароли совпадают, иначе False
 
     """
-    return password_crypt_context.verify(password, hashed_password)
+    with tracer.start_as_current_span("bcrypt verify"):
+        return password_crypt_context.verify(password, hashed_password)
+
+
+def password_hash_needs_update(hashed_password: str) -> bool:
+    """проверяет, соответствует ли хеш пароля текущей политике хеширования.
+
+    Args:
+        hashed_password (str): хешированный пароль
+
+    Returns:
+        bool: True, если хеш нужно пересчитать (другая схема или стоимость bcrypt), иначе False
+
+    """
+    return password_crypt_context.needs_update(hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -165,7 +311,38 @@ def get_password_hash(password: str) -> str:
         str: хешированный пароль
 
     """
-    return password_crypt_context.hash(password)
+    with tracer.start_as_current_span("bcrypt hash"):
+        return password_crypt_context.hash(password)
+
+
+service_key_header = APIKeyHeader(
+    name="x-service-key",
+    scheme_name="service key",
+    description="ключ доверенного внутреннего сервиса (SERVICE_API_KEY)",
+    auto_error=False,
+)
+"""заголовок с ключом доверенного внутреннего сервиса, например api-шлюза."""
+
+
+def verify_service_key(service_key: Annotated[str | None, Depends(service_key_header)]) -> None:
+    """проверяет ключ доверенного внутреннего сервиса.
+
+    Args:
+        service_key (str | None): значение заголовка x-service-key
+
+    Raises:
+        HTTPException: если ключ сервиса не настроен, не передан или не совпадает
+
+    """
+    if (
+        settings.SERVICE_API_KEY is None
+        or service_key is None
+        or not secrets.compare_digest(service_key, settings.SERVICE_API_KEY)
+    ):
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN,
+            "эндпоинт доступен только доверенным сервисам",
+        )
 
 
 authentication_token_header = APIKeyHeader(
@@ -0,0 +1,101 @@
+"""модуль запуска приложения в production.
+
+gunicorn запускает SERVER_WORKERS процессов uvicorn (по умолчанию по числу доступных процессору ядер)
+с циклом событий uvloop и парсером http httptools. модули приложения импортируются один раз
+в главном процессе до запуска воркеров (preload), поэтому воркеры стартуют быстрее и делят страницы памяти
+с импортированным кодом. соединения с базой данных, redis и hunter.io открываются лениво,
+а прогрев и фоновые задачи выполняются lifespan каждого воркера уже после его запуска.
+
+по SIGTERM воркер перестает принимать соединения, закрывает потоки событий о новых рефералах
+и до SERVER_DRAIN_TIMEOUT секунд ждет завершения начатых запросов, после чего отменяет оставшиеся
+и выполняет завершение lifespan. gunicorn принудительно завершает воркер через SERVER_SHUTDOWN_TIMEOUT секунд,
+поэтому разница между ними - время на закрытие соединений и выгрузку спанов.
+
+запуск: python -m app.core.server
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import os
+import socket
+import sys
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.arbiter import Arbiter
+from starlette.types import ASGIApp
+from uvicorn import Server
+from uvicorn_worker import UvicornWorker
+
+from app.core.config import settings
+from app.core.referrals_events import referrals_events_hub
+
+
+class DrainingServer(Server):
+    """сервер uvicorn, завершающий бесконечные потоки ответов в начале остановки."""
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        """закрывает потоки событий о новых рефералах и останавливает сервер.
+
+        без этого каждый подключенный подписчик удерживал бы остановку воркера весь SERVER_DRAIN_TIMEOUT
+
+        Args:
+            sockets (list[socket.socket] | None): слушающие сокеты
+
+        """
+        referrals_events_hub.close()
+
+        await super().shutdown(sockets)
+
+
+class ApplicationWorker(UvicornWorker):
+    """воркер gunicorn с uvloop, httptools и мягкой остановкой."""
+
+    CONFIG_KWARGS = {  # noqa: RUF012
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": settings.SERVER_DRAIN_TIMEOUT,
+    }
+
+    async def _serve(self) -> None:
+        # копия UvicornWorker._serve из закрепленной в pyproject.toml версии uvicorn-worker, в которой
+        # вместо Server запускается DrainingServer: воркер не дает другого способа подменить сервер
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+
+class ProductionApplication(BaseApplication):
+    """приложение gunicorn с настройками из settings."""
+
+    def load_config(self) -> None:
+        """задает настройки gunicorn."""
+        for name, value in {
+            "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+            "workers": settings.SERVER_WORKERS or os.process_cpu_count() or 1,
+            "worker_class": ApplicationWorker,
+            "preload_app": True,
+            "keepalive": settings.SERVER_KEEPALIVE_TIMEOUT,
+            "graceful_timeout": settings.SERVER_SHUTDOWN_TIMEOUT,
+            "accesslog": "-",
+        }.items():
+            self.cfg.set(name, value)
+
+    def load(self) -> ASGIApp:
+        """импортирует приложение.
+
+        Returns:
+            ASGIApp: приложение
+
+        """
+        from app.main import app  # noqa: PLC0415
+
+        return app
+
+
+if __name__ == "__main__":
+    ProductionApplication().run()
@@ -0,0 +1,165 @@
+"""модуль ключей подписи jwt-токенов.
+
+при симметричном алгоритме подписи (HS256) токены подписываются и проверяются общим SECRET_KEY.
+при асимметричном алгоритме (EdDSA, ES256) закрытые ключи хранятся в каталоге SIGNING_KEYS_DIRECTORY
+в файлах <kid>.pem: токен подписывается активным ключом и получает его идентификатор в заголовке kid,
+а открытые ключи всех ключей каталога публикуются в jwks, поэтому другие сервисы проверяют токены локально.
+
+ротация ключа выполняется в два шага: новый ключ добавляется в каталог и публикуется в jwks,
+затем становится активным через SIGNING_KEY_ID. старый ключ удаляется из каталога не раньше,
+чем истекут подписанные им токены (REFRESH_TOKEN_TIMEDELTA).
+
+генерация ключа: python -m app.core.signing_keys --algorithm EdDSA
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import json
+import secrets
+from datetime import datetime
+from functools import cache
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt import InvalidKeyError
+from jwt.algorithms import get_default_algorithms, requires_cryptography
+
+from app.core.config import settings
+
+PrivateKey = ec.EllipticCurvePrivateKey | ed25519.Ed25519PrivateKey
+
+
+class SigningKeyring:
+    """набор ключей подписи и проверки jwt-токенов."""
+
+    def __init__(self, algorithm: str, keys_directory: Path, active_key_id: str | None, secret_key: str) -> None:
+        """загружает ключи подписи.
+
+        Args:
+            algorithm (str): алгоритм подписи
+            keys_directory (Path): каталог с закрытыми ключами для асимметричного алгоритма
+            active_key_id (str | None): идентификатор ключа для подписи, по умолчанию - последний по имени
+            secret_key (str): общий секрет для симметричного алгоритма
+
+        Raises:
+            InvalidKeyError: если для асимметричного алгоритма не найден ни один ключ или активный ключ
+
+        """
+        self.algorithm: str = algorithm
+        self.is_asymmetric: bool = algorithm in requires_cryptography
+        self._secret_key: str = secret_key
+        self._private_keys: dict[str, PrivateKey] = {}
+
+        if not self.is_asymmetric:
+            self.active_key_id: str | None = None
+            self.jwks: bytes = json.dumps({"keys": []}).encode()
+
+            return
+
+        for key_path in sorted(keys_directory.glob("*.pem")):
+            self._private_keys[key_path.stem] = serialization.load_pem_private_key(key_path.read_bytes(), password=None)
+
+        if not self._private_keys:
+            message = f"в каталоге {keys_directory} нет ключей подписи для алгоритма {algorithm}"
+            raise InvalidKeyError(message)
+
+        self.active_key_id = active_key_id or max(self._private_keys)
+
+        if self.active_key_id not in self._private_keys:
+            message = f"ключ подписи {self.active_key_id} не найден в каталоге {keys_directory}"
+            raise InvalidKeyError(message)
+
+        jwk_algorithm = get_default_algorithms()[algorithm]
+        self.jwks = json.dumps({
+            "keys": [
+                jwk_algorithm.to_jwk(private_key.public_key(), as_dict=True) | {"kid": key_id, "alg": algorithm, "use": "sig"}
+                for key_id, private_key in self._private_keys.items()
+            ],
+        }).encode()
+
+    @property
+    def signing_key(self) -> PrivateKey | str:
+        """возвращает ключ для подписи токенов."""
+        if not self.is_asymmetric:
+            return self._secret_key
+
+        return self._private_keys[self.active_key_id]
+
+    def verification_key(self, key_id: str | None) -> ec.EllipticCurvePublicKey | ed25519.Ed25519PublicKey | str:
+        """возвращает ключ для проверки подписи токена.
+
+        Args:
+            key_id (str | None): идентификатор ключа из заголовка kid токена
+
+        Returns:
+            ec.EllipticCurvePublicKey | ed25519.Ed25519PublicKey | str: ключ проверки подписи
+
+        Raises:
+            InvalidKeyError: если ключ с таким идентификатором неизвестен или идентификатор не строка
+
+        """
+        if not self.is_asymmetric:
+            return self._secret_key
+
+        # заголовок токена еще не проверен, поэтому kid может оказаться любым значением json, в том числе нехешируемым
+        if not isinstance(key_id, str) or key_id not in self._private_keys:
+            message = f"неизвестный ключ подписи: {key_id}"
+            raise InvalidKeyError(message)
+
+        return self._private_keys[key_id].public_key()
+
+
+@cache
+def get_signing_keyring() -> SigningKeyring:
+    """возвращает набор ключей подписи, загружая его при первом обращении.
+
+    Returns:
+        SigningKeyring: набор ключей подписи
+
+    """
+    return SigningKeyring(
+        settings.SIGNING_ALGORITHM,
+        settings.SIGNING_KEYS_DIRECTORY,
+        settings.SIGNING_KEY_ID,
+        settings.SECRET_KEY,
+    )
+
+
+def generate_signing_key(algorithm: str, keys_directory: Path) -> Path:
+    """создает новый закрытый ключ подписи в каталоге ключей.
+
+    идентификатор ключа начинается с времени создания, поэтому новый ключ - последний по имени
+
+    Args:
+        algorithm (str): алгоритм подписи, EdDSA или ES256
+        keys_directory (Path): каталог с ключами
+
+    Returns:
+        Path: путь к файлу нового ключа
+
+    """
+    private_key = ed25519.Ed25519PrivateKey.generate() if algorithm == "EdDSA" else ec.generate_private_key(ec.SECP256R1())
+
+    key_path = keys_directory / f"{datetime.now():%Y%m%d%H%M%S}-{secrets.token_hex(4)}.pem"
+    keys_directory.mkdir(parents=True, exist_ok=True)
+    key_path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ),
+    )
+    key_path.chmod(0o600)
+
+    return key_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algorithm", choices=["EdDSA", "ES256"], default="EdDSA")
+    parser.add_argument("--directory", type=Path, default=settings.SIGNING_KEYS_DIRECTORY)
+    arguments = parser.parse_args()
+
+    print(generate_signing_key(arguments.algorithm, arguments.directory))  # noqa: T201
@@ -0,0 +1,102 @@
+"""модуль распределенной трассировки.
+
+модуль настраивает opentelemetry: спан на каждый запрос к api, дочерние спаны на каждый запрос sqlalchemy,
+команду redis, запрос httpx (в том числе к hunter.io) и хеширование пароля bcrypt.
+контекст трассировки принимается из заголовка traceparent входящего запроса и передается в исходящие запросы httpx.
+
+спаны экспортируются пачками в фоновом потоке в файл (по строке json на спан) или в коллектор otlp по http,
+поэтому оба варианта работают без внешних сервисов. доля трассируемых запросов задается TRACING_SAMPLING_RATIO,
+а решение о трассировке, пришедшее во входящем traceparent, соблюдается, чтобы трасса не разрывалась между сервисами.
+при TRACING_EXPORTER=none трассировка не настраивается и спаны ничего не стоят.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+from typing import TextIO
+
+from fastapi import FastAPI
+from opentelemetry import trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.instrumentation.redis import RedisInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.core.config import TracingExporter, settings
+from app.core.database import async_database_engine
+
+tracer: trace.Tracer = trace.get_tracer("app")
+"""трассировщик приложения для собственных спанов, без настроенной трассировки ничего не записывает."""
+
+
+def format_span(span: ReadableSpan) -> str:
+    """выводит спан одной строкой json.
+
+    Args:
+        span (ReadableSpan): завершенный спан
+
+    Returns:
+        str: строка json с переводом строки
+
+    """
+    return span.to_json(indent=None) + "\n"
+
+
+def create_span_exporter(traces_file: TextIO | None) -> SpanExporter:
+    """создает экспортер спанов согласно TRACING_EXPORTER.
+
+    Args:
+        traces_file (TextIO | None): открытый файл трасс для экспорта в файл
+
+    Returns:
+        SpanExporter: экспортер спанов
+
+    """
+    if settings.TRACING_EXPORTER == TracingExporter.FILE:
+        return ConsoleSpanExporter(out=traces_file, formatter=format_span)
+
+    return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+
+
+def configure_tracing(application: FastAPI) -> TracerProvider | None:
+    """настраивает трассировку приложения и инструментирует fastapi, sqlalchemy, redis и httpx.
+
+    должна вызываться до запуска приложения, так как добавляет промежуточный слой fastapi
+
+    Args:
+        application (FastAPI): приложение
+
+    Returns:
+        TracerProvider | None: поставщик трассировщиков, который нужно остановить при завершении работы,
+            или None, если трассировка отключена
+
+    """
+    if settings.TRACING_EXPORTER == TracingExporter.NONE:
+        return None
+
+    traces_file = (
+        settings.TRACING_FILE_PATH.open("a", encoding="utf-8") if settings.TRACING_EXPORTER == TracingExporter.FILE else None
+    )
+
+    tracer_provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: settings.DEVELOPMENT_PROJECT_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLING_RATIO)),
+    )
+    tracer_provider.add_span_processor(BatchSpanProcessor(create_span_exporter(traces_file)))
+    trace.set_tracer_provider(tracer_provider)
+
+    FastAPIInstrumentor.instrument_app(
+        application,
+        tracer_provider=tracer_provider,
+        excluded_urls="health,metrics",
+        exclude_spans=["receive", "send"],
+    )
+    SQLAlchemyInstrumentor().instrument(engine=async_database_engine.sync_engine, tracer_provider=tracer_provider)
+    RedisInstrumentor().instrument(tracer_provider=tracer_provider)
+    HTTPXClientInstrumentor().instrument(tracer_provider=tracer_provider)
+
+    return tracer_provider
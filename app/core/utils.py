@@ -1,24 +1,348 @@
 """модуль вспомогательных функций.
 
 модуль содержит вспомогательные функции для проверки валидности email-адресов
-и получения доступного количества верификаций через api hunter.io.
+и получения доступного количества верификаций через api hunter.io, простой кэш в памяти процесса,
+потоковый ответ, закрывающий ресурсы потока, а также генерацию упорядоченных по времени идентификаторов uuidv7.
+
+запросы к hunter.io выполняются общим клиентом с явными таймаутами подключения и чтения,
+повторяются при временных ошибках, могут дублироваться при медленном ответе (hedging)
+и проходят через предохранитель, чтобы при недоступности hunter.io регистрация сразу переходила
+на политику EMAIL_VERIFICATION_FALLBACK_POLICY, а не ждала таймаутов.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
+import asyncio
 import contextlib
+import random
+import secrets
+import statistics
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from datetime import timedelta
+from functools import cache
+from uuid import UUID
 
 import httpx
 from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
+from starlette.types import Receive, Scope, Send
 
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
 from app.core.config import settings
+from app.core.deadline import limit_timeout
+
+UUID7_COUNTER_BITS = 12
+EMAIL_HUNTER_HEDGING_MIN_SAMPLES = 20
+
+uuid7_last_timestamp_ms: int = 0
+uuid7_counter: int = 0
+
+
+def uuid7() -> UUID:
+    """возвращает упорядоченный по времени идентификатор uuidv7 (rfc 9562).
+
+    старшие 48 бит - время в миллисекундах, поэтому новые строки попадают в конец индекса первичного ключа,
+    а не в случайные страницы, как при uuid4. в пределах одной миллисекунды поле rand_a используется
+    как счетчик, начинающийся со случайного значения, поэтому идентификаторы процесса строго возрастают
+
+    Returns:
+        UUID: идентификатор uuidv7
+
+    """
+    global uuid7_last_timestamp_ms, uuid7_counter  # noqa: PLW0603
+
+    timestamp_ms = time.time_ns() // 1_000_000
+
+    if timestamp_ms > uuid7_last_timestamp_ms:
+        uuid7_last_timestamp_ms = timestamp_ms
+        uuid7_counter = secrets.randbits(UUID7_COUNTER_BITS - 1)
+    else:
+        uuid7_counter += 1
+
+        if uuid7_counter >> UUID7_COUNTER_BITS:
+            uuid7_last_timestamp_ms += 1
+            uuid7_counter = 0
+
+    value = (
+        (uuid7_last_timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | uuid7_counter << 64 | 0b10 << 62 | secrets.randbits(62)
+    )
+
+    return UUID(int=value)
+
+
+class TTLCache[KeyType, ValueType]:
+    """кэш в памяти процесса с ограниченным временем жизни и размером.
+
+    при переполнении вытесняются самые старые записи
+    """
+
+    def __init__(self, ttl: timedelta, max_size: int) -> None:
+        """инициализирует кэш.
+
+        Args:
+            ttl (timedelta): время жизни записи
+            max_size (int): максимальное количество записей
+
+        """
+        self._ttl: float = ttl.total_seconds()
+        self._max_size: int = max_size
+        self._entries: dict[KeyType, tuple[float, ValueType]] = {}
+
+    def get_many(self, keys: list[KeyType]) -> dict[KeyType, ValueType]:
+        """возвращает неистекшие значения для переданных ключей.
+
+        Args:
+            keys (list[KeyType]): ключи
+
+        Returns:
+            dict[KeyType, ValueType]: найденные значения, отсутствующие и истекшие ключи не включаются
+
+        """
+        now = time.monotonic()
+
+        return {key: entry[1] for key in keys if (entry := self._entries.get(key)) and entry[0] > now}
+
+    def set_many(self, values: dict[KeyType, ValueType]) -> None:
+        """сохраняет значения в кэш.
+
+        Args:
+            values (dict[KeyType, ValueType]): значения по ключам
+
+        """
+        expires_at = time.monotonic() + self._ttl
+
+        for key, value in values.items():
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value)
+
+        while len(self._entries) > self._max_size:
+            del self._entries[next(iter(self._entries))]
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """потоковый ответ, который закрывает генератор потока и связанные с ним ресурсы.
+
+    ресурсы закрываются при завершении потока, отключении клиента и отмене запроса, а не при сборке мусора генератора,
+    поэтому генератор не должен сам держать ресурсы в async with вокруг yield
+    """
+
+    def __init__(
+        self,
+        content: AsyncGenerator[str],
+        resources: contextlib.AsyncExitStack,
+        *,
+        media_type: str,
+        headers: dict[str, str],
+    ) -> None:
+        """инициализирует ответ.
+
+        Args:
+            content (AsyncGenerator[str]): генератор потока
+            resources (contextlib.AsyncExitStack): ресурсы потока, закрываемые после генератора
+            media_type (str): тип содержимого
+            headers (dict[str, str]): заголовки ответа
+
+        """
+        super().__init__(content, media_type=media_type, headers=headers)
+        self.content: AsyncGenerator[str] = content
+        self.resources: contextlib.AsyncExitStack = resources
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """отправляет поток и закрывает генератор, а затем ресурсы.
+
+        Args:
+            scope (Scope): параметры запроса asgi
+            receive (Receive): получение сообщений asgi
+            send (Send): отправка сообщений asgi
+
+        """
+        async with self.resources, contextlib.aclosing(self.content):
+            await super().__call__(scope, receive, send)
+
+
+class EmailHunterUnavailableError(Exception):
+    """hunter.io не ответил успешно ни на одну из попыток запроса."""
+
+
+EMAIL_HUNTER_RETRYABLE_STATUS_CODES = frozenset({
+    status.HTTP_429_TOO_MANY_REQUESTS,
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    status.HTTP_502_BAD_GATEWAY,
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+    status.HTTP_504_GATEWAY_TIMEOUT,
+})
+
+email_hunter_circuit_breaker = CircuitBreaker(
+    name="email_hunter",
+    failure_threshold=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    recovery_timedelta=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_RECOVERY_TIMEDELTA,
+    half_open_max_calls=1,
+    call_timeout=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_CALL_TIMEOUT,
+    failure_exceptions=(EmailHunterUnavailableError, httpx.HTTPError),
+)
+"""предохранитель для запросов к hunter.io, размыкается после серии запросов, исчерпавших все попытки."""
+
+EMAIL_HUNTER_UNAVAILABLE_ERRORS = (CircuitBreakerOpenError, EmailHunterUnavailableError, httpx.HTTPError, TimeoutError)
+
+email_hunter_latencies: deque[float] = deque(maxlen=settings.EMAIL_HUNTER_HEDGING_LATENCY_WINDOW)
+"""время последних успешных запросов к hunter.io в секундах для вычисления задержки дублирующего запроса."""
+
+
+@cache
+def get_email_hunter_client() -> httpx.AsyncClient:
+    """возвращает общий для процесса клиент hunter.io с явными таймаутами подключения и чтения.
+
+    клиент создается при первом обращении, поэтому к нему применяется инструментирование трассировки
+
+    Returns:
+        httpx.AsyncClient: клиент hunter.io
+
+    """
+    return httpx.AsyncClient(
+        base_url=settings.EMAIL_HUNTER_API_URL,
+        timeout=httpx.Timeout(settings.EMAIL_HUNTER_READ_TIMEOUT, connect=settings.EMAIL_HUNTER_CONNECT_TIMEOUT),
+    )
+
+
+def get_email_hunter_hedging_delay() -> float:
+    """возвращает задержку, после которой отправляется дублирующий запрос к hunter.io.
+
+    задержка равна 95-му перцентилю времени последних успешных запросов,
+    а пока их недостаточно для оценки, - EMAIL_HUNTER_HEDGING_DELAY
+
+    Returns:
+        float: задержка в секундах
+
+    """
+    if len(email_hunter_latencies) < EMAIL_HUNTER_HEDGING_MIN_SAMPLES:
+        return settings.EMAIL_HUNTER_HEDGING_DELAY
+
+    return statistics.quantiles(email_hunter_latencies, n=20)[-1]
+
+
+async def send_email_hunter_request(path: str, params: dict[str, str]) -> httpx.Response:
+    """отправляет один запрос к hunter.io и запоминает время успешного ответа.
+
+    таймауты запроса не превышают оставшееся время обработки текущего запроса к api
+
+    Args:
+        path (str): путь метода api
+        params (dict[str, str]): параметры запроса
+
+    Returns:
+        httpx.Response: ответ hunter.io
+
+    """
+    started_at = time.perf_counter()
+    response = await get_email_hunter_client().get(
+        path,
+        params={**params, "api_key": settings.EMAIL_HUNTER_API_KEY},
+        timeout=httpx.Timeout(
+            limit_timeout(settings.EMAIL_HUNTER_READ_TIMEOUT),
+            connect=limit_timeout(settings.EMAIL_HUNTER_CONNECT_TIMEOUT),
+        ),
+    )
+
+    if response.status_code not in EMAIL_HUNTER_RETRYABLE_STATUS_CODES:
+        email_hunter_latencies.append(time.perf_counter() - started_at)
+
+    return response
+
+
+async def send_hedged_email_hunter_request(path: str, params: dict[str, str]) -> httpx.Response:
+    """отправляет запрос к hunter.io и дублирует его, если ответ не пришел за 95-й перцентиль времени ответа.
+
+    возвращается первый полученный ответ, а оставшийся запрос отменяется. если оба запроса завершились ошибкой,
+    вызывающему передается ошибка последнего из них (httpx.HTTPError).
+    при выключенном EMAIL_HUNTER_HEDGING_ENABLED отправляется один запрос
+
+    Args:
+        path (str): путь метода api
+        params (dict[str, str]): параметры запроса
+
+    Returns:
+        httpx.Response: первый полученный ответ hunter.io
+
+    """
+    if not settings.EMAIL_HUNTER_HEDGING_ENABLED:
+        return await send_email_hunter_request(path, params)
+
+    requests = {asyncio.create_task(send_email_hunter_request(path, params))}
+
+    try:
+        completed_requests, requests = await asyncio.wait(requests, timeout=get_email_hunter_hedging_delay())
+
+        if not completed_requests:
+            requests.add(asyncio.create_task(send_email_hunter_request(path, params)))
+
+        while True:
+            for request in completed_requests:
+                if request.exception() is None:
+                    return request.result()
+
+                failed_request = request
+
+            if not requests:
+                return failed_request.result()
+
+            completed_requests, requests = await asyncio.wait(requests, return_when=asyncio.FIRST_COMPLETED)
+
+    finally:
+        for request in requests:
+            request.cancel()
+
+
+async def request_email_hunter(path: str, params: dict[str, str]) -> httpx.Response:
+    """запрашивает hunter.io с повторными попытками под защитой предохранителя.
+
+    запросы к hunter.io только читают данные, поэтому повторяются при ошибках сети, таймаутах
+    и ответах 429 и 5xx, не больше EMAIL_HUNTER_RETRIES раз, с паузой со случайным разбросом (full jitter),
+    растущей от EMAIL_HUNTER_RETRY_BACKOFF вдвое с каждой попыткой. предохранитель передает вызывающему
+    CircuitBreakerOpenError, если он разомкнут, и TimeoutError, если попытки не уложились
+    в EMAIL_HUNTER_CIRCUIT_BREAKER_CALL_TIMEOUT
+
+    Args:
+        path (str): путь метода api
+        params (dict[str, str]): параметры запроса
+
+    Returns:
+        httpx.Response: ответ hunter.io, который не нужно повторять
+
+    Raises:
+        EmailHunterUnavailableError: если все попытки завершились ошибкой
+
+    """
+    failure = ""
+
+    async with email_hunter_circuit_breaker.guard():
+        for attempt in range(settings.EMAIL_HUNTER_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, settings.EMAIL_HUNTER_RETRY_BACKOFF * 2 ** (attempt - 1)))  # noqa: S311
+
+            try:
+                response = await send_hedged_email_hunter_request(path, params)
+
+            except httpx.TransportError as transport_error:
+                failure = repr(transport_error)
+
+                continue
+
+            if response.status_code not in EMAIL_HUNTER_RETRYABLE_STATUS_CODES:
+                return response
+
+            failure = f"{response.status_code}: {response.text}"
+
+        raise EmailHunterUnavailableError(failure)
 
 
 async def check_email_validity(email: EmailStr) -> bool:
     """проверяет, является ли email действительным.
 
-    используется сервис hunter.io (https://hunter.io/api-documentation/v2)
+    используется сервис hunter.io (https://hunter.io/api-documentation/v2), ошибки недоступности hunter.io
+    (CircuitBreakerOpenError, EmailHunterUnavailableError, TimeoutError) передаются вызывающему из request_email_hunter
 
     Args:
         email (emailstr): email для верификации
@@ -27,65 +351,60 @@ async def check_email_validity(email: EmailStr) -> bool:
         bool: true, если email действительный, иначе - false
 
     Raises:
-        HTTPException: если произошла ошибка при запросе к внешнему api
+        HTTPException: если внешний api отклонил запрос
 
     """
-    url = f"{settings.EMAIL_HUNTER_API_URL}email-verifier?email={email}&api_key={settings.EMAIL_HUNTER_API_KEY}"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
+    response = await request_email_hunter("email-verifier", {"email": email})
 
-        if response.status_code == status.HTTP_200_OK:
-            data = response.json()
+    if response.status_code == status.HTTP_200_OK:
+        data = response.json()
 
-            try:
-                email_status = data.get("data", {}).get("status")
+        try:
+            email_status = data.get("data", {}).get("status")
 
-            except KeyError:
-                raise HTTPException(
-                    status.HTTP_404_NOT_FOUND,
-                    "данные внешнего ресурса были изменены, проверьте документацию",
-                ) from None
+        except KeyError:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND,
+                "данные внешнего ресурса были изменены, проверьте документацию",
+            ) from None
 
-            return email_status == "valid"
+        return email_status == "valid"
 
-        raise HTTPException(response.status_code, f"ошибка при запросе данных по аккаунту ресурса: {response.text}")
+    raise HTTPException(response.status_code, f"ошибка при запросе данных по аккаунту ресурса: {response.text}")
 
 
 async def get_available_verifications_count() -> int:
     """получает количество доступных верификаций email.
 
-    используется сервис hunter.io (https://hunter.io/api-documentation/v2)
+    используется сервис hunter.io (https://hunter.io/api-documentation/v2), ошибки недоступности hunter.io
+    (CircuitBreakerOpenError, EmailHunterUnavailableError, TimeoutError) передаются вызывающему из request_email_hunter
 
     Returns:
         int: количество оставшихся верификаций
 
     Raises:
-        HTTPException: если произошла ошибка при запросе к внешнему api
+        HTTPException: если внешний api отклонил запрос
 
     """
-    url = f"{settings.EMAIL_HUNTER_API_URL}account?api_key={settings.EMAIL_HUNTER_API_KEY}"
+    response = await request_email_hunter("account", {})
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-
-        if response.status_code == status.HTTP_200_OK:
-            data = response.json()
+    if response.status_code == status.HTTP_200_OK:
+        data = response.json()
 
-            try:
-                verifications = data.get("data", {}).get("requests", {}).get("verifications", {})
-                available = verifications.get("available", 0)
-                used = verifications.get("used", 0)
+        try:
+            verifications = data.get("data", {}).get("requests", {}).get("verifications", {})
+            available = verifications.get("available", 0)
+            used = verifications.get("used", 0)
 
-                return int(available) - int(used)
+            return int(available) - int(used)
 
-            except KeyError:
-                raise HTTPException(
-                    status.HTTP_404_NOT_FOUND,
-                    "данные внешнего ресурса были изменены, проверьте документацию",
-                ) from None
+        except KeyError:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND,
+                "данные внешнего ресурса были изменены, проверьте документацию",
+            ) from None
 
-        raise HTTPException(response.status_code, f"ошибка при запросе данных по аккаунту ресурса: {response.text}")
+    raise HTTPException(response.status_code, f"ошибка при запросе данных по аккаунту ресурса: {response.text}")
 
 
 async def inform_host(status: str) -> None:
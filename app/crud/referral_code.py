@@ -1,26 +1,78 @@
 """модуль для создания и управления реферальными кодами.
 
 в этом модуле находится логика для создания реферальных кодов для пользователей.
-он генерирует код, сохраняет его в базе данных и кэширует в redis с указанным временем жизни.
+он генерирует уникальный код, сохраняет его в базе данных и кэширует в redis с указанным временем жизни.
+также модуль содержит прогрев и сверку кэша реферальных кодов в redis с базой данных.
+запросы горячих путей построены один раз при импорте модуля и принимают значения через именованные параметры.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
-import secrets
-import string
+import logging
 from datetime import datetime, timedelta
 
 from fastapi import HTTPException, status
 from redis.asyncio import Redis
+from sqlalchemy import bindparam, delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.models import ReferralCode
+from app.core.config import settings
+from app.core.database import releases_database_connection
+from app.core.redis import (
+    REDIS_UNAVAILABLE_ERRORS,
+    REFERRER_KEY_PATTERN,
+    email_from_referrer_key,
+    mget,
+    redis_circuit_breaker,
+    referrer_key,
+)
+from app.core.referral_code import referral_code_generator
+from app.core.utils import TTLCache, uuid7
+from app.crud.user import invalidate_referrals_versions
+from app.models import ReferralCode, User
 from app.models.referral_code import ReferralCodeCreate
-from app.models.user import UserView
+from app.models.user import UserVerificationStatus, UserView
 
+logger = logging.getLogger(__name__)
 
+referral_codes_fallback_cache: TTLCache[str, str | None] = TTLCache(
+    settings.REFERRAL_CODES_FALLBACK_CACHE_TIMEDELTA,
+    settings.REFERRAL_CODES_FALLBACK_CACHE_MAX_SIZE,
+)
+"""кэш активных реферальных кодов, прочитанных из базы данных, пока redis недоступен."""
+
+insert_referral_code_statement = insert(ReferralCode.__table__).values(
+    id=bindparam("referral_code_id"),
+    code=bindparam("referral_code"),
+    code_expiration=bindparam("referral_code_expiration"),
+    user_id=bindparam("referral_code_user_id"),
+)
+
+upsert_referral_code_statement = insert_referral_code_statement.on_conflict_do_update(
+    index_elements=[ReferralCode.user_id],
+    set_={
+        "code": insert_referral_code_statement.excluded.code,
+        "code_expiration": insert_referral_code_statement.excluded.code_expiration,
+    },
+    where=ReferralCode.code_expiration <= bindparam("now"),
+).returning(ReferralCode.id)
+
+delete_referral_code_statement = (
+    delete(ReferralCode).where(ReferralCode.user_id == bindparam("user_id")).returning(ReferralCode.code_expiration)
+)
+
+active_referral_codes_by_emails_statement = (
+    select(User.email, ReferralCode.code)
+    .join(User, User.id == ReferralCode.user_id)
+    .where(User.email.in_(bindparam("emails", expanding=True)))
+    .where(ReferralCode.code_expiration > bindparam("now"))
+)
+
+
+@releases_database_connection
 async def create_referral_code(
     user: UserView,
     database_session: AsyncSession,
@@ -30,6 +82,9 @@ async def create_referral_code(
     """создает новый реферальный код для пользователя.
 
     сохраняет его в базе данных и кэширует в redis с заданным временем истечения срока.
+    код создается одним запросом insert ... on conflict (user_id) do update ... returning:
+    истекший код пользователя заменяется новым, а активный остается нетронутым,
+    поэтому база данных остается единственным источником истины о наличии активного кода
 
     Args:
         user (userview): пользователь, для которого создается реферальный код
@@ -44,44 +99,58 @@ async def create_referral_code(
         HTTPException: сообщение об ошибке при создании кода
 
     """
-    redis_key: str = f"referrer:{user.email}"
-
-    if await redis.get(redis_key):
+    if user.verification_status != UserVerificationStatus.VERIFIED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="код уже существует",
+            detail="создание реферального кода доступно только после проверки email",
         )
 
-    existing_code = await database_session.scalar(select(ReferralCode).where(ReferralCode.user_id == user.id))
-
-    if existing_code:
-        await database_session.delete(existing_code)
-        await database_session.commit()
+    code = await referral_code_generator.generate(database_session)
 
-    code_characters = string.ascii_letters + string.digits
-    code = "".join(secrets.choice(code_characters) for _ in range(16))
-
-    new_code = ReferralCode(
-        code=code,
-        code_expiration=(datetime.now() + timedelta(hours=code_lifetime.lifetime_in_hours)),
-        user_id=user.id,
-    )
+    now = datetime.now()
+    code_expiration = now + timedelta(hours=code_lifetime.lifetime_in_hours)
 
     try:
-        database_session.add(new_code)
+        code_id = await database_session.scalar(
+            upsert_referral_code_statement,
+            {
+                "referral_code_id": uuid7(),
+                "referral_code": code,
+                "referral_code_expiration": code_expiration,
+                "referral_code_user_id": user.id,
+                "now": now,
+            },
+        )
         await database_session.commit()
-        await database_session.refresh(new_code)
     except IntegrityError as error:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="в базе уже существует сущность или неверно указаны типы",
         ) from error
 
-    await redis.setex(f"referrer:{user.email}", code_lifetime.lifetime_in_hours * 3600, code)
+    if not code_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="код уже существует",
+        )
 
-    return new_code
+    try:
+        async with redis_circuit_breaker.guard():
+            await redis.setex(referrer_key(user.email), code_lifetime.lifetime_in_hours * 3600, code)
+    except REDIS_UNAVAILABLE_ERRORS:
+        logger.warning("redis is unavailable, referral code will be cached by the next reconciliation")
 
+    await invalidate_referrals_versions([user.id, user.referrer_id], redis)
 
+    return ReferralCode(
+        id=code_id,
+        code=code,
+        code_expiration=code_expiration,
+        user_id=user.id,
+    )
+
+
+@releases_database_connection
 async def delete_referral_code(
     user: UserView,
     database_session: AsyncSession,
@@ -89,6 +158,9 @@ async def delete_referral_code(
 ) -> str:
     """удаляет реферальный код для пользователя из базы данных и Redis.
 
+    код удаляется одним запросом delete ... returning, истекший код удаляется тоже,
+    но считается отсутствующим
+
     Args:
         user (UserView): пользователь, для которого удаляется реферальный код
         database_session (AsyncSession): сессия для работы с базой данных
@@ -98,14 +170,182 @@ async def delete_referral_code(
         HTTPException: сообщение об успешном удалении.
 
     """
-    redis_key: str = f"referrer:{user.email}"
+    code_expiration = await database_session.scalar(delete_referral_code_statement, {"user_id": user.id})
+    await database_session.commit()
 
-    if await redis.get(redis_key):
-        await redis.delete(redis_key)
-        existing_code = await database_session.scalar(select(ReferralCode).where(ReferralCode.user_id == user.id))
-        await database_session.delete(existing_code)
-        await database_session.commit()
+    if code_expiration:
+        try:
+            async with redis_circuit_breaker.guard():
+                await redis.delete(referrer_key(user.email))
+        except REDIS_UNAVAILABLE_ERRORS:
+            logger.warning("redis is unavailable, referral code will be evicted by the next reconciliation")
+
+        await invalidate_referrals_versions([user.id, user.referrer_id], redis)
 
+    if code_expiration and code_expiration > datetime.now():
         raise HTTPException(status.HTTP_200_OK, "реферальный код успешно удален")
 
     raise HTTPException(status.HTTP_404_NOT_FOUND, "нет активного реферального кода")
+
+
+@releases_database_connection
+async def get_referral_codes_by_emails(
+    emails: list[str],
+    database_session: AsyncSession,
+    redis: Redis,
+) -> list[str | None]:
+    """возвращает активные реферальные коды пользователей по их email.
+
+    коды читаются из redis одной командой mget (в кластере - одной на шард ключей).
+    если redis недоступен или предохранитель разомкнут, коды читаются из базы данных одним запросом,
+    а результат, включая отсутствие кода,
+    сохраняется в кэше процесса на короткое время, чтобы не перегружать базу данных повторными запросами
+
+    Args:
+        emails (list[str]): email пользователей
+        database_session (AsyncSession): асинхронная сессия базы данных, используется только при недоступности redis
+        redis (Redis): экземпляр redis
+
+    Returns:
+        list[str | None]: реферальные коды в порядке переданных email, None - если активного кода нет
+
+    """
+    try:
+        async with redis_circuit_breaker.guard():
+            codes = await mget(redis, [referrer_key(email) for email in emails])
+
+        return [code.decode() if code else None for code in codes]
+
+    except REDIS_UNAVAILABLE_ERRORS:
+        codes_by_email = referral_codes_fallback_cache.get_many(emails)
+        missing_emails = [email for email in emails if email not in codes_by_email]
+
+        if missing_emails:
+            active_codes = await database_session.execute(
+                active_referral_codes_by_emails_statement,
+                {"emails": missing_emails, "now": datetime.now()},
+            )
+            missing_codes_by_email = dict.fromkeys(missing_emails) | dict(active_codes.tuples().all())
+
+            referral_codes_fallback_cache.set_many(missing_codes_by_email)
+            codes_by_email |= missing_codes_by_email
+
+        return [codes_by_email[email] for email in emails]
+
+
+DELETE_IF_EQUALS_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+async def warm_referral_codes_cache(
+    database_session: AsyncSession,
+    redis: Redis,
+    batch_size: int,
+    *,
+    only_missing: bool = False,
+) -> int:
+    """записывает в redis все активные реферальные коды из базы данных.
+
+    коды читаются потоком вместе с email владельцев и записываются пачками, одна пачка - один конвейер команд redis.
+    время жизни ключа вычисляется из срока действия кода
+
+    Args:
+        database_session (AsyncSession): асинхронная сессия базы данных
+        redis (Redis): экземпляр redis
+        batch_size (int): количество кодов в одной пачке
+        only_missing (bool): записывать только отсутствующие в redis ключи, не перезаписывая существующие
+
+    Returns:
+        int: количество записанных в redis кодов
+
+    """
+    active_codes = await database_session.stream(
+        select(User.email, ReferralCode.code, ReferralCode.code_expiration)
+        .join(User, User.id == ReferralCode.user_id)
+        .where(ReferralCode.code_expiration > datetime.now())
+        .execution_options(yield_per=batch_size),
+    )
+
+    written_codes_count = 0
+
+    async for batch in active_codes.partitions():
+        now = datetime.now()
+
+        async with redis.pipeline(transaction=False) as pipeline:
+            for email, code, code_expiration in batch:
+                code_ttl = timedelta(seconds=int((code_expiration - now).total_seconds()))
+
+                if code_ttl.total_seconds() <= 0:
+                    continue
+
+                if only_missing:
+                    pipeline.set(referrer_key(email), code, ex=code_ttl, nx=True)
+                else:
+                    pipeline.setex(referrer_key(email), code_ttl, code)
+
+            results = await pipeline.execute()
+
+        written_codes_count += sum(1 for result in results if result)
+
+    return written_codes_count
+
+
+async def remove_stale_referral_codes_from_cache(
+    database_session: AsyncSession,
+    redis: Redis,
+    batch_size: int,
+) -> int:
+    """удаляет из redis реферальные коды, которых нет среди активных кодов в базе данных.
+
+    ключи перебираются командой scan пачками (в кластере - на всех ведущих узлах), значения пачки читаются командой mget,
+    а активные коды пачки - одним запросом к базе данных.
+    ключ удаляется скриптом только если его значение не изменилось с момента чтения,
+    поэтому код, созданный во время сверки, не будет удален
+
+    Args:
+        database_session (AsyncSession): асинхронная сессия базы данных
+        redis (Redis): экземпляр redis
+        batch_size (int): количество ключей в одной пачке
+
+    Returns:
+        int: количество удаленных из redis кодов
+
+    """
+    removed_codes_count = 0
+    keys_batch: list[bytes] = []
+
+    async def remove_stale_codes(keys: list[bytes]) -> int:
+        cached_codes = await mget(redis, keys)
+        emails = [email_from_referrer_key(key) for key in keys]
+
+        active_codes = await database_session.execute(
+            active_referral_codes_by_emails_statement,
+            {"emails": emails, "now": datetime.now()},
+        )
+        active_codes_by_email = dict(active_codes.tuples().all())
+
+        async with redis.pipeline(transaction=False) as pipeline:
+            for key, email, cached_code in zip(keys, emails, cached_codes, strict=True):
+                if cached_code is not None and active_codes_by_email.get(email) != cached_code.decode():
+                    # eval, а не evalsha: после переключения ведущего узла кластера на нем может не быть скрипта
+                    pipeline.eval(DELETE_IF_EQUALS_SCRIPT, 1, key, cached_code)
+
+            results = await pipeline.execute()
+
+        return sum(results)
+
+    async for key in redis.scan_iter(match=REFERRER_KEY_PATTERN, count=batch_size):
+        keys_batch.append(key)
+
+        if len(keys_batch) >= batch_size:
+            removed_codes_count += await remove_stale_codes(keys_batch)
+            keys_batch = []
+
+    if keys_batch:
+        removed_codes_count += await remove_stale_codes(keys_batch)
+
+    return removed_codes_count
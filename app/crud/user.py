@@ -1,30 +1,214 @@
 """модуль управления пользователями и реферальной системой.
 
-содержит функции для создания пользователей, аутентификации и получения списка рефералов.
+содержит функции для создания пользователей, аутентификации и получения списка рефералов,
+версии списка рефералов для условных запросов, рейтинга рефереров и истории регистраций рефералов.
+
+версия хранится в redis как случайная метка. любое изменение, влияющее на список рефералов пользователя,
+удаляет метку, а следующее чтение создает новую, поэтому метка никогда не повторяется,
+даже если ключ был вытеснен из redis.
+
+рейтинг рефереров хранится в отсортированном множестве redis: регистрация по реферальному коду
+увеличивает счет реферера на единицу, а полный пересчет из базы данных нужен только для восстановления.
+
+история регистраций рефералов хранится в таблице свертки с количеством регистраций реферера за день,
+которая обновляется в транзакции регистрации, поэтому история читается без обращения к таблице пользователей.
+
+при успешном входе хеш пароля, не соответствующий текущей стоимости bcrypt, пересчитывается,
+а распределение стоимостей хешей по пользователям публикуется в метриках.
+
+запросы горячих путей построены один раз при импорте модуля и принимают значения через именованные параметры,
+поэтому на запрос не тратится время на построение конструкции и вычисление ключа кэша компиляции sqlalchemy.
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from datetime import date
+from uuid import UUID, uuid4
+
 from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
+from sqlalchemy import Date, Select, bindparam, func, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from sqlmodel import select
 
-from app.core.security import get_password_hash, verify_password
-from app.core.utils import check_email_validity
-from app.models import ReferralCode
-from app.models.user import LoginUser, RegisterUser, User, UserReferrals, UserView
+from app.core.config import EmailVerificationFallbackPolicy, EmailVerificationMode, settings
+from app.core.database import database_async_sessionmaker, releases_database_connection
+from app.core.metrics import MetricSample, register_metrics_collector
+from app.core.redis import (
+    REDIS_UNAVAILABLE_ERRORS,
+    REFERRERS_LEADERBOARD_KEY,
+    redis_circuit_breaker,
+    referrals_version_key,
+)
+from app.core.referrals_events import referrals_events_hub
+from app.core.security import get_password_hash, password_hash_needs_update, verify_password
+from app.core.utils import EMAIL_HUNTER_UNAVAILABLE_ERRORS, check_email_validity
+from app.models import ReferralCode, ReferralRegistrationsRollup
+from app.models.referral_analytics import ReferralRegistrationsBucket, ReferralsAnalyticsGranularity
+from app.models.user import (
+    LoginUser,
+    ReferrerRank,
+    RegisterUser,
+    User,
+    UserReferrals,
+    UserVerificationStatus,
+    UserView,
+)
+
+logger = logging.getLogger(__name__)
+
+insert_user_statement = insert(User.__table__).on_conflict_do_nothing(index_elements=[User.email]).returning(User.id)
+
+referrer_id_by_referral_code_statement = select(User.id).where(
+    User.referral_code.has(ReferralCode.code == bindparam("referral_code")),
+)
+
+user_with_referral_code_by_email_statement = (
+    select(User).where(User.email == bindparam("email")).options(joinedload(User.referral_code))
+)
+
+user_with_referral_code_by_id_statement = (
+    select(User).where(User.id == bindparam("user_id")).options(joinedload(User.referral_code))
+)
+
+referrals_with_referral_codes_statement = (
+    select(User).where(User.referrer_id == bindparam("referrer_id")).options(joinedload(User.referral_code)).order_by(User.id)
+)
+
+update_password_hash_statement = (
+    update(User.__table__)
+    .where(User.id == bindparam("user_id"), User.hashed_password == bindparam("current_hashed_password"))
+    .values(hashed_password=bindparam("new_hashed_password"))
+)
+
+password_hashes_rounds_statement = select(
+    func.substr(User.hashed_password, 5, 2).label("rounds"),
+    func.count(),
+).group_by("rounds")
+
+count_referral_registration_statement = (
+    insert(ReferralRegistrationsRollup.__table__)
+    .values(referrer_id=bindparam("referrer_id"), bucket=bindparam("bucket"), registrations_count=1)
+    .on_conflict_do_update(
+        index_elements=[ReferralRegistrationsRollup.referrer_id, ReferralRegistrationsRollup.bucket],
+        set_={"registrations_count": ReferralRegistrationsRollup.registrations_count + 1},
+    )
+)
+
+
+def build_referral_registrations_history_statement(granularity: ReferralsAnalyticsGranularity) -> Select:
+    """строит запрос истории регистраций рефералов с заданной группировкой.
+
+    Args:
+        granularity (ReferralsAnalyticsGranularity): день или неделя
+
+    Returns:
+        Select: запрос с параметрами referrer_id, date_from и date_to
+
+    """
+    bucket = ReferralRegistrationsRollup.bucket
+
+    if granularity == ReferralsAnalyticsGranularity.WEEK:
+        bucket = func.date_trunc("week", bucket).cast(Date)
+
+    return (
+        select(bucket.label("bucket"), func.sum(ReferralRegistrationsRollup.registrations_count))
+        .where(ReferralRegistrationsRollup.referrer_id == bindparam("referrer_id"))
+        .where(ReferralRegistrationsRollup.bucket.between(bindparam("date_from"), bindparam("date_to")))
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+
+
+referral_registrations_history_statements: dict[ReferralsAnalyticsGranularity, Select] = {
+    granularity: build_referral_registrations_history_statement(granularity) for granularity in ReferralsAnalyticsGranularity
+}
+
+
+async def get_referrals_version(user_id: UUID | str, redis: Redis) -> str | None:
+    """возвращает версию списка рефералов пользователя, создавая ее при отсутствии.
+
+    Args:
+        user_id (UUID | str): идентификатор пользователя
+        redis (Redis): экземпляр redis
+
+    Returns:
+        str | None: версия списка рефералов или None, если redis недоступен
+
+    """
+    key = referrals_version_key(user_id)
+    new_version = uuid4().hex
+
+    try:
+        async with redis_circuit_breaker.guard():
+            if await redis.set(key, new_version, nx=True, ex=settings.REFERRALS_VERSION_TIMEDELTA):
+                return new_version
+
+            version = await redis.get(key)
+
+    except REDIS_UNAVAILABLE_ERRORS:
+        return None
 
+    return version.decode() if version else None
 
+
+async def invalidate_referrals_versions(users_ids: Iterable[UUID | None], redis: Redis) -> None:
+    """сбрасывает версии списков рефералов пользователей после изменения, влияющего на эти списки.
+
+    вызывается после фиксации транзакции, поэтому новая версия не может быть выдана для старых данных.
+    если redis недоступен, старая версия остается действительной до истечения REFERRALS_VERSION_TIMEDELTA,
+    поэтому срок жизни версии короткий: он ограничивает время, в течение которого клиент получает 304 для устаревшего списка
+
+    Args:
+        users_ids (Iterable[UUID | None]): идентификаторы пользователей, None пропускаются
+        redis (Redis): экземпляр redis
+
+    """
+    keys = {referrals_version_key(user_id) for user_id in users_ids if user_id}
+
+    if not keys:
+        return
+
+    try:
+        async with redis_circuit_breaker.guard():
+            await redis.delete(*keys)
+
+    except REDIS_UNAVAILABLE_ERRORS:
+        logger.warning("redis is unavailable, referrals versions will expire in %s", settings.REFERRALS_VERSION_TIMEDELTA)
+
+
+@releases_database_connection
 async def create_user(
     user: RegisterUser,
     database_session: AsyncSession,
+    redis: Redis,
 ) -> UserView:
     """создает нового пользователя в базе данных, основываясь на переданных данных для регистрации.
 
+    проверка email во внешнем сервисе и хеширование пароля в отдельном потоке выполняются
+    одновременно с поиском реферера, поэтому регистрация длится примерно столько же, сколько самый медленный шаг.
+    занятость email проверяется самой вставкой (on conflict do nothing), без отдельного запроса
+    и без гонки между проверкой и вставкой.
+    если hunter.io недоступен, регистрация отклоняется, продолжается без проверки email (в статусе unverified)
+    или откладывает проверку воркеру согласно политике EMAIL_VERIFICATION_FALLBACK_POLICY.
+    в асинхронном режиме верификации email пользователь создается в статусе ожидания проверки,
+    а задача на проверку ставится в redis stream до фиксации транзакции,
+    поэтому зарегистрированный пользователь не может остаться без задачи на проверку.
+    регистрация по реферальному коду учитывается в свертке истории регистраций в той же транзакции,
+    а после фиксации публикуется в поток событий о новых рефералах реферера
+
     Args:
         user (RegisterUser): данные для регистрации пользователя (email, password, referral_code (опционально))
         database_session (AsyncSession): асинхронная сессия базы данных
+        redis (Redis): экземпляр redis для постановки задачи на проверку email
+            и обновления версии списка рефералов и рейтинга реферера
 
     Returns:
         UserView: объект, содержащий информацию о созданном пользователе
@@ -32,51 +216,161 @@ async def create_user(
     Raises:
         HTTPException: если пользователь с таким email уже существует или email не прошел проверку (403 forbidden).
             а так же если указан неверный реферальный код (400 bad request)
+            или если hunter.io недоступен, а политика запрещает регистрацию без проверки (503 service unavailable)
 
     """
-    existing_user = await database_session.scalar(select(User).where(User.email == user.email))
+    verify_email_later = settings.EMAIL_VERIFICATION_MODE == EmailVerificationMode.ASYNC
+    verification_status = UserVerificationStatus.PENDING_VERIFICATION if verify_email_later else UserVerificationStatus.VERIFIED
+
+    registration_steps_results = await asyncio.gather(
+        # в асинхронном режиме email проверяет воркер, поэтому шаг сразу считается успешным
+        asyncio.sleep(0, result=True) if verify_email_later else check_email_validity(user.email),
+        asyncio.to_thread(get_password_hash, user.password),
+        get_referrer_id(user.referral_code, database_session),
+        return_exceptions=True,
+    )
 
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="такой пользователь уже есть, email занят",
-        )
+    is_email_valid, hashed_password, referrer_id = registration_steps_results
+
+    if isinstance(is_email_valid, EMAIL_HUNTER_UNAVAILABLE_ERRORS):
+        verification_status = apply_email_verification_fallback_policy(is_email_valid)
+        is_email_valid = True
 
-    if not await check_email_validity(user.email):
+    for registration_step_result in (is_email_valid, hashed_password, referrer_id):
+        if isinstance(registration_step_result, BaseException):
+            raise registration_step_result
+
+    if not is_email_valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="почтовый ящик не является валидным, не сможет получить письмо",
         )
 
-    referrer_data = None
-
-    if user.referral_code:
-        referrer_data = await database_session.scalar(
-            select(User).where(User.referral_code.has(ReferralCode.code == user.referral_code)),
+    if user.referral_code and not referrer_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="реферальный код отозван или введен неверно",
         )
 
-        if not referrer_data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="реферальный код отозван или введен неверно",
-            )
-
     new_user = User(
         email=user.email,
-        hashed_password=get_password_hash(user.password),
-        referrer_id=referrer_data.id if referrer_data else None,
+        hashed_password=hashed_password,
+        referrer_id=referrer_id,
+        verification_status=verification_status,
     )
 
-    database_session.add(new_user)
+    if not await database_session.scalar(insert_user_statement, new_user.model_dump()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="такой пользователь уже есть, email занят",
+        )
+
+    if new_user.referrer_id:
+        await count_referral_registration(new_user.referrer_id, new_user.created_at.date(), database_session)
+
+    if verification_status == UserVerificationStatus.PENDING_VERIFICATION:
+        await redis.xadd(
+            settings.EMAIL_VERIFICATION_STREAM,
+            {"user_id": str(new_user.id), "email": new_user.email},
+            maxlen=settings.EMAIL_VERIFICATION_STREAM_MAXLEN,
+            approximate=True,
+        )
+
     await database_session.commit()
-    await database_session.refresh(new_user)
 
-    return UserView.model_validate(
+    new_user_view = UserView.model_validate(
         new_user,
         update={"referral_code": None},
     )
 
+    if new_user.referrer_id:
+        await increment_referrer_rank(new_user.referrer_id, redis)
+        await invalidate_referrals_versions([new_user.referrer_id], redis)
+        await referrals_events_hub.publish(new_user.referrer_id, new_user_view)
 
+    return new_user_view
+
+
+def apply_email_verification_fallback_policy(unavailable_error: Exception) -> UserVerificationStatus:
+    """применяет политику EMAIL_VERIFICATION_FALLBACK_POLICY, если hunter.io недоступен при регистрации.
+
+    Args:
+        unavailable_error (Exception): ошибка запроса к hunter.io
+
+    Returns:
+        UserVerificationStatus: статус нового пользователя - pending_verification, если проверку email нужно
+            отложить воркеру, или unverified, если пользователь регистрируется без проверки email
+
+    Raises:
+        HTTPException: если политика запрещает регистрацию без проверки email (503 service unavailable)
+
+    """
+    logger.warning(
+        "email verification service is unavailable, applying the %s policy",
+        settings.EMAIL_VERIFICATION_FALLBACK_POLICY,
+        exc_info=unavailable_error,
+    )
+
+    if settings.EMAIL_VERIFICATION_FALLBACK_POLICY == EmailVerificationFallbackPolicy.DENY:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "сервис проверки email недоступен, попробуйте позже",
+        ) from unavailable_error
+
+    if settings.EMAIL_VERIFICATION_FALLBACK_POLICY == EmailVerificationFallbackPolicy.DEFER:
+        return UserVerificationStatus.PENDING_VERIFICATION
+
+    return UserVerificationStatus.UNVERIFIED
+
+
+async def get_referrer_id(referral_code: str | None, database_session: AsyncSession) -> UUID | None:
+    """возвращает идентификатор владельца действующего реферального кода.
+
+    Args:
+        referral_code (str | None): реферальный код, указанный при регистрации
+        database_session (AsyncSession): асинхронная сессия базы данных
+
+    Returns:
+        UUID | None: идентификатор реферера или None, если код не указан, отозван или неверен
+
+    """
+    if not referral_code:
+        return None
+
+    return await database_session.scalar(referrer_id_by_referral_code_statement, {"referral_code": referral_code})
+
+
+async def count_referral_registration(
+    referrer_id: UUID,
+    bucket: date,
+    database_session: AsyncSession,
+) -> None:
+    """учитывает регистрацию реферала в свертке истории регистраций реферера.
+
+    выполняется в транзакции регистрации, поэтому свертка всегда согласована с таблицей пользователей
+
+    Args:
+        referrer_id (UUID): идентификатор реферера
+        bucket (date): день регистрации
+        database_session (AsyncSession): асинхронная сессия базы данных
+
+    """
+    await database_session.execute(
+        count_referral_registration_statement,
+        {"referrer_id": referrer_id, "bucket": bucket},
+    )
+
+
+password_rehashes_total: int = 0
+"""количество хешей паролей, пересчитанных при входе."""
+
+password_hashes_rounds_counts: dict[str, int] = {}
+"""последнее посчитанное количество хешей паролей по стоимости bcrypt."""
+
+password_hashes_rounds_counted_at: float = float("-inf")
+
+
+@releases_database_connection
 async def authenticate_user(
     user: LoginUser,
     database_session: AsyncSession,
@@ -88,22 +382,115 @@ async def authenticate_user(
         database_session (AsyncSession): асинхронная сессия базы данных
 
     Raises:
-        HTTPException: если аутентификация не удалась из-за неверных учетных данных
+        HTTPException: если аутентификация не удалась из-за неверных учетных данных (401 unauthorized)
+            или email пользователя еще не подтвержден или не прошел проверку (403 forbidden)
 
     Returns:
         UserView: объект пользователя без лишних данных
 
     """
-    existing_user = await database_session.scalar(
-        select(User).where(User.email == user.email).options(joinedload(User.referral_code)),
-    )
+    existing_user = await database_session.scalar(user_with_referral_code_by_email_statement, {"email": user.email})
+    # соединение возвращается в пул до проверки пароля: bcrypt выполняется в потоке и не держит транзакцию
+    await database_session.close()
 
-    if not existing_user or not verify_password(user.password, existing_user.hashed_password):
+    if not existing_user or not await asyncio.to_thread(verify_password, user.password, existing_user.hashed_password):
         raise HTTPException(status_code=401, detail="неверный email или пароль")
 
-    return UserView.model_validate(existing_user)
+    if existing_user.verification_status == UserVerificationStatus.PENDING_VERIFICATION:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="email еще проверяется, попробуйте войти позже",
+        )
+
+    if existing_user.verification_status == UserVerificationStatus.REJECTED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="почтовый ящик не является валидным, не сможет получить письмо",
+        )
+
+    user_view = UserView.model_validate(existing_user)
+
+    if password_hash_needs_update(existing_user.hashed_password):
+        await update_password_hash(existing_user.id, existing_user.hashed_password, user.password, database_session)
+
+    return user_view
+
+
+async def update_password_hash(
+    user_id: UUID,
+    current_hashed_password: str,
+    password: str,
+    database_session: AsyncSession,
+) -> bool:
+    """пересчитывает хеш пароля пользователя по текущей политике хеширования.
+
+    хеш заменяется, только если в базе данных все еще хранится прежний хеш,
+    поэтому одновременный пересчет при параллельном входе или смене пароля ничего не перезаписывает
+
+    Args:
+        user_id (UUID): идентификатор пользователя
+        current_hashed_password (str): хеш пароля, с которым был проверен пароль
+        password (str): пароль
+        database_session (AsyncSession): асинхронная сессия базы данных
+
+    Returns:
+        bool: True, если хеш заменен, иначе False
+
+    """
+    global password_rehashes_total  # noqa: PLW0603
+
+    new_hashed_password = await asyncio.to_thread(get_password_hash, password)
+    result = await database_session.execute(
+        update_password_hash_statement,
+        {
+            "user_id": user_id,
+            "current_hashed_password": current_hashed_password,
+            "new_hashed_password": new_hashed_password,
+        },
+    )
+    await database_session.commit()
+
+    if not result.rowcount:
+        return False
+
+    password_rehashes_total += 1
+
+    return True
+
 
+@releases_database_connection
+async def get_user_by_id(
+    user_id: UUID | str,
+    database_session: AsyncSession,
+) -> UserView:
+    """возвращает пользователя вместе с его реферальным кодом.
+
+    Args:
+        user_id (UUID | str): идентификатор пользователя
+        database_session (AsyncSession): асинхронная сессия базы данных
+
+    Returns:
+        UserView: объект пользователя без лишних данных
 
+    Raises:
+        HTTPException: если пользователь не найден (404 not found)
+
+    """
+    user: User | None = await database_session.scalar(user_with_referral_code_by_id_statement, {"user_id": user_id})
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="пользователь не найден",
+        )
+
+    if not user.referral_code:
+        return UserView.model_validate(user, update={"referral_code": None})
+
+    return UserView.model_validate(user)
+
+
+@releases_database_connection
 async def get_user_refferals(
     user: UserView,
     database_session: AsyncSession,
@@ -118,9 +505,7 @@ async def get_user_refferals(
         AsyncSession: объект с количеством и списком рефералов
 
     """
-    referrals = await database_session.scalars(
-        select(User).where(User.referrer_id == user.id).options(joinedload(User.referral_code)),
-    )
+    referrals = await database_session.scalars(referrals_with_referral_codes_statement, {"referrer_id": user.id})
 
     referrals_list = referrals.all()
 
@@ -129,6 +514,280 @@ async def get_user_refferals(
         email=user.email,
         referral_code=user.referral_code,
         referrer_id=user.referrer_id,
+        verification_status=user.verification_status,
         referrals_count=len(referrals_list),
         referrals_list=[UserView.model_validate(userview) for userview in referrals_list],
     )
+
+
+async def set_users_verification_status(
+    verified_users_ids: list[UUID],
+    rejected_users_ids: list[UUID],
+    database_session: AsyncSession,
+    redis: Redis,
+) -> set[UUID]:
+    """фиксирует результаты проверки email пользователей, ожидающих верификации.
+
+    статус меняется только у пользователей в статусе ожидания,
+    поэтому повторная обработка одной и той же задачи ничего не меняет.
+    статус виден в списках рефералов, поэтому версии списков пользователей и их рефереров сбрасываются
+
+    Args:
+        verified_users_ids (list[UUID]): идентификаторы пользователей, email которых прошел проверку
+        rejected_users_ids (list[UUID]): идентификаторы пользователей, email которых не прошел проверку
+        database_session (AsyncSession): асинхронная сессия базы данных
+        redis (Redis): экземпляр redis для сброса версий списков рефералов
+
+    Returns:
+        set[UUID]: идентификаторы пользователей, статус которых был изменен
+
+    """
+    updated_users: dict[UUID, UUID | None] = {}
+
+    for users_ids, verification_status in (
+        (verified_users_ids, UserVerificationStatus.VERIFIED),
+        (rejected_users_ids, UserVerificationStatus.REJECTED),
+    ):
+        if users_ids:
+            updated_users_rows = await database_session.execute(
+                update(User)
+                .where(User.id.in_(users_ids))
+                .where(User.verification_status == UserVerificationStatus.PENDING_VERIFICATION)
+                .values(verification_status=verification_status)
+                .returning(User.id, User.referrer_id),
+            )
+            updated_users.update(updated_users_rows.tuples().all())
+
+    await database_session.commit()
+
+    await invalidate_referrals_versions([*updated_users, *updated_users.values()], redis)
+
+    return set(updated_users)
+
+
+async def increment_referrer_rank(referrer_id: UUID, redis: Redis) -> None:
+    """увеличивает счет реферера в рейтинге после регистрации по его реферальному коду.
+
+    Args:
+        referrer_id (UUID): идентификатор реферера
+        redis (Redis): экземпляр redis
+
+    """
+    try:
+        async with redis_circuit_breaker.guard():
+            await redis.zincrby(REFERRERS_LEADERBOARD_KEY, 1, str(referrer_id))
+
+    except REDIS_UNAVAILABLE_ERRORS:
+        logger.warning("redis is unavailable, referrers leaderboard will be fixed by the next rebuild")
+
+
+async def get_referrers_leaderboard(offset: int, limit: int, redis: Redis) -> list[ReferrerRank]:
+    """возвращает страницу рейтинга рефереров по убыванию количества рефералов.
+
+    Args:
+        offset (int): количество пропускаемых позиций рейтинга
+        limit (int): количество позиций на странице
+        redis (Redis): экземпляр redis
+
+    Returns:
+        list[ReferrerRank]: рефереры страницы с количеством рефералов и местом в рейтинге, начиная с 1
+
+    Raises:
+        HTTPException: если redis недоступен (503 service unavailable)
+
+    """
+    try:
+        async with redis_circuit_breaker.guard():
+            referrers = await redis.zrevrange(REFERRERS_LEADERBOARD_KEY, offset, offset + limit - 1, withscores=True)
+
+    except REDIS_UNAVAILABLE_ERRORS as redis_error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="рейтинг рефереров временно недоступен",
+        ) from redis_error
+
+    return [
+        ReferrerRank(referrer_id=UUID(referrer_id.decode()), referrals_count=int(score), rank=offset + position + 1)
+        for position, (referrer_id, score) in enumerate(referrers)
+    ]
+
+
+async def get_referrer_rank(referrer_id: UUID, redis: Redis) -> ReferrerRank:
+    """возвращает место реферера в рейтинге.
+
+    Args:
+        referrer_id (UUID): идентификатор реферера
+        redis (Redis): экземпляр redis
+
+    Returns:
+        ReferrerRank: количество рефералов и место в рейтинге, начиная с 1
+
+    Raises:
+        HTTPException: если у пользователя нет рефералов (404 not found) или redis недоступен (503 service unavailable)
+
+    """
+    try:
+        # redis-py не поддерживает транзакции конвейера в кластере, там место и счет читаются без атомарности
+        async with (
+            redis_circuit_breaker.guard(),
+            redis.pipeline(transaction=not isinstance(redis, RedisCluster)) as pipeline,
+        ):
+            rank, score = await (
+                pipeline
+                .zrevrank(REFERRERS_LEADERBOARD_KEY, str(referrer_id))
+                .zscore(REFERRERS_LEADERBOARD_KEY, str(referrer_id))
+                .execute()
+            )
+
+    except REDIS_UNAVAILABLE_ERRORS as redis_error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="рейтинг рефереров временно недоступен",
+        ) from redis_error
+
+    if rank is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="у пользователя нет рефералов",
+        )
+
+    return ReferrerRank(referrer_id=referrer_id, referrals_count=int(score), rank=rank + 1)
+
+
+async def rebuild_referrers_leaderboard(
+    database_session: AsyncSession,
+    redis: Redis,
+    batch_size: int,
+) -> int:
+    """пересчитывает рейтинг рефереров из базы данных.
+
+    количество рефералов каждого реферера читается потоком и записывается пачками во временный ключ,
+    который затем атомарно заменяет рейтинг командой rename, поэтому чтения не видят частично пересчитанный рейтинг.
+    регистрации, зафиксированные во время пересчета, могут не попасть в результат до следующего пересчета
+
+    Args:
+        database_session (AsyncSession): асинхронная сессия базы данных
+        redis (Redis): экземпляр redis
+        batch_size (int): количество рефереров в одной пачке
+
+    Returns:
+        int: количество рефереров в рейтинге
+
+    """
+    # хеш-тег оставляет временный ключ в слоте рейтинга, иначе в кластере rename невозможен
+    rebuild_key = f"{{{REFERRERS_LEADERBOARD_KEY}}}:rebuild"
+    await redis.delete(rebuild_key)
+
+    referrals_counts = await database_session.stream(
+        select(User.referrer_id, func.count())
+        .where(User.referrer_id.is_not(None))
+        .group_by(User.referrer_id)
+        .execution_options(yield_per=batch_size),
+    )
+
+    referrers_count = 0
+
+    async for batch in referrals_counts.partitions():
+        await redis.zadd(rebuild_key, {str(referrer_id): referrals_count for referrer_id, referrals_count in batch})
+        referrers_count += len(batch)
+
+    if referrers_count:
+        await redis.rename(rebuild_key, REFERRERS_LEADERBOARD_KEY)
+    else:
+        await redis.delete(REFERRERS_LEADERBOARD_KEY)
+
+    return referrers_count
+
+
+@releases_database_connection
+async def get_referral_registrations_history(
+    referrer_id: UUID | str,
+    date_from: date,
+    date_to: date,
+    granularity: ReferralsAnalyticsGranularity,
+    database_session: AsyncSession,
+) -> list[ReferralRegistrationsBucket]:
+    """возвращает количество регистраций рефералов пользователя по дням или неделям.
+
+    читается только свертка по дням за запрошенный период, недели получаются суммированием дней.
+    периоды без регистраций в результат не попадают
+
+    Args:
+        referrer_id (UUID | str): идентификатор реферера
+        date_from (date): первый день периода
+        date_to (date): последний день периода включительно
+        granularity (ReferralsAnalyticsGranularity): день или неделя
+        database_session (AsyncSession): асинхронная сессия базы данных
+
+    Returns:
+        list[ReferralRegistrationsBucket]: количество регистраций по периодам в хронологическом порядке,
+            неделя обозначается ее понедельником
+
+    Raises:
+        HTTPException: если период задан неверно или слишком длинный (400 bad request)
+
+    """
+    if date_from > date_to or date_to - date_from > settings.REFERRALS_ANALYTICS_MAX_TIMEDELTA:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"период должен быть непустым и не длиннее {settings.REFERRALS_ANALYTICS_MAX_TIMEDELTA.days} дней",
+        )
+
+    registrations = await database_session.execute(
+        referral_registrations_history_statements[granularity],
+        {"referrer_id": referrer_id, "date_from": date_from, "date_to": date_to},
+    )
+
+    return [
+        ReferralRegistrationsBucket(bucket=registrations_bucket, registrations_count=registrations_count)
+        for registrations_bucket, registrations_count in registrations.tuples().all()
+    ]
+
+
+@register_metrics_collector
+async def collect_password_hashes_metrics() -> list[MetricSample]:
+    """собирает распределение стоимостей bcrypt по хешам паролей пользователей и количество пересчетов хешей.
+
+    распределение требует полного просмотра таблицы пользователей, поэтому пересчитывается
+    не чаще раза в PASSWORD_HASHES_METRICS_TIMEDELTA, а при недоступности базы данных отдается последнее значение
+
+    Returns:
+        list[MetricSample]: значения метрик
+
+    """
+    global password_hashes_rounds_counted_at  # noqa: PLW0603
+
+    if time.monotonic() - password_hashes_rounds_counted_at >= settings.PASSWORD_HASHES_METRICS_TIMEDELTA.total_seconds():
+        try:
+            async with database_async_sessionmaker() as database_session:
+                rounds_counts = (await database_session.execute(password_hashes_rounds_statement)).all()
+
+        except Exception:
+            logger.warning("failed to count password hashes rounds", exc_info=True)
+
+        else:
+            password_hashes_rounds_counts.clear()
+            password_hashes_rounds_counts.update({str(int(rounds)): count for rounds, count in rounds_counts})
+            password_hashes_rounds_counted_at = time.monotonic()
+
+    samples = [
+        MetricSample(
+            "password_hashes",
+            "gauge",
+            "количество хешей паролей пользователей по стоимости bcrypt",
+            {"rounds": rounds},
+            float(count),
+        )
+        for rounds, count in password_hashes_rounds_counts.items()
+    ]
+    samples.append(
+        MetricSample(
+            "password_rehashes_total",
+            "counter",
+            "количество хешей паролей, пересчитанных при входе под текущую стоимость bcrypt",
+            {},
+            float(password_rehashes_total),
+        ),
+    )
+
+    return samples
@@ -1,6 +1,6 @@
 """модуль зависимостей для аутентификации пользователей.
 
-содержит зависимости для работы с базой данных, redis и проверки токена доступа
+содержит зависимости для работы с базой данных, redis, проверки токена доступа и ключа доверенного сервиса
 
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
@@ -10,15 +10,14 @@ from typing import Annotated
 from fastapi import Depends, Request
 from fastapi.security import APIKeyHeader
 from redis.asyncio.client import Redis
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_async_database_session
 from app.core.redis import get_redis
-from app.core.security import TokenType, authentication_token_header, verify_jwt
+from app.core.security import TokenType, authentication_token_header, verify_jwt, verify_service_key
+from app.crud.user import get_user_by_id
 from app.models.jwt import JWTPayload
-from app.models.user import User, UserView
+from app.models.user import UserView
 
 AsyncDatabaseSessionDependence = Annotated[AsyncSession, Depends(get_async_database_session)]
 
@@ -26,35 +25,46 @@ AuthenticateTokenDependence = Annotated[APIKeyHeader, Depends(authentication_tok
 
 RedisDependence = Annotated[Redis, Depends(get_redis)]
 
+ServiceKeyDependence = Annotated[None, Depends(verify_service_key)]
 
-async def get_current_authenticated_user(
+
+async def get_current_token_payload(
     token: AuthenticateTokenDependence,
-    database_session: AsyncDatabaseSessionDependence,
     request: Request,
     redis: RedisDependence,
-) -> UserView:
-    """получает текущего аутентифицированного пользователя по токену доступа.
+) -> JWTPayload:
+    """проверяет токен доступа без обращения к базе данных.
 
     Args:
         token: заголовок с токеном авторизации.
-        database_session: асинхронная сессия базы данных.
         request: объект запроса fastapi.
         redis: клиент redis для проверки токена.
 
     Returns:
-        userview: объект пользователя с обновленными данными.
+        jwtpayload: данные из токена доступа.
 
     """
-    token_payload: JWTPayload = await verify_jwt(token[11:], TokenType.ACCESS, request, redis)
+    return await verify_jwt(token[11:], TokenType.ACCESS, request, redis)
+
+
+CurrentTokenPayloadDependence = Annotated[JWTPayload, Depends(get_current_token_payload)]
+
 
-    user: User = await database_session.scalar(
-        select(User).options(selectinload(User.referral_code)).where(User.id == token_payload.token_subject),
-    )
+async def get_current_authenticated_user(
+    token_payload: CurrentTokenPayloadDependence,
+    database_session: AsyncDatabaseSessionDependence,
+) -> UserView:
+    """получает текущего аутентифицированного пользователя по токену доступа.
+
+    Args:
+        token_payload: данные из проверенного токена доступа.
+        database_session: асинхронная сессия базы данных.
 
-    if not user.referral_code:
-        return UserView.model_validate(user, update={"referral_code": None})
+    Returns:
+        userview: объект пользователя с обновленными данными.
 
-    return UserView.model_validate(user)
+    """
+    return await get_user_by_id(token_payload.token_subject, database_session)
 
 
 CurrentAuthenticatedUserDependence = Annotated[UserView, Depends(get_current_authenticated_user)]
@@ -5,31 +5,156 @@
 copyright (c) 2025 vladislav mikhalev, all rights reserved.
 """
 
+import asyncio
 import contextlib
+import logging
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from uuid import UUID
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.openapi.utils import get_openapi
+from redis.asyncio import Redis
+from sqlalchemy import text
 
 from app.api.main import api_router
+from app.core.concurrency_limit import ConcurrencyLimitMiddleware
 from app.core.config import settings
-from app.core.redis import get_redis
+from app.core.database import async_database_engine, database_async_sessionmaker
+from app.core.deadline import DeadlineMiddleware
+from app.core.profiling import RequestProfilingMiddleware
+from app.core.redis import close_redis, get_redis
+from app.core.referrals_events import referrals_events_hub
+from app.core.signing_keys import get_signing_keyring
+from app.core.tracing import configure_tracing
 from app.core.utils import inform_host
+from app.crud.user import authenticate_user, get_referral_registrations_history, get_user_by_id, get_user_refferals
+from app.models.referral_analytics import ReferralsAnalyticsGranularity
+from app.models.user import LoginUser, UserVerificationStatus, UserView
+from app.workers.referral_codes_cache import maintain_referral_codes_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(application: FastAPI, redis: Redis) -> None:
+    """прогревает процесс до приема запросов.
+
+    открывает заданное количество соединений пула базы данных и соединение с redis,
+    выполняет горячие запросы с несуществующими значениями, чтобы sqlalchemy скомпилировала и закэшировала их,
+    и заранее строит openapi-схему
+
+    Args:
+        application (FastAPI): приложение
+        redis (Redis): экземпляр redis
+
+    """
+    async with AsyncExitStack() as connections:
+        database_connections = await asyncio.gather(
+            *(
+                connections.enter_async_context(async_database_engine.connect())
+                for _ in range(settings.POSTGRES_POOL_WARM_UP_CONNECTIONS)
+            ),
+        )
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in database_connections))
+
+    await redis.ping()
+
+    missing_user = UserView(
+        id=UUID(int=0),
+        email="warm-up@example.com",
+        referral_code=None,
+        referrer_id=None,
+        verification_status=UserVerificationStatus.VERIFIED,
+    )
+    today = datetime.now().date()
+
+    async with database_async_sessionmaker() as database_session:
+        for hot_query in (
+            authenticate_user(LoginUser(email=missing_user.email, password="warm-up-password"), database_session),
+            get_user_by_id(missing_user.id, database_session),
+            get_user_refferals(missing_user, database_session),
+            *(
+                get_referral_registrations_history(missing_user.id, today, today, granularity, database_session)
+                for granularity in ReferralsAnalyticsGranularity
+            ),
+        ):
+            with contextlib.suppress(HTTPException):
+                await hot_query
+
+    application.openapi()
+
+
+async def retry_warm_up(application: FastAPI, redis: Redis) -> None:
+    """повторяет прогрев с растущей паузой, пока он не удастся, и затем отмечает процесс готовым.
+
+    Args:
+        application (FastAPI): приложение
+        redis (Redis): экземпляр redis
+
+    """
+    backoff = settings.WARM_UP_RETRY_BACKOFF
+
+    while True:
+        await asyncio.sleep(backoff)
+
+        try:
+            await warm_up(application, redis)
+
+        except Exception:
+            logger.exception("warm up retry failed, the process stays not ready")
+            backoff = min(backoff * 2, settings.WARM_UP_RETRY_MAX_BACKOFF)
+
+        else:
+            application.state.is_warmed_up = True
+            logger.info("warm up retry succeeded, the process is ready")
+
+            return
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+async def lifespan(application: FastAPI) -> AsyncIterator[None]:
     """управляет жизненным циклом приложения.
 
-    выполняет инициализацию redis при запуске и закрывает соединение при завершении работы
+    загружает ключи подписи jwt-токенов, чтобы ошибка в ключах останавливала запуск, а не первый запрос,
+    прогревает процесс и только после успешного прогрева отмечает его готовым для пробы /health/ready
+    (если прогрев не удался, он повторяется в фоне, а проба до его успеха отвечает not_ready),
+    запускает обслуживание кэша реферальных кодов и раздачу событий о новых рефералах при запуске,
+    останавливает их, закрывает соединения и выгружает накопленные спаны при завершении работы
     """
+    get_signing_keyring()
     redis = await get_redis()
+
+    application.state.is_warmed_up = False
+    warm_up_retrying: asyncio.Task[None] | None = None
+
+    try:
+        await warm_up(application, redis)
+    except Exception:
+        logger.exception("warm up failed, the process stays not ready until a retry succeeds")
+        warm_up_retrying = asyncio.create_task(retry_warm_up(application, redis))
+    else:
+        application.state.is_warmed_up = True
+
+    referral_codes_cache_maintenance = asyncio.create_task(maintain_referral_codes_cache(redis))
+    referrals_events_hub.start()
     await inform_host("app started with active redis connection, waiting for requests")
 
     yield
 
-    await redis.close()
+    for background_task in (warm_up_retrying, referral_codes_cache_maintenance):
+        if background_task:
+            background_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await background_task
+
+    await referrals_events_hub.stop()
+    await close_redis()
+    await async_database_engine.dispose()
+
+    if tracer_provider:
+        tracer_provider.shutdown()
+
     await inform_host("app stopped, redis connection closed")
 
 
@@ -45,6 +170,11 @@ app: FastAPI = FastAPI(
 )
 
 app.include_router(api_router)
+app.add_middleware(RequestProfilingMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ConcurrencyLimitMiddleware)
+
+tracer_provider = configure_tracing(app)
 
 
 def custom_openapi() -> dict:
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel
 
+from app.models.referral_analytics import ReferralRegistrationsRollup
 from app.models.referral_code import ReferralCode
 from app.models.user import User
@@ -0,0 +1,7 @@
+from sqlmodel import SQLModel
+
+
+class HealthCheck(SQLModel):
+    status: str
+    database_latency_ms: float | None = None
+    redis_latency_ms: float | None = None
@@ -1,4 +1,6 @@
-from sqlmodel import SQLModel
+from typing import Literal
+
+from sqlmodel import Field, SQLModel
 
 
 class JWT(SQLModel):
@@ -6,6 +8,10 @@ class JWT(SQLModel):
 
 
 class JWTPayload(SQLModel):
+    iss: str
+    sub: str
+    iat: int
+    exp: int
     token_type: str
     token_subject: str
     token_expiration: str
@@ -16,3 +22,16 @@ class JWTsPair(SQLModel):
     tokens_type: str = "bearer jwt"
     access_token: JWT
     refresh_token: JWT
+
+
+class TokenIntrospectionRequest(SQLModel):
+    token: str = Field(regex=r"^(bearer jwt\s)?[\w-]+\.[\w-]+\.[\w-]+$")
+    token_type: Literal["access", "refresh"] = "access"
+    user_agent: str | None
+
+
+class TokenIntrospection(SQLModel):
+    active: bool
+    token_type: str | None = None
+    token_subject: str | None = None
+    token_expiration: str | None = None
@@ -0,0 +1,5 @@
+from sqlmodel import Field, SQLModel
+
+
+class ProfilerArmedPath(SQLModel):
+    path: str = Field(regex=r"^/\S*$", max_length=256)
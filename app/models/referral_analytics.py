@@ -0,0 +1,21 @@
+from datetime import date
+from enum import StrEnum
+from uuid import UUID
+
+from sqlmodel import Field, SQLModel
+
+
+class ReferralsAnalyticsGranularity(StrEnum):
+    DAY = "day"
+    WEEK = "week"
+
+
+class ReferralRegistrationsRollup(SQLModel, table=True):
+    referrer_id: UUID = Field(primary_key=True, foreign_key="user.id")
+    bucket: date = Field(primary_key=True)
+    registrations_count: int = 0
+
+
+class ReferralRegistrationsBucket(SQLModel):
+    bucket: date
+    registrations_count: int
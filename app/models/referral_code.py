@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime
-from uuid import UUID, uuid4
+from uuid import UUID
 
 from pydantic import EmailStr
+from sqlalchemy import Sequence
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.core.utils import uuid7
+
+REFERRAL_CODE_NUMBERS_BLOCK_SIZE = 1000
+
+referral_code_number_sequence = Sequence(
+    "referralcode_number_seq",
+    increment=REFERRAL_CODE_NUMBERS_BLOCK_SIZE,
+    metadata=SQLModel.metadata,
+)
+
 
 class ReferralCode(SQLModel, table=True):
-    id: UUID = Field(primary_key=True, default_factory=uuid4)
+    id: UUID = Field(primary_key=True, default_factory=uuid7)
     code: str = Field(unique=True, max_length=16)
     code_expiration: datetime
-    user_id: UUID = Field(foreign_key="user.id")
+    user_id: UUID = Field(foreign_key="user.id", unique=True)
     user: User = Relationship(back_populates="referral_code")
 
 
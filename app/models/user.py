@@ -1,23 +1,32 @@
-from uuid import UUID, uuid4
+from datetime import datetime
+from enum import StrEnum
+from uuid import UUID
 
 from pydantic import EmailStr
 from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.core.utils import uuid7
 from app.models import ReferralCode
 
 
+class UserVerificationStatus(StrEnum):
+    PENDING_VERIFICATION = "pending_verification"
+    VERIFIED = "verified"
+    UNVERIFIED = "unverified"
+    REJECTED = "rejected"
+
+
 class User(SQLModel, table=True):
-    id: UUID = Field(primary_key=True, default_factory=uuid4)
+    id: UUID = Field(primary_key=True, default_factory=uuid7)
     email: EmailStr = Field(unique=True, max_length=64)
     hashed_password: str = Field(max_length=60)
     referral_code: ReferralCode | None = Relationship(back_populates="user")
     referrer_id: UUID | None
+    verification_status: UserVerificationStatus = UserVerificationStatus.VERIFIED
+    created_at: datetime = Field(default_factory=datetime.now)
 
-    __table_args__ = (
-        Index("user_id_hash_index", "id", postgresql_using="hash"),
-        Index("user_email_hash_index", "email", postgresql_using="hash"),
-    )
+    __table_args__ = (Index("user_email_hash_index", "email", postgresql_using="hash"),)
 
 
 class UserView(SQLModel):
@@ -25,6 +34,7 @@ class UserView(SQLModel):
     email: EmailStr
     referral_code: ReferralCode | None
     referrer_id: UUID | None
+    verification_status: UserVerificationStatus
 
 
 class LoginUser(SQLModel):
@@ -45,6 +55,12 @@ class UserReferrals(UserView):
     referrals_list: list[UserView | None]
 
 
+class ReferrerRank(SQLModel):
+    referrer_id: UUID
+    referrals_count: int
+    rank: int
+
+
 class UserRegistrationsAvailableCount(SQLModel):
     registrations_available_count: int
 
@@ -0,0 +1,260 @@
+"""модуль воркера асинхронной верификации email.
+
+воркер читает задачи на проверку email из redis stream в составе группы потребителей,
+проверяет email пачками с ограничением частоты запросов к hunter.io и фиксирует результат в базе данных.
+задачи, которые не удалось обработать, остаются неподтвержденными и забираются повторно через xautoclaim.
+
+запуск: python -m app.workers.email_verification
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import socket
+import time
+from uuid import UUID
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.core.config import settings
+from app.core.database import database_async_sessionmaker
+from app.core.redis import REDIS_UNAVAILABLE_ERRORS, create_redis_client
+from app.core.utils import EMAIL_HUNTER_UNAVAILABLE_ERRORS, check_email_validity
+from app.crud.user import set_users_verification_status
+
+logger = logging.getLogger(__name__)
+
+StreamMessage = tuple[bytes, dict[bytes, bytes] | None]
+
+
+class RateLimiter:
+    """ограничитель частоты вызовов.
+
+    равномерно распределяет вызовы во времени так,
+    чтобы их частота не превышала заданное количество в секунду
+    """
+
+    def __init__(self, rate: float) -> None:
+        """инициализирует ограничитель.
+
+        Args:
+            rate (float): допустимое количество вызовов в секунду
+
+        """
+        self._interval: float = 1 / rate
+        self._next_call_time: float = 0.0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """ожидает момента, когда очередной вызов не превысит допустимую частоту."""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_call_time - now
+            self._next_call_time = max(now, self._next_call_time) + self._interval
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def verify_email(email: str, rate_limiter: RateLimiter) -> bool | None:
+    """проверяет email с учетом ограничения частоты запросов.
+
+    Args:
+        email (str): email для проверки
+        rate_limiter (RateLimiter): ограничитель частоты запросов к hunter.io
+
+    Returns:
+        bool | None: результат проверки или None, если внешний сервис не ответил корректно
+
+    """
+    await rate_limiter.wait()
+
+    try:
+        return await check_email_validity(email)
+
+    except (HTTPException, *EMAIL_HUNTER_UNAVAILABLE_ERRORS):
+        logger.exception("email verification failed, task will be retried")
+
+        return None
+
+
+def is_orphan_message(message_id: bytes) -> bool:
+    """проверяет, что задача старше допустимого времени ожидания пользователя в базе данных.
+
+    идентификатор сообщения redis stream начинается с времени его добавления в миллисекундах
+
+    Args:
+        message_id (bytes): идентификатор сообщения redis stream
+
+    Returns:
+        bool: true, если задача устарела и ее можно подтвердить без обработки
+
+    """
+    added_at_ms = int(message_id.split(b"-")[0])
+    orphan_timedelta_ms = settings.EMAIL_VERIFICATION_ORPHAN_TIMEDELTA.total_seconds() * 1000
+
+    return time.time() * 1000 - added_at_ms > orphan_timedelta_ms
+
+
+async def process_messages(
+    messages: list[StreamMessage],
+    redis: Redis,
+    rate_limiter: RateLimiter,
+) -> None:
+    """обрабатывает пачку задач на проверку email.
+
+    email проверяются конкурентно в пределах ограничения частоты, результаты фиксируются одной транзакцией,
+    после чего обработанные задачи подтверждаются одной командой xack.
+    задача без изменившегося пользователя подтверждается только если она устарела:
+    пользователь мог быть еще не зафиксирован в базе данных в момент чтения задачи
+
+    Args:
+        messages (list[StreamMessage]): сообщения redis stream
+        redis (Redis): экземпляр redis
+        rate_limiter (RateLimiter): ограничитель частоты запросов к hunter.io
+
+    """
+    deleted_messages_ids = [message_id for message_id, fields in messages if fields is None]
+    tasks = [
+        (message_id, UUID(fields[b"user_id"].decode()), fields[b"email"].decode())
+        for message_id, fields in messages
+        if fields is not None
+    ]
+
+    results = await asyncio.gather(*(verify_email(email, rate_limiter) for _, _, email in tasks))
+
+    verified_users_ids = [user_id for (_, user_id, _), is_valid in zip(tasks, results, strict=True) if is_valid is True]
+    rejected_users_ids = [user_id for (_, user_id, _), is_valid in zip(tasks, results, strict=True) if is_valid is False]
+
+    async with database_async_sessionmaker() as database_session:
+        updated_users_ids = await set_users_verification_status(
+            verified_users_ids,
+            rejected_users_ids,
+            database_session,
+            redis,
+        )
+
+    processed_messages_ids = [
+        message_id
+        for (message_id, user_id, _), is_valid in zip(tasks, results, strict=True)
+        if is_valid is not None and (user_id in updated_users_ids or is_orphan_message(message_id))
+    ]
+
+    if processed_messages_ids or deleted_messages_ids:
+        await redis.xack(
+            settings.EMAIL_VERIFICATION_STREAM,
+            settings.EMAIL_VERIFICATION_CONSUMER_GROUP,
+            *processed_messages_ids,
+            *deleted_messages_ids,
+        )
+
+
+async def create_consumer_group(redis: Redis) -> None:
+    """создает группу потребителей вместе с redis stream, если их еще нет.
+
+    Args:
+        redis (Redis): экземпляр redis
+
+    """
+    with contextlib.suppress(ResponseError):
+        await redis.xgroup_create(
+            settings.EMAIL_VERIFICATION_STREAM,
+            settings.EMAIL_VERIFICATION_CONSUMER_GROUP,
+            id="0",
+            mkstream=True,
+        )
+
+
+async def read_messages(redis: Redis, consumer_name: str, claim_idle_ms: int) -> list[StreamMessage]:
+    """забирает пачку задач на проверку email.
+
+    сначала забираются задачи, зависшие у других потребителей дольше допустимого времени,
+    и только если их нет - новые задачи группы, которых redis ждет до EMAIL_VERIFICATION_READ_BLOCK_TIMEDELTA
+
+    Args:
+        redis (Redis): экземпляр redis
+        consumer_name (str): имя потребителя в группе
+        claim_idle_ms (int): время в миллисекундах, после которого задача другого потребителя считается зависшей
+
+    Returns:
+        list[StreamMessage]: сообщения redis stream
+
+    """
+    claimed = await redis.xautoclaim(
+        settings.EMAIL_VERIFICATION_STREAM,
+        settings.EMAIL_VERIFICATION_CONSUMER_GROUP,
+        consumer_name,
+        claim_idle_ms,
+        count=settings.EMAIL_VERIFICATION_BATCH_SIZE,
+    )
+
+    if messages := claimed[1]:
+        return messages
+
+    response = await redis.xreadgroup(
+        settings.EMAIL_VERIFICATION_CONSUMER_GROUP,
+        consumer_name,
+        {settings.EMAIL_VERIFICATION_STREAM: ">"},
+        count=settings.EMAIL_VERIFICATION_BATCH_SIZE,
+        block=int(settings.EMAIL_VERIFICATION_READ_BLOCK_TIMEDELTA.total_seconds() * 1000),
+    )
+
+    return response[0][1] if response else []
+
+
+async def run_email_verification_worker(consumer_name: str) -> None:
+    """запускает бесконечный цикл обработки задач на проверку email.
+
+    воркер использует собственный клиент redis, время ожидания ответа которого больше времени блокирующего чтения,
+    иначе соединение закрывалось бы раньше, чем redis ответит на xreadgroup. если redis недоступен, воркер не завершается,
+    а повторяет попытку с паузой со случайным разбросом, растущей от EMAIL_VERIFICATION_REDIS_RETRY_BACKOFF вдвое
+    до EMAIL_VERIFICATION_REDIS_RETRY_MAX_BACKOFF, и заново создает группу потребителей на случай,
+    если redis был перезапущен без сохраненных данных. неподтвержденные задачи забираются повторно через xautoclaim
+
+    Args:
+        consumer_name (str): имя потребителя в группе
+
+    """
+    redis = create_redis_client(
+        socket_timeout=settings.EMAIL_VERIFICATION_READ_BLOCK_TIMEDELTA.total_seconds() + settings.REDIS_SOCKET_TIMEOUT,
+    )
+    rate_limiter = RateLimiter(settings.EMAIL_VERIFICATION_RATE_LIMIT)
+    claim_idle_ms = int(settings.EMAIL_VERIFICATION_CLAIM_IDLE_TIMEDELTA.total_seconds() * 1000)
+    retry_backoff = settings.EMAIL_VERIFICATION_REDIS_RETRY_BACKOFF
+    is_consumer_group_created = False
+
+    try:
+        while True:
+            try:
+                if not is_consumer_group_created:
+                    await create_consumer_group(redis)
+                    is_consumer_group_created = True
+
+                if messages := await read_messages(redis, consumer_name, claim_idle_ms):
+                    await process_messages(messages, redis, rate_limiter)
+
+            except REDIS_UNAVAILABLE_ERRORS:
+                logger.exception("email verification tasks are unavailable, retrying in up to %.1f s", retry_backoff)
+
+                await asyncio.sleep(random.uniform(0, retry_backoff))  # noqa: S311
+                retry_backoff = min(retry_backoff * 2, settings.EMAIL_VERIFICATION_REDIS_RETRY_MAX_BACKOFF)
+                is_consumer_group_created = False
+
+            else:
+                retry_backoff = settings.EMAIL_VERIFICATION_REDIS_RETRY_BACKOFF
+
+    finally:
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run_email_verification_worker(f"{socket.gethostname()}-{os.getpid()}"))
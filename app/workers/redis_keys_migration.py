@@ -0,0 +1,176 @@
+"""модуль переноса ключей redis в текущую раскладку с хеш-тегами.
+
+ключи реферальных кодов и отозванных токенов переносятся из прежней раскладки
+(referrer:email, revoked:bearer jwt токен) или из раскладки с другим REDIS_KEY_SHARDS в текущую
+вместе с оставшимся временем жизни. ключ переносится командами dump и restore, поэтому перенос работает
+и между узлами кластера, а ключ, уже записанный приложением в новой раскладке, не перезаписывается.
+версии списков рефералов не переносятся, а удаляются: приложение создаст новые при следующем запросе.
+
+чтобы отозванные токены не стали действительными на время развертывания, команду можно выполнить
+с --keep-old-keys до развертывания (ключи копируются, прежняя версия приложения продолжает их читать)
+и без него сразу после. реферальные коды, удаленные между запусками, исчезнут из redis при ближайшей сверке кэша.
+
+запуск: python -m app.workers.redis_keys_migration [--keep-old-keys] [--batch-size 1000]
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.core.redis import (
+    REFERRALS_VERSION_KEY_PATTERN,
+    REFERRER_KEY_PATTERN,
+    REVOKED_TOKEN_KEY_PATTERN,
+    email_from_referrer_key,
+    get_redis,
+    referrals_version_key,
+    referrer_key,
+    revoked_token_key,
+    token_from_revoked_token_key,
+)
+
+MOVED_KEYS_LAYOUTS: dict[str, Callable[[bytes], str]] = {
+    REFERRER_KEY_PATTERN: lambda key: referrer_key(email_from_referrer_key(key)),
+    REVOKED_TOKEN_KEY_PATTERN: lambda key: revoked_token_key(token_from_revoked_token_key(key)),
+}
+"""шаблоны переносимых ключей и функции, возвращающие ключ в текущей раскладке."""
+
+
+async def move_keys(redis: Redis, keys: list[bytes], target_keys: list[str], *, keep_old_keys: bool) -> int:
+    """переносит ключи под новые имена, сохраняя оставшееся время жизни.
+
+    Args:
+        redis (Redis): экземпляр redis
+        keys (list[bytes]): ключи в прежней раскладке
+        target_keys (list[str]): ключи в текущей раскладке
+        keep_old_keys (bool): не удалять ключи в прежней раскладке
+
+    Returns:
+        int: количество записанных ключей
+
+    Raises:
+        ResponseError: если redis отклонил запись ключа не из-за того, что он уже существует
+
+    """
+    async with redis.pipeline(transaction=False) as pipeline:
+        for key in keys:
+            pipeline.dump(key).pttl(key)
+
+        dumps = await pipeline.execute()
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        for target_key, value, ttl in zip(target_keys, dumps[::2], dumps[1::2], strict=True):
+            # ttl -2 - ключ истек между dump и pttl, -1 - ключ без срока жизни (restore с ttl 0)
+            if value is not None and ttl != -2:  # noqa: PLR2004
+                pipeline.restore(target_key, max(ttl, 0), value)
+
+        results = await pipeline.execute(raise_on_error=False)
+
+    for result in results:
+        if isinstance(result, ResponseError) and not str(result).startswith("BUSYKEY"):
+            raise result
+
+    if not keep_old_keys:
+        await redis.delete(*keys)
+
+    return sum(1 for result in results if not isinstance(result, ResponseError))
+
+
+async def migrate_keys(
+    redis: Redis,
+    pattern: str,
+    target_key: Callable[[bytes], str],
+    batch_size: int,
+    *,
+    keep_old_keys: bool,
+) -> int:
+    """переносит ключи по шаблону, имена которых отличаются от текущей раскладки.
+
+    Args:
+        redis (Redis): экземпляр redis
+        pattern (str): шаблон ключей
+        target_key (Callable[[bytes], str]): функция, возвращающая ключ в текущей раскладке
+        batch_size (int): количество ключей в одной пачке
+        keep_old_keys (bool): не удалять ключи в прежней раскладке
+
+    Returns:
+        int: количество записанных ключей
+
+    """
+    moved_keys_count = 0
+    keys_batch: list[bytes] = []
+    target_keys_batch: list[str] = []
+
+    async for key in redis.scan_iter(match=pattern, count=batch_size):
+        if (new_key := target_key(key)) == key.decode():
+            continue
+
+        keys_batch.append(key)
+        target_keys_batch.append(new_key)
+
+        if len(keys_batch) >= batch_size:
+            moved_keys_count += await move_keys(redis, keys_batch, target_keys_batch, keep_old_keys=keep_old_keys)
+            keys_batch, target_keys_batch = [], []
+
+    if keys_batch:
+        moved_keys_count += await move_keys(redis, keys_batch, target_keys_batch, keep_old_keys=keep_old_keys)
+
+    return moved_keys_count
+
+
+async def remove_outdated_referrals_versions(redis: Redis, batch_size: int) -> int:
+    """удаляет версии списков рефералов в прежней раскладке.
+
+    Args:
+        redis (Redis): экземпляр redis
+        batch_size (int): количество ключей в одной пачке
+
+    Returns:
+        int: количество удаленных ключей
+
+    """
+    outdated_keys = [
+        key
+        async for key in redis.scan_iter(match=REFERRALS_VERSION_KEY_PATTERN, count=batch_size)
+        if referrals_version_key(key.decode().split(":")[1].strip("{}")) != key.decode()
+    ]
+
+    for offset in range(0, len(outdated_keys), batch_size):
+        await redis.delete(*outdated_keys[offset : offset + batch_size])
+
+    return len(outdated_keys)
+
+
+async def main(batch_size: int, *, keep_old_keys: bool) -> None:
+    """переносит ключи redis в текущую раскладку.
+
+    Args:
+        batch_size (int): количество ключей в одной пачке
+        keep_old_keys (bool): не удалять ключи в прежней раскладке
+
+    """
+    redis = await get_redis()
+
+    try:
+        for pattern, target_key in MOVED_KEYS_LAYOUTS.items():
+            moved_keys_count = await migrate_keys(redis, pattern, target_key, batch_size, keep_old_keys=keep_old_keys)
+            print(f"{pattern}: {moved_keys_count} keys written")  # noqa: T201
+
+        if not keep_old_keys:
+            print(f"{await remove_outdated_referrals_versions(redis, batch_size)} referrals versions removed")  # noqa: T201
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keep-old-keys", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    arguments = parser.parse_args()
+
+    asyncio.run(main(arguments.batch_size, keep_old_keys=arguments.keep_old_keys))
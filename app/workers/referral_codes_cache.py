@@ -0,0 +1,141 @@
+"""модуль обслуживания кэша реферальных кодов в redis.
+
+прогрев записывает в redis все активные коды из базы данных, например после перезапуска или очистки redis,
+а сверка периодически устраняет расхождения в обе стороны: дописывает недостающие коды и удаляет лишние.
+при запуске внутри приложения прогрев и сверку в каждый момент выполняет только один процесс,
+что обеспечивается блокировкой в redis.
+
+запуск: python -m app.workers.referral_codes_cache {warm,reconcile}
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.core.database import database_async_sessionmaker
+from app.core.redis import get_redis
+from app.crud.referral_code import remove_stale_referral_codes_from_cache, warm_referral_codes_cache
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_LOCK_KEY = "referral_codes_cache:lock"
+
+
+async def warm(redis: Redis) -> int:
+    """записывает в redis все активные реферальные коды из базы данных.
+
+    Args:
+        redis (Redis): экземпляр redis
+
+    Returns:
+        int: количество записанных кодов
+
+    """
+    async with database_async_sessionmaker() as database_session:
+        return await warm_referral_codes_cache(database_session, redis, settings.REFERRAL_CODES_CACHE_BATCH_SIZE)
+
+
+async def reconcile(redis: Redis) -> tuple[int, int]:
+    """устраняет расхождения между кэшем реферальных кодов и базой данных.
+
+    сначала удаляются коды, которых нет среди активных кодов в базе данных, затем дописываются отсутствующие
+
+    Args:
+        redis (Redis): экземпляр redis
+
+    Returns:
+        tuple[int, int]: количество дописанных и удаленных кодов
+
+    """
+    async with database_async_sessionmaker() as database_session:
+        removed_codes_count = await remove_stale_referral_codes_from_cache(
+            database_session,
+            redis,
+            settings.REFERRAL_CODES_CACHE_BATCH_SIZE,
+        )
+        written_codes_count = await warm_referral_codes_cache(
+            database_session,
+            redis,
+            settings.REFERRAL_CODES_CACHE_BATCH_SIZE,
+            only_missing=True,
+        )
+
+    return written_codes_count, removed_codes_count
+
+
+async def acquire_maintenance_lock(redis: Redis) -> bool:
+    """захватывает блокировку обслуживания кэша на период сверки.
+
+    блокировка не освобождается явно и истекает сама, поэтому за период обслуживание выполняется один раз
+
+    Args:
+        redis (Redis): экземпляр redis
+
+    Returns:
+        bool: true, если блокировка захвачена этим процессом
+
+    """
+    lock_timedelta = settings.REFERRAL_CODES_CACHE_RECONCILE_TIMEDELTA or timedelta(minutes=1)
+
+    return bool(await redis.set(MAINTENANCE_LOCK_KEY, f"{socket.gethostname()}-{os.getpid()}", ex=lock_timedelta, nx=True))
+
+
+async def maintain_referral_codes_cache(redis: Redis) -> None:
+    """фоновая задача приложения: прогрев кэша при запуске и его периодическая сверка.
+
+    Args:
+        redis (Redis): экземпляр redis
+
+    """
+    if settings.REFERRAL_CODES_CACHE_WARM_ON_STARTUP and await acquire_maintenance_lock(redis):
+        try:
+            logger.info("referral codes cache warmed, %s codes written", await warm(redis))
+        except Exception:
+            logger.exception("referral codes cache warm up failed")
+
+    if settings.REFERRAL_CODES_CACHE_RECONCILE_TIMEDELTA is None:
+        return
+
+    while True:
+        await asyncio.sleep(settings.REFERRAL_CODES_CACHE_RECONCILE_TIMEDELTA.total_seconds())
+
+        if not await acquire_maintenance_lock(redis):
+            continue
+
+        try:
+            logger.info("referral codes cache reconciled, %s codes written, %s codes removed", *await reconcile(redis))
+        except Exception:
+            logger.exception("referral codes cache reconciliation failed")
+
+
+async def main(command: str) -> None:
+    """выполняет прогрев или сверку кэша реферальных кодов.
+
+    Args:
+        command (str): warm или reconcile
+
+    """
+    redis = await get_redis()
+
+    try:
+        if command == "warm":
+            print(f"{await warm(redis)} codes written")  # noqa: T201
+        else:
+            print("{} codes written, {} codes removed".format(*await reconcile(redis)))  # noqa: T201
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["warm", "reconcile"])
+
+    asyncio.run(main(parser.parse_args().command))
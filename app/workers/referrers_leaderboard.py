@@ -0,0 +1,37 @@
+"""модуль пересчета рейтинга рефереров.
+
+рейтинг поддерживается регистрациями инкрементально, а пересчет из базы данных нужен
+для первоначального заполнения и восстановления после очистки redis или его недоступности.
+
+запуск: python -m app.workers.referrers_leaderboard
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+
+from app.core.config import settings
+from app.core.database import database_async_sessionmaker
+from app.core.redis import get_redis
+from app.crud.user import rebuild_referrers_leaderboard
+
+
+async def main() -> None:
+    """пересчитывает рейтинг рефереров из базы данных."""
+    redis = await get_redis()
+
+    try:
+        async with database_async_sessionmaker() as database_session:
+            referrers_count = await rebuild_referrers_leaderboard(
+                database_session,
+                redis,
+                settings.REFERRERS_LEADERBOARD_BATCH_SIZE,
+            )
+
+        print(f"{referrers_count} referrers ranked")  # noqa: T201
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+"""бенчмарк устойчивости запросов к hunter.io.
+
+запускает локальный поддельный hunter.io, который добавляет задержку и отвечает ошибками с заданной вероятностью,
+и проверяет email через check_email_validity в сценариях: здоровый сервис, медленный хвост ответов
+без дублирующих запросов и с ними, доля ответов 503 без повторов и с повторами, полная недоступность.
+для каждого сценария печатаются перцентили времени проверки и количество проверок по результату.
+
+запуск: python -m benchmarks.email_hunter_resilience --count 600
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import statistics
+import time
+from collections import Counter
+from typing import Any, NamedTuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Response, status
+
+from app.core import utils
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+FAKE_EMAIL_HUNTER_PORT = 18765
+
+
+class FakeEmailHunterBehaviour(NamedTuple):
+    """поведение поддельного hunter.io."""
+
+    latency: float
+    slow_latency: float
+    slow_ratio: float
+    error_ratio: float
+
+
+class Scenario(NamedTuple):
+    """сценарий замера."""
+
+    name: str
+    behaviour: FakeEmailHunterBehaviour
+    settings_overrides: dict[str, Any]
+
+
+fake_email_hunter_behaviour = FakeEmailHunterBehaviour(latency=0.02, slow_latency=0.02, slow_ratio=0.0, error_ratio=0.0)
+
+fake_email_hunter = FastAPI()
+
+
+@fake_email_hunter.get("/email-verifier")
+async def verify_email() -> Response:
+    """отвечает как hunter.io с задержкой и ошибками согласно fake_email_hunter_behaviour.
+
+    Returns:
+        Response: ответ hunter.io или ошибка 503
+
+    """
+    behaviour = fake_email_hunter_behaviour
+    is_slow = random.random() < behaviour.slow_ratio  # noqa: S311
+
+    await asyncio.sleep(behaviour.slow_latency if is_slow else behaviour.latency)
+
+    if random.random() < behaviour.error_ratio:  # noqa: S311
+        return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    return Response('{"data": {"status": "valid"}}', media_type="application/json")
+
+
+class FakeEmailHunterServer(uvicorn.Server):
+    """сервер поддельного hunter.io, сообщающий о готовности принимать соединения."""
+
+    def __init__(self, config: uvicorn.Config) -> None:
+        """инициализирует сервер.
+
+        Args:
+            config (uvicorn.Config): настройки сервера
+
+        """
+        super().__init__(config)
+        self.started_event: asyncio.Event = asyncio.Event()
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        """запускает сервер и, если он начал принимать соединения, выставляет started_event.
+
+        Args:
+            sockets (list[socket.socket] | None): открытые заранее сокеты
+
+        """
+        await super().startup(sockets)
+
+        if self.started:
+            self.started_event.set()
+
+
+async def run_scenario(scenario: Scenario, count: int, concurrency: int) -> None:
+    """проверяет email заданное количество раз и печатает распределение времени и результатов.
+
+    Args:
+        scenario (Scenario): сценарий
+        count (int): количество проверок
+        concurrency (int): количество одновременных проверок
+
+    """
+    global fake_email_hunter_behaviour  # noqa: PLW0603
+
+    fake_email_hunter_behaviour = scenario.behaviour
+    original_settings = {name: getattr(settings, name) for name in scenario.settings_overrides}
+
+    for name, value in scenario.settings_overrides.items():
+        setattr(settings, name, value)
+
+    utils.email_hunter_latencies.clear()
+    utils.email_hunter_circuit_breaker = CircuitBreaker(
+        name=f"email_hunter_{scenario.name}",
+        failure_threshold=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        recovery_timedelta=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_RECOVERY_TIMEDELTA,
+        half_open_max_calls=1,
+        call_timeout=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_CALL_TIMEOUT,
+        failure_exceptions=(utils.EmailHunterUnavailableError, httpx.HTTPError),
+    )
+
+    durations: list[float] = []
+    results: Counter[str] = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check() -> None:
+        async with semaphore:
+            started_at = time.perf_counter()
+
+            try:
+                await utils.check_email_validity("benchmark@example.com")
+                results["valid"] += 1
+
+            except utils.EMAIL_HUNTER_UNAVAILABLE_ERRORS as unavailable_error:
+                results[type(unavailable_error).__name__] += 1
+
+            durations.append(time.perf_counter() - started_at)
+
+    await asyncio.gather(*(check() for _ in range(count)))
+
+    for name, value in original_settings.items():
+        setattr(settings, name, value)
+
+    p50, p95, p99 = (statistics.quantiles(durations, n=100)[percentile - 1] * 1000 for percentile in (50, 95, 99))
+    print(  # noqa: T201
+        f"{scenario.name}: p50 {p50:,.0f} ms, p95 {p95:,.0f} ms, p99 {p99:,.0f} ms, {dict(results)}",
+    )
+
+
+async def main(count: int, concurrency: int) -> None:
+    """запускает поддельный hunter.io и все сценарии.
+
+    Args:
+        count (int): количество проверок в сценарии
+        concurrency (int): количество одновременных проверок
+
+    """
+    server = FakeEmailHunterServer(uvicorn.Config(fake_email_hunter, port=FAKE_EMAIL_HUNTER_PORT, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    await server.started_event.wait()
+
+    settings.EMAIL_HUNTER_API_URL = f"http://127.0.0.1:{FAKE_EMAIL_HUNTER_PORT}/"
+    tail = FakeEmailHunterBehaviour(latency=0.02, slow_latency=1.0, slow_ratio=0.03, error_ratio=0.0)
+    errors = FakeEmailHunterBehaviour(latency=0.02, slow_latency=0.02, slow_ratio=0.0, error_ratio=0.2)
+    outage = FakeEmailHunterBehaviour(latency=0.02, slow_latency=0.02, slow_ratio=0.0, error_ratio=1.0)
+
+    for scenario in (
+        Scenario("healthy", fake_email_hunter_behaviour, {}),
+        Scenario("slow tail", tail, {"EMAIL_HUNTER_HEDGING_ENABLED": False}),
+        Scenario("slow tail, hedging", tail, {"EMAIL_HUNTER_HEDGING_ENABLED": True}),
+        Scenario("20% 503, no retries", errors, {"EMAIL_HUNTER_RETRIES": 0}),
+        Scenario("20% 503, retries", errors, {}),
+        Scenario("outage", outage, {}),
+    ):
+        await run_scenario(scenario, count, concurrency)
+
+    await utils.get_email_hunter_client().aclose()
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=4)
+    arguments = parser.parse_args()
+
+    asyncio.run(main(arguments.count, arguments.concurrency))
@@ -0,0 +1,126 @@
+"""бенчмарк накладных расходов на построение и компиляцию запросов горячих путей.
+
+сравнивает на запросе пользователя с реферальным кодом по email (вход в систему):
+- построение запроса и вычисление ключа кэша компиляции sqlalchemy на каждый вызов и готовый запрос модуля crud;
+- полную компиляцию запроса в sql, которую кэш компиляции sqlalchemy выполняет один раз;
+- выполнение запроса в базе данных из настроек приложения: построение запроса на каждый вызов,
+  готовый запрос, готовый запрос без кэша подготовленных запросов asyncpg.
+
+запуск: python -m benchmarks.query_compilation --count 10000
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.database import async_database_engine, database_async_sessionmaker
+from app.crud.user import user_with_referral_code_by_email_statement
+from app.models.user import User
+
+EMAIL = "benchmark@example.com"
+
+
+def build_statement() -> object:
+    """строит запрос так же, как crud до выноса запросов на уровень модуля.
+
+    Returns:
+        object: запрос пользователя с реферальным кодом по email
+
+    """
+    return select(User).where(User.email == EMAIL).options(joinedload(User.referral_code))
+
+
+def measure(name: str, call: Callable[[], object], count: int) -> None:
+    """вызывает функцию заданное количество раз и печатает время одного вызова.
+
+    Args:
+        name (str): название замера
+        call (Callable[[], object]): замеряемая функция
+        count (int): количество вызовов
+
+    """
+    started_at = time.perf_counter()
+
+    for _ in range(count):
+        call()
+
+    print(f"{name}: {(time.perf_counter() - started_at) / count * 1e6:,.1f} us/call")  # noqa: T201
+
+
+async def measure_async(name: str, call: Callable[[], Awaitable[object]], count: int) -> None:
+    """вызывает асинхронную функцию заданное количество раз после прогрева и печатает время одного вызова.
+
+    Args:
+        name (str): название замера
+        call (Callable[[], Awaitable[object]]): замеряемая функция
+        count (int): количество вызовов
+
+    """
+    for _ in range(min(count, 100)):
+        await call()
+
+    started_at = time.perf_counter()
+
+    for _ in range(count):
+        await call()
+
+    print(f"{name}: {(time.perf_counter() - started_at) / count * 1e6:,.1f} us/call")  # noqa: T201
+
+
+async def main() -> None:
+    """запускает бенчмарк."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=10_000)
+    arguments = parser.parse_args()
+
+    dialect = async_database_engine.dialect
+
+    print("python side, per request")  # noqa: T201
+    measure("  build statement + cache key", lambda: build_statement()._generate_cache_key(), arguments.count)  # noqa: SLF001
+    measure(
+        "  module-level statement cache key",
+        user_with_referral_code_by_email_statement._generate_cache_key,  # noqa: SLF001
+        arguments.count,
+    )
+    measure("  full compilation (cache miss)", lambda: build_statement().compile(dialect=dialect), arguments.count // 10)
+
+    unprepared_engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        connect_args={"prepared_statement_cache_size": 0},
+    )
+    unprepared_sessionmaker = async_sessionmaker(unprepared_engine, class_=AsyncSession)
+
+    print("end to end, per request")  # noqa: T201
+
+    try:
+        async with database_async_sessionmaker() as database_session, unprepared_sessionmaker() as unprepared_session:
+            await measure_async(
+                "  build statement",
+                lambda: database_session.scalar(build_statement()),
+                arguments.count,
+            )
+            await measure_async(
+                "  module-level statement",
+                lambda: database_session.scalar(user_with_referral_code_by_email_statement, {"email": EMAIL}),
+                arguments.count,
+            )
+            await measure_async(
+                "  module-level statement without prepared statements cache",
+                lambda: unprepared_session.scalar(user_with_referral_code_by_email_statement, {"email": EMAIL}),
+                arguments.count,
+            )
+    finally:
+        await unprepared_engine.dispose()
+        await async_database_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""бенчмарк генерации реферальных кодов.
+
+сравнивает пропускную способность генерации кодов ключевой перестановкой номеров
+с прежней генерацией через secrets.choice и проверяет, что среди сгенерированных кодов нет повторов,
+то есть ни один код не привел бы к нарушению уникального индекса referralcode.code.
+
+запуск: python -m benchmarks.referral_code_generation --count 1000000
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import math
+import re
+import secrets
+import time
+from collections.abc import Callable
+
+from app.core.referral_code import REFERRAL_CODE_ALPHABET, REFERRAL_CODE_LENGTH, ReferralCodeGenerator
+from app.models.referral_code import REFERRAL_CODE_NUMBERS_BLOCK_SIZE
+
+REFERRAL_CODE_PATTERN = re.compile(r"^[a-zA-Z0-9]{16}$")
+
+
+def measure(name: str, generate: Callable[[int], str], count: int) -> None:
+    """генерирует заданное количество кодов и печатает пропускную способность и число повторов.
+
+    Args:
+        name (str): название способа генерации
+        generate (Callable[[int], str]): функция, возвращающая код по порядковому номеру
+        count (int): количество кодов
+
+    """
+    started_at = time.perf_counter()
+    codes = [generate(number) for number in range(count)]
+    elapsed = time.perf_counter() - started_at
+
+    assert all(REFERRAL_CODE_PATTERN.match(code) for code in codes)  # noqa: S101
+
+    print(  # noqa: T201
+        f"{name}: {count / elapsed:,.0f} codes/s, unique violations: {count - len(set(codes))}",
+    )
+
+
+def main() -> None:
+    """запускает бенчмарк."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    arguments = parser.parse_args()
+
+    generator = ReferralCodeGenerator(secrets.token_hex(32))
+
+    measure(
+        "secrets.choice",
+        lambda _: "".join(secrets.choice(REFERRAL_CODE_ALPHABET) for _ in range(REFERRAL_CODE_LENGTH)),
+        arguments.count,
+    )
+    measure("keyed permutation", generator.encode, arguments.count)
+
+    print(  # noqa: T201
+        f"sequence round trips for keyed permutation: {math.ceil(arguments.count / REFERRAL_CODE_NUMBERS_BLOCK_SIZE)}",
+    )
+
+
+if __name__ == "__main__":
+    main()
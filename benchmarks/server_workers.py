@@ -0,0 +1,162 @@
+"""бенчмарк пропускной способности сервера в зависимости от числа процессов.
+
+для каждого числа процессов запускает production-сервер (python -m app.core.server) на отдельном порту,
+ждет готовности и нагружает заданный путь из нескольких процессов нагрузки, каждый из которых держит
+свою долю одновременных запросов. печатаются запросы в секунду, перцентили времени ответа
+и количество ответов по коду. сервер останавливается через SIGTERM, как при развертывании.
+
+нагрузка создается на той же машине, поэтому ей нужны свои ядра: рост прекращается, когда процессы сервера
+и процессы нагрузки вместе занимают все ядра. для замеров ближе к реальности стоит нагружать сервер с другой машины.
+
+запуск: python -m benchmarks.server_workers --workers 1 2 4 --path /health/live
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+BENCHMARK_PORT = 18780
+
+
+async def wait_until_ready(base_url: str) -> None:
+    """ждет, пока сервер не ответит на пробу готовности.
+
+    Args:
+        base_url (str): адрес сервера
+
+    """
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/health/ready")).is_success:
+                    return
+
+            except httpx.TransportError:
+                pass
+
+            await asyncio.sleep(0.2)
+
+
+async def generate_load(base_url: str, path: str, concurrency: int, duration: float) -> tuple[list[float], Counter[int]]:
+    """отправляет запросы к пути, пока не истечет время нагрузки.
+
+    Args:
+        base_url (str): адрес сервера
+        path (str): нагружаемый путь
+        concurrency (int): количество одновременных запросов
+        duration (float): длительность нагрузки в секундах
+
+    Returns:
+        tuple[list[float], Counter[int]]: время ответов в секундах и количество ответов по коду
+
+    """
+    latencies: list[float] = []
+    status_codes: Counter[int] = Counter()
+    finish_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+
+        async def send_requests() -> None:
+            while (started_at := time.monotonic()) < finish_at:
+                try:
+                    status_codes[(await client.get(path)).status_code] += 1
+
+                except httpx.TransportError:
+                    status_codes[0] += 1
+
+                latencies.append(time.monotonic() - started_at)
+
+        await asyncio.gather(*(send_requests() for _ in range(concurrency)))
+
+    return latencies, status_codes
+
+
+def run_load_process(base_url: str, path: str, concurrency: int, duration: float) -> tuple[list[float], Counter[int]]:
+    """запускает нагрузку в отдельном процессе.
+
+    Args:
+        base_url (str): адрес сервера
+        path (str): нагружаемый путь
+        concurrency (int): количество одновременных запросов процесса
+        duration (float): длительность нагрузки в секундах
+
+    Returns:
+        tuple[list[float], Counter[int]]: время ответов в секундах и количество ответов по коду
+
+    """
+    return asyncio.run(generate_load(base_url, path, concurrency, duration))
+
+
+def measure(workers: int, path: str, concurrency: int, duration: float, load_processes: int) -> None:
+    """запускает сервер с заданным числом процессов, нагружает его и печатает результат.
+
+    Args:
+        workers (int): число процессов сервера
+        path (str): нагружаемый путь
+        concurrency (int): общее количество одновременных запросов
+        duration (float): длительность нагрузки в секундах
+        load_processes (int): число процессов нагрузки
+
+    """
+    base_url = f"http://127.0.0.1:{BENCHMARK_PORT}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.core.server"],
+        env={
+            **os.environ,
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(BENCHMARK_PORT),
+            "SERVER_WORKERS": str(workers),
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        asyncio.run(asyncio.wait_for(wait_until_ready(base_url), 60))
+        # короткий прогон, чтобы все процессы сервера открыли соединения и прогрели горячие пути
+        run_load_process(base_url, path, concurrency, 1.0)
+
+        with ProcessPoolExecutor(load_processes) as executor:
+            load = [
+                executor.submit(run_load_process, base_url, path, max(concurrency // load_processes, 1), duration)
+                for _ in range(load_processes)
+            ]
+            results = [load_process.result() for load_process in load]
+
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    latencies = [latency for process_latencies, _ in results for latency in process_latencies]
+    status_codes = sum((process_status_codes for _, process_status_codes in results), Counter())
+    p50, p99 = (statistics.quantiles(latencies, n=100)[percentile - 1] * 1000 for percentile in (50, 99))
+
+    print(  # noqa: T201
+        f"{workers} workers: {len(latencies) / duration:,.0f} requests/s, "
+        f"p50 {p50:,.1f} ms, p99 {p99:,.1f} ms, {dict(status_codes)}",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health/live")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--load-processes", type=int, default=os.process_cpu_count() or 1)
+    arguments = parser.parse_args()
+
+    for workers in arguments.workers:
+        measure(workers, arguments.path, arguments.concurrency, arguments.duration, arguments.load_processes)
@@ -0,0 +1,84 @@
+"""бенчмарк первичных ключей uuid4 и uuidv7.
+
+вставляет одинаковое количество строк пачками в две таблицы, отличающиеся только способом генерации
+первичного ключа, и сравнивает пропускную способность вставки и размер индекса первичного ключа:
+случайные ключи uuid4 расщепляют страницы по всему индексу и оставляют их заполненными наполовину,
+а ключи uuidv7 дописываются в конец индекса. таблицы создаются в базе данных из настроек приложения
+и удаляются после замера.
+
+запуск: python -m benchmarks.uuid_primary_keys --count 1000000
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections.abc import Callable
+
+from sqlalchemy import Column, MetaData, Table, Text, Uuid, insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.database import async_database_engine
+from app.core.utils import uuid7
+
+
+async def measure(
+    engine: AsyncEngine,
+    name: str,
+    generate_id: Callable[[], uuid.UUID],
+    count: int,
+    batch_size: int,
+) -> None:
+    """вставляет строки в отдельную таблицу и печатает пропускную способность и размер индекса.
+
+    Args:
+        engine (AsyncEngine): асинхронный движок базы данных
+        name (str): название способа генерации, используется в имени таблицы
+        generate_id (Callable[[], uuid.UUID]): функция генерации первичного ключа
+        count (int): количество строк
+        batch_size (int): количество строк в одной транзакции
+
+    """
+    table = Table(f"benchmark_{name}", MetaData(), Column("id", Uuid, primary_key=True), Column("payload", Text))
+
+    async with engine.begin() as connection:
+        await connection.run_sync(table.drop, checkfirst=True)
+        await connection.run_sync(table.create)
+
+    started_at = time.perf_counter()
+
+    for offset in range(0, count, batch_size):
+        rows = [{"id": generate_id(), "payload": "x" * 32} for _ in range(min(batch_size, count - offset))]
+
+        async with engine.begin() as connection:
+            await connection.execute(insert(table), rows)
+
+    elapsed = time.perf_counter() - started_at
+
+    async with engine.begin() as connection:
+        index_size = await connection.scalar(text(f"SELECT pg_relation_size('{table.name}_pkey')"))
+        await connection.run_sync(table.drop)
+
+    print(  # noqa: T201
+        f"{name}: {count / elapsed:,.0f} rows/s, primary key index: {index_size / 2**20:,.1f} MiB",
+    )
+
+
+async def main() -> None:
+    """запускает бенчмарк."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    arguments = parser.parse_args()
+
+    try:
+        await measure(async_database_engine, "uuid4", uuid.uuid4, arguments.count, arguments.batch_size)
+        await measure(async_database_engine, "uuid7", uuid7, arguments.count, arguments.batch_size)
+    finally:
+        await async_database_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""общие фикстуры тестов.
+
+настройки приложения читаются при импорте модулей app, поэтому обязательные параметры, не заданные в окружении,
+заполняются тестовыми значениями до импорта. соединения с базой данных и redis открываются лениво,
+поэтому тесты, которым они не нужны, запускаются без postgres и redis.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import os
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from uuid import uuid4
+
+import asyncpg
+import pytest
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+for name, value in {
+    "PROJECT_NAME": "referral system api",
+    "PROJECT_SUMMARY": "referral system api",
+    "PROJECT_DESCRIPTION": "referral system api",
+    "DEVELOPMENT_PROJECT_NAME": "tt_referral_system_api",
+    "EMAIL_HUNTER_API_URL": "http://127.0.0.1:1/",
+    "EMAIL_HUNTER_API_KEY": "test",
+    "SECRET_KEY": "test",
+    "SIGNING_ALGORITHM": "HS256",
+    "TIMEZONE": "Europe/Moscow",
+    "POSTGRES_HOST": "127.0.0.1",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "test",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.core.config import settings  # noqa: E402
+from app.models import SQLModel  # noqa: E402
+from tests.redis_servers import RedisServer, find_redis_server, start_redis_cluster, start_redis_sentinel  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    """запускает асинхронные тесты в asyncio.
+
+    Returns:
+        str: имя бэкенда anyio
+
+    """
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def redis_server_path() -> str:
+    """возвращает путь к redis-server, пропуская тест, если он не найден.
+
+    Returns:
+        str: путь к redis-server
+
+    """
+    if not (redis_server_path := find_redis_server()):
+        pytest.skip("redis-server is not found, set REDIS_SERVER_PATH or add it to PATH")
+
+    return redis_server_path
+
+
+@pytest.fixture
+def redis_cluster(redis_server_path: str, tmp_path: Path) -> Iterator[list[RedisServer]]:
+    """запускает redis cluster из трех ведущих узлов на время теста.
+
+    Yields:
+        list[RedisServer]: узлы кластера
+
+    """
+    nodes = start_redis_cluster(redis_server_path, tmp_path)
+
+    yield nodes
+
+    for node in nodes:
+        node.stop()
+
+
+@pytest.fixture
+def redis_sentinel(redis_server_path: str, tmp_path: Path) -> Iterator[tuple[list[RedisServer], RedisServer]]:
+    """запускает ведущий узел с репликой под наблюдением sentinel на время теста.
+
+    Yields:
+        tuple[list[RedisServer], RedisServer]: ведущий узел и реплика, sentinel
+
+    """
+    servers, sentinel = start_redis_sentinel(redis_server_path, tmp_path, "mymaster")
+
+    yield servers, sentinel
+
+    for server in [*servers, sentinel]:
+        server.stop()
+
+
+@pytest.fixture
+async def database_session() -> AsyncIterator[AsyncSession]:
+    """создает временную базу данных со схемой моделей на сервере POSTGRES_* и открывает сессию к ней.
+
+    тест пропускается, если postgres недоступен
+
+    Yields:
+        AsyncSession: асинхронная сессия временной базы данных
+
+    """
+    database_name = f"test_{uuid4().hex}"
+
+    try:
+        connection = await asyncpg.connect(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_DB,
+            timeout=1.0,
+        )
+
+    except (OSError, TimeoutError, asyncpg.PostgresError):
+        pytest.skip("postgres is not available, set POSTGRES_* to run database tests")
+
+    await connection.execute(f'CREATE DATABASE "{database_name}"')
+    database_engine = create_async_engine(make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(database=database_name))
+
+    try:
+        async with database_engine.begin() as database_connection:
+            await database_connection.run_sync(SQLModel.metadata.create_all)
+
+        async with AsyncSession(database_engine) as session:
+            yield session
+
+    finally:
+        await database_engine.dispose()
+        await connection.execute(f'DROP DATABASE "{database_name}"')
+        await connection.close()
@@ -0,0 +1,258 @@
+"""модуль запуска локальных серверов redis для тестов.
+
+серверы запускаются отдельными процессами redis-server (путь берется из REDIS_SERVER_PATH или из PATH)
+на свободных портах во временном каталоге: одиночный узел, ведущий узел с репликой под наблюдением sentinel
+и redis cluster из нескольких ведущих узлов, между которыми поровну поделены слоты.
+если redis-server не найден, тесты, которым нужны серверы, пропускаются.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import os
+import random
+import shutil
+import socket
+import subprocess  # noqa: S404
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from redis import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+CLUSTER_SLOTS = 16384
+CLUSTER_BUS_PORT_OFFSET = 10000
+SERVER_START_TIMEOUT = 10.0
+
+
+class RedisServer:
+    """процесс redis-server, запущенный для теста."""
+
+    def __init__(self, port: int, process: subprocess.Popen[bytes]) -> None:
+        """инициализирует сервер.
+
+        Args:
+            port (int): порт сервера
+            process (subprocess.Popen[bytes]): процесс сервера
+
+        """
+        self.port: int = port
+        self.process: subprocess.Popen[bytes] = process
+
+    @property
+    def address(self) -> str:
+        """адрес сервера в формате host:port."""
+        return f"127.0.0.1:{self.port}"
+
+    def client(self) -> Redis:
+        """возвращает синхронный клиент сервера.
+
+        Returns:
+            Redis: клиент redis
+
+        """
+        return Redis(port=self.port, socket_timeout=SERVER_START_TIMEOUT)
+
+    def stop(self) -> None:
+        """останавливает сервер и ждет завершения процесса."""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+def find_redis_server() -> str | None:
+    """возвращает путь к redis-server.
+
+    Returns:
+        str | None: путь к redis-server или None, если он не найден
+
+    """
+    return os.environ.get("REDIS_SERVER_PATH") or shutil.which("redis-server")
+
+
+def is_port_free(port: int) -> bool:
+    """проверяет, что порт не занят.
+
+    Args:
+        port (int): порт
+
+    Returns:
+        bool: True, если порт свободен
+
+    """
+    with socket.socket() as probe:
+        try:
+            probe.bind(("127.0.0.1", port))
+
+        except OSError:
+            return False
+
+    return True
+
+
+def find_free_port() -> int:
+    """возвращает свободный порт, у которого свободен и порт шины кластера.
+
+    порт шины кластера на CLUSTER_BUS_PORT_OFFSET больше порта узла, поэтому порт выбирается из нижнего диапазона
+
+    Returns:
+        int: порт
+
+    """
+    while True:
+        port = random.randint(20000, 50000)  # noqa: S311
+
+        if is_port_free(port) and is_port_free(port + CLUSTER_BUS_PORT_OFFSET):
+            return port
+
+
+def wait_until(condition: Callable[[], bool], description: str, timeout: float = SERVER_START_TIMEOUT) -> None:
+    """ждет выполнения условия.
+
+    Args:
+        condition (Callable[[], bool]): условие, ошибки соединения с redis считаются невыполненным условием
+        description (str): описание условия для сообщения об ошибке
+        timeout (float): время ожидания в секундах
+
+    Raises:
+        TimeoutError: если условие не выполнилось за время ожидания
+
+    """
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            if condition():
+                return
+
+        except RedisConnectionError:
+            pass
+
+        time.sleep(0.05)
+
+    message = f"timed out waiting for {description}"
+    raise TimeoutError(message)
+
+
+def start_redis_server(redis_server_path: str, directory: Path, *arguments: str) -> RedisServer:
+    """запускает redis-server без сохранения данных на диск и ждет, пока он начнет отвечать.
+
+    Args:
+        redis_server_path (str): путь к redis-server
+        directory (Path): каталог для файлов сервера
+        *arguments (str): дополнительные параметры сервера
+
+    Returns:
+        RedisServer: запущенный сервер
+
+    """
+    port = find_free_port()
+    server_directory = directory / str(port)
+    server_directory.mkdir(parents=True)
+    process = subprocess.Popen(  # noqa: S603
+        [
+            redis_server_path,
+            *arguments,
+            "--port",
+            str(port),
+            "--bind",
+            "127.0.0.1",
+            "--dir",
+            str(server_directory),
+            "--save",
+            "",
+            "--appendonly",
+            "no",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    server = RedisServer(port, process)
+
+    wait_until(server.client().ping, f"redis-server on port {port}")
+
+    return server
+
+
+def start_redis_cluster(redis_server_path: str, directory: Path, size: int = 3) -> list[RedisServer]:
+    """запускает redis cluster из ведущих узлов без реплик и ждет, пока кластер не будет готов.
+
+    Args:
+        redis_server_path (str): путь к redis-server
+        directory (Path): каталог для файлов узлов
+        size (int): количество узлов
+
+    Returns:
+        list[RedisServer]: узлы кластера
+
+    """
+    nodes = [
+        start_redis_server(
+            redis_server_path,
+            directory,
+            "--cluster-enabled",
+            "yes",
+            "--cluster-config-file",
+            "nodes.conf",
+            "--cluster-node-timeout",
+            "1000",
+        )
+        for _ in range(size)
+    ]
+
+    for index, node in enumerate(nodes):
+        node.client().execute_command(
+            "CLUSTER",
+            "ADDSLOTS",
+            *range(CLUSTER_SLOTS * index // size, CLUSTER_SLOTS * (index + 1) // size),
+        )
+
+    for node in nodes[1:]:
+        nodes[0].client().execute_command("CLUSTER", "MEET", "127.0.0.1", node.port)
+
+    def is_cluster_ready() -> bool:
+        return all(
+            node.client().execute_command("CLUSTER", "INFO").decode().count("cluster_state:ok")
+            and len(node.client().execute_command("CLUSTER", "NODES").decode().splitlines()) == size
+            for node in nodes
+        )
+
+    wait_until(is_cluster_ready, "redis cluster")
+
+    return nodes
+
+
+def start_redis_sentinel(redis_server_path: str, directory: Path, master_name: str) -> tuple[list[RedisServer], RedisServer]:
+    """запускает ведущий узел с репликой и sentinel, наблюдающий за ними, и ждет, пока реплику можно будет повысить.
+
+    Args:
+        redis_server_path (str): путь к redis-server
+        directory (Path): каталог для файлов серверов
+        master_name (str): имя ведущего узла в sentinel
+
+    Returns:
+        tuple[list[RedisServer], RedisServer]: ведущий узел и реплика, sentinel
+
+    """
+    master = start_redis_server(redis_server_path, directory)
+    replica = start_redis_server(redis_server_path, directory, "--replicaof", "127.0.0.1", str(master.port))
+
+    sentinel_config = directory / f"sentinel-{master.port}.conf"
+    sentinel_config.write_text(
+        f"sentinel monitor {master_name} 127.0.0.1 {master.port} 1\n"
+        f"sentinel down-after-milliseconds {master_name} 1000\n"
+        f"sentinel failover-timeout {master_name} 5000\n",
+    )
+    sentinel = start_redis_server(redis_server_path, directory, str(sentinel_config), "--sentinel")
+
+    def is_replica_ready() -> bool:
+        # sentinel повышает только реплику, о которой получил INFO с действующей связью с ведущим узлом
+        replicas = [
+            dict(zip(replica[::2], replica[1::2], strict=True))
+            for replica in sentinel.client().execute_command("SENTINEL", "REPLICAS", master_name)
+        ]
+        return any(replica[b"flags"] == b"slave" and replica[b"master-link-status"] == b"ok" for replica in replicas)
+
+    wait_until(is_replica_ready, "sentinel to discover the replica", timeout=30.0)
+
+    return [master, replica], sentinel
@@ -0,0 +1,151 @@
+"""тесты адаптивного ограничения одновременных запросов.
+
+лимит уменьшается в CONCURRENCY_LIMIT_BACKOFF_RATIO раз после медленного или завершившегося ошибкой сервера запроса
+и растет на 1 / limit после быстрого запроса под нагрузкой, а запросы сверх доли своего приоритета
+отклоняются промежуточным слоем ответом 503 с заголовком retry-after.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import json
+
+import pytest
+from fastapi import status
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core import concurrency_limit as concurrency_limit_module
+from app.core.concurrency_limit import AdaptiveConcurrencyLimit, ConcurrencyLimitMiddleware
+from app.core.config import RequestPriority
+
+pytestmark = pytest.mark.anyio
+
+PATH = "/referral_code/get_user_referral_code"
+
+
+@pytest.fixture
+def concurrency_limit() -> AdaptiveConcurrencyLimit:
+    """создает лимит с начальным значением 20 и обычным временем ответа пути 0.1 секунды.
+
+    Returns:
+        AdaptiveConcurrencyLimit: лимит одновременных запросов
+
+    """
+    concurrency_limit = AdaptiveConcurrencyLimit(
+        initial_limit=20,
+        min_limit=4,
+        max_limit=200,
+        backoff_ratio=0.9,
+        latency_tolerance=2.0,
+        baseline_smoothing=0.05,
+    )
+    concurrency_limit.try_acquire(RequestPriority.HIGH)
+    concurrency_limit.release(PATH, 0.1, is_failed=False)
+
+    return concurrency_limit
+
+
+def test_slow_request_decreases_limit(concurrency_limit: AdaptiveConcurrencyLimit) -> None:
+    """медленный запрос уменьшает лимит, но не чаще раза за время такого запроса."""
+    for _ in range(2):
+        concurrency_limit.try_acquire(RequestPriority.HIGH)
+        concurrency_limit.release(PATH, 1.0, is_failed=False)
+
+    assert concurrency_limit.limit == pytest.approx(18.0)
+    assert concurrency_limit.in_flight == 0
+
+
+def test_failed_request_decreases_limit(concurrency_limit: AdaptiveConcurrencyLimit) -> None:
+    """запрос, завершившийся ошибкой сервера, уменьшает лимит, даже если выполнился быстро."""
+    concurrency_limit.try_acquire(RequestPriority.HIGH)
+    concurrency_limit.release(PATH, 0.1, is_failed=True)
+
+    assert concurrency_limit.limit == pytest.approx(18.0)
+
+
+def test_limit_does_not_decrease_below_minimum(concurrency_limit: AdaptiveConcurrencyLimit) -> None:
+    """лимит не становится меньше минимального."""
+    concurrency_limit.limit = 4.2
+    concurrency_limit.try_acquire(RequestPriority.HIGH)
+    concurrency_limit.release(PATH, 0.1, is_failed=True)
+
+    assert concurrency_limit.limit == 4
+
+
+def test_fast_request_under_load_increases_limit(concurrency_limit: AdaptiveConcurrencyLimit) -> None:
+    """быстрый запрос увеличивает лимит на 1 / limit, только если процесс загружен хотя бы наполовину."""
+    concurrency_limit.try_acquire(RequestPriority.HIGH)
+    concurrency_limit.release(PATH, 0.1, is_failed=False)
+
+    assert concurrency_limit.limit == 20
+
+    for _ in range(10):
+        concurrency_limit.try_acquire(RequestPriority.HIGH)
+
+    concurrency_limit.release(PATH, 0.1, is_failed=False)
+
+    assert concurrency_limit.limit == pytest.approx(20.05)
+    assert concurrency_limit.in_flight == 9
+
+
+def test_low_priority_requests_are_shed_first(concurrency_limit: AdaptiveConcurrencyLimit) -> None:
+    """запросы с низким приоритетом отклоняются после своей доли лимита, а с высоким - продолжают обслуживаться."""
+    assert all(concurrency_limit.try_acquire(RequestPriority.LOW) for _ in range(10))
+    assert not concurrency_limit.try_acquire(RequestPriority.LOW)
+    assert concurrency_limit.try_acquire(RequestPriority.HIGH)
+    assert concurrency_limit.shed_count == {
+        RequestPriority.EXEMPT: 0,
+        RequestPriority.HIGH: 0,
+        RequestPriority.NORMAL: 0,
+        RequestPriority.LOW: 1,
+    }
+
+
+async def test_middleware_rejects_request_over_limit(
+    concurrency_limit: AdaptiveConcurrencyLimit,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """запрос сверх доли приоритета получает 503 с retry-after и не доходит до приложения."""
+    monkeypatch.setattr(concurrency_limit_module, "concurrency_limit", concurrency_limit)
+    concurrency_limit.in_flight = 10
+    calls: list[Scope] = []
+    messages: list[Message] = []
+
+    async def app(scope: Scope, _receive: Receive, _send: Send) -> None:
+        calls.append(scope)
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    await ConcurrencyLimitMiddleware(app)({"type": "http", "path": "/user/registration"}, receive, send)
+
+    assert not calls
+    assert messages[0]["status"] == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert (b"retry-after", b"1") in messages[0]["headers"]
+    assert json.loads(messages[1]["body"]) == {"detail": "сервер перегружен, попробуйте позже"}
+    assert concurrency_limit.shed_count[RequestPriority.LOW] == 1
+
+
+async def test_middleware_releases_failed_request(
+    concurrency_limit: AdaptiveConcurrencyLimit,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """запрос, на который приложение ответило ошибкой сервера, освобождает место и уменьшает лимит."""
+    monkeypatch.setattr(concurrency_limit_module, "concurrency_limit", concurrency_limit)
+
+    async def app(_scope: Scope, _receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": status.HTTP_502_BAD_GATEWAY, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    async def send(_message: Message) -> None:
+        pass
+
+    await ConcurrencyLimitMiddleware(app)({"type": "http", "path": PATH}, receive, send)
+
+    assert concurrency_limit.in_flight == 0
+    assert concurrency_limit.limit == pytest.approx(18.0)
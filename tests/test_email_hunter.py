@@ -0,0 +1,230 @@
+"""тесты устойчивости запросов к hunter.io.
+
+check_email_validity запрашивает локальный поддельный hunter.io, который отвечает по заданному сценарию:
+с задержкой, ошибкой или успешно. проверяются повторы при ошибках 5xx, дублирующий запрос после 95-го перцентиля
+времени ответа, размыкание предохранителя и политики регистрации при недоступности hunter.io.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import socket
+import time
+from collections.abc import AsyncIterator
+from datetime import timedelta
+from typing import NamedTuple
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, HTTPException, Response, status
+
+from app.core import utils
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
+from app.core.config import EmailVerificationFallbackPolicy, settings
+from app.crud.user import apply_email_verification_fallback_policy
+from app.models.user import UserVerificationStatus
+from tests.redis_servers import find_free_port
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeResponse(NamedTuple):
+    """ответ поддельного hunter.io."""
+
+    delay: float
+    status_code: int
+
+
+VALID = FakeResponse(0.0, status.HTTP_200_OK)
+UNAVAILABLE = FakeResponse(0.0, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class FakeEmailHunter:
+    """поддельный hunter.io, отвечающий на запросы по очереди заданными ответами."""
+
+    def __init__(self) -> None:
+        """инициализирует поддельный hunter.io."""
+        self.responses: list[FakeResponse] = [VALID]
+        self.requests_count: int = 0
+        self.app: FastAPI = FastAPI()
+        self.app.get("/email-verifier")(self.verify_email)
+
+    async def verify_email(self) -> Response:
+        """отвечает очередным ответом сценария, а после его окончания - последним ответом.
+
+        Returns:
+            Response: ответ hunter.io
+
+        """
+        response = self.responses[min(self.requests_count, len(self.responses) - 1)]
+        self.requests_count += 1
+
+        await asyncio.sleep(response.delay)
+
+        return Response('{"data": {"status": "valid"}}', response.status_code, media_type="application/json")
+
+
+class FakeEmailHunterServer(uvicorn.Server):
+    """сервер поддельного hunter.io, сообщающий о готовности принимать соединения."""
+
+    def __init__(self, config: uvicorn.Config) -> None:
+        """инициализирует сервер.
+
+        Args:
+            config (uvicorn.Config): настройки сервера
+
+        """
+        super().__init__(config)
+        self.started_event: asyncio.Event = asyncio.Event()
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        """запускает сервер и, если он начал принимать соединения, выставляет started_event.
+
+        Args:
+            sockets (list[socket.socket] | None): открытые заранее сокеты
+
+        """
+        await super().startup(sockets)
+
+        if self.started:
+            self.started_event.set()
+
+
+@pytest.fixture
+async def fake_email_hunter(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[FakeEmailHunter]:
+    """запускает поддельный hunter.io и направляет на него запросы с новым предохранителем.
+
+    Yields:
+        FakeEmailHunter: поддельный hunter.io
+
+    """
+    fake_email_hunter = FakeEmailHunter()
+    port = find_free_port()
+    server = FakeEmailHunterServer(
+        uvicorn.Config(fake_email_hunter.app, host="127.0.0.1", port=port, log_level="warning"),
+    )
+    serving = asyncio.create_task(server.serve())
+    await asyncio.wait_for(server.started_event.wait(), 10.0)
+
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_API_URL", f"http://127.0.0.1:{port}/")
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_HEDGING_ENABLED", False)
+    monkeypatch.setattr(
+        utils,
+        "email_hunter_circuit_breaker",
+        CircuitBreaker(
+            name="email_hunter_test",
+            failure_threshold=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_timedelta=timedelta(minutes=1),
+            half_open_max_calls=1,
+            call_timeout=settings.EMAIL_HUNTER_CIRCUIT_BREAKER_CALL_TIMEOUT,
+            failure_exceptions=(utils.EmailHunterUnavailableError, httpx.HTTPError),
+        ),
+    )
+    utils.email_hunter_latencies.clear()
+    utils.get_email_hunter_client.cache_clear()
+
+    yield fake_email_hunter
+
+    await utils.get_email_hunter_client().aclose()
+    utils.get_email_hunter_client.cache_clear()
+    utils.email_hunter_latencies.clear()
+    server.should_exit = True
+    await serving
+
+
+async def test_retries_server_errors(fake_email_hunter: FakeEmailHunter) -> None:
+    """ответ 503 повторяется, и проверка получает следующий успешный ответ."""
+    fake_email_hunter.responses = [UNAVAILABLE, VALID]
+
+    assert await utils.check_email_validity("user@example.com") is True
+    assert fake_email_hunter.requests_count == 2
+
+
+async def test_gives_up_after_all_retries(fake_email_hunter: FakeEmailHunter, monkeypatch: pytest.MonkeyPatch) -> None:
+    """после EMAIL_HUNTER_RETRIES повторов ошибка возвращается вызывающему."""
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_RETRIES", 2)
+    fake_email_hunter.responses = [UNAVAILABLE]
+
+    with pytest.raises(utils.EmailHunterUnavailableError):
+        await utils.check_email_validity("user@example.com")
+
+    assert fake_email_hunter.requests_count == 3
+
+
+async def test_hedges_request_slower_than_p95(fake_email_hunter: FakeEmailHunter, monkeypatch: pytest.MonkeyPatch) -> None:
+    """запрос, не ответивший за 95-й перцентиль времени ответа, дублируется, и возвращается первый ответ."""
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_HEDGING_ENABLED", True)
+    utils.email_hunter_latencies.extend([0.05] * utils.EMAIL_HUNTER_HEDGING_MIN_SAMPLES)
+    fake_email_hunter.responses = [FakeResponse(2.0, status.HTTP_200_OK), VALID]
+
+    assert utils.get_email_hunter_hedging_delay() == pytest.approx(0.05)
+
+    started_at = time.monotonic()
+
+    assert await utils.check_email_validity("user@example.com") is True
+    assert time.monotonic() - started_at < 1.0
+    assert fake_email_hunter.requests_count == 2
+
+
+async def test_does_not_hedge_fast_request(fake_email_hunter: FakeEmailHunter, monkeypatch: pytest.MonkeyPatch) -> None:
+    """запрос, ответивший быстрее задержки дублирования, не дублируется."""
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_HEDGING_ENABLED", True)
+    utils.email_hunter_latencies.extend([0.5] * utils.EMAIL_HUNTER_HEDGING_MIN_SAMPLES)
+
+    assert await utils.check_email_validity("user@example.com") is True
+    assert fake_email_hunter.requests_count == 1
+
+
+async def test_circuit_breaker_opens_and_fails_fast(
+    fake_email_hunter: FakeEmailHunter,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """после серии неудачных проверок предохранитель размыкается и отклоняет проверки без запросов к hunter.io."""
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_RETRIES", 0)
+    fake_email_hunter.responses = [UNAVAILABLE]
+
+    for _ in range(utils.email_hunter_circuit_breaker.failure_threshold):
+        with pytest.raises(utils.EmailHunterUnavailableError):
+            await utils.check_email_validity("user@example.com")
+
+    started_at = time.monotonic()
+
+    with pytest.raises(CircuitBreakerOpenError):
+        await utils.check_email_validity("user@example.com")
+
+    assert time.monotonic() - started_at < 0.1
+    assert fake_email_hunter.requests_count == utils.email_hunter_circuit_breaker.failure_threshold
+
+
+@pytest.mark.parametrize(
+    ("policy", "verification_status"),
+    [
+        (EmailVerificationFallbackPolicy.ALLOW, UserVerificationStatus.UNVERIFIED),
+        (EmailVerificationFallbackPolicy.DEFER, UserVerificationStatus.PENDING_VERIFICATION),
+        (EmailVerificationFallbackPolicy.DENY, None),
+    ],
+)
+async def test_fallback_policy_when_email_hunter_is_unavailable(
+    fake_email_hunter: FakeEmailHunter,
+    monkeypatch: pytest.MonkeyPatch,
+    policy: EmailVerificationFallbackPolicy,
+    verification_status: UserVerificationStatus | None,
+) -> None:
+    """при недоступности hunter.io регистрация продолжается или отклоняется согласно политике."""
+    monkeypatch.setattr(settings, "EMAIL_HUNTER_RETRIES", 0)
+    monkeypatch.setattr(settings, "EMAIL_VERIFICATION_FALLBACK_POLICY", policy)
+    fake_email_hunter.responses = [UNAVAILABLE]
+
+    with pytest.raises(utils.EMAIL_HUNTER_UNAVAILABLE_ERRORS) as unavailable_error:
+        await utils.check_email_validity("user@example.com")
+
+    if verification_status is None:
+        with pytest.raises(HTTPException) as http_error:
+            apply_email_verification_fallback_policy(unavailable_error.value)
+
+        assert http_error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    else:
+        assert apply_email_verification_fallback_policy(unavailable_error.value) == verification_status
@@ -0,0 +1,87 @@
+"""тесты пробы готовности процесса.
+
+жизненный цикл приложения запускается с прогревом, который не удается, пока тест его не разрешит:
+до успешного повторного прогрева проба /health/ready отвечает not_ready, а после - что процесс готов.
+база данных в пробе считается доступной, а уведомления и обслуживание кэша не запускаются.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, status
+from redis.asyncio import Redis
+
+from app import main
+from app.api.routes import health
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeWarmUp:
+    """прогрев, который не удается, пока не разрешен."""
+
+    def __init__(self, failed_attempts: int) -> None:
+        """инициализирует прогрев.
+
+        Args:
+            failed_attempts (int): количество неудачных попыток, после которых выставляется failed
+
+        """
+        self.is_allowed: bool = False
+        self.attempts: int = 0
+        self.failed_attempts: int = failed_attempts
+        self.failed: asyncio.Event = asyncio.Event()
+        self.succeeded: asyncio.Event = asyncio.Event()
+
+    async def __call__(self, _application: FastAPI, _redis: Redis) -> None:
+        """выполняет попытку прогрева.
+
+        Raises:
+            ConnectionError: если прогрев еще не разрешен
+
+        """
+        self.attempts += 1
+
+        if not self.is_allowed:
+            if self.attempts >= self.failed_attempts:
+                self.failed.set()
+
+            message = "database is unavailable"
+            raise ConnectionError(message)
+
+        self.succeeded.set()
+
+
+async def do_nothing(*_arguments: object) -> None:
+    """заменяет фоновые задачи и уведомления, не нужные тесту."""
+
+
+async def test_failed_warm_up_keeps_process_not_ready(monkeypatch: pytest.MonkeyPatch) -> None:
+    """после неудачного прогрева процесс не готов, пока повторный прогрев не удастся."""
+    fake_warm_up = FakeWarmUp(failed_attempts=3)
+    monkeypatch.setattr(main, "warm_up", fake_warm_up)
+    monkeypatch.setattr(main, "maintain_referral_codes_cache", do_nothing)
+    monkeypatch.setattr(main, "inform_host", do_nothing)
+    monkeypatch.setattr(health, "check_database", do_nothing)
+    monkeypatch.setattr(settings, "WARM_UP_RETRY_BACKOFF", 0.01)
+
+    async with (
+        main.app.router.lifespan_context(main.app),
+        httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client,
+    ):
+        await asyncio.wait_for(fake_warm_up.failed.wait(), 5.0)
+        response = await client.get("/health/ready")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["status"] == "not_ready"
+
+        fake_warm_up.is_allowed = True
+        await asyncio.wait_for(fake_warm_up.succeeded.wait(), 5.0)
+        response = await client.get("/health/ready")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] in {"ready", "degraded"}
@@ -0,0 +1,123 @@
+"""тесты зарегистрированных полей jwt-токенов.
+
+токены, подписанные асимметричным ключом, проверяются стандартной библиотекой jwt по опубликованному jwks так же,
+как их проверяют другие сервисы: по подписи, издателю, субъекту и сроку действия.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import json
+from datetime import timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import jwt
+import pytest
+from fastapi import HTTPException, status
+from starlette.requests import Request
+
+from app.core import security
+from app.core.config import settings
+from app.core.security import TokenType, create_jwt, decode_jwt
+from app.core.signing_keys import SigningKeyring, generate_signing_key
+
+USER_AGENT = "test-client"
+
+
+@pytest.fixture
+def signing_keyring(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> SigningKeyring:
+    """подписывает токены теста новым ключом EdDSA.
+
+    Returns:
+        SigningKeyring: набор ключей подписи
+
+    """
+    generate_signing_key("EdDSA", tmp_path)
+    signing_keyring = SigningKeyring("EdDSA", tmp_path, None, settings.SECRET_KEY)
+    monkeypatch.setattr(security, "get_signing_keyring", lambda: signing_keyring)
+
+    return signing_keyring
+
+
+def create_token(subject_id: str, token_type: TokenType = TokenType.ACCESS) -> str:
+    """создает токен для запроса с user-agent теста.
+
+    Args:
+        subject_id (str): идентификатор субъекта
+        token_type (TokenType): тип токена
+
+    Returns:
+        str: jwt-токен без префикса схемы
+
+    """
+    request = Request({"type": "http", "headers": [(b"user-agent", USER_AGENT.encode())]})
+
+    return create_jwt(subject_id, token_type, request).token.removeprefix("bearer jwt ")
+
+
+def verify_with_jwks(token: str, signing_keyring: SigningKeyring) -> dict[str, object]:
+    """проверяет токен стандартной библиотекой jwt по jwks, как это делает другой сервис.
+
+    Args:
+        token (str): jwt-токен
+        signing_keyring (SigningKeyring): набор ключей, jwks которого опубликован
+
+    Returns:
+        dict[str, object]: поля токена
+
+    """
+    [jwk] = json.loads(signing_keyring.jwks)["keys"]
+
+    return jwt.decode(
+        token,
+        jwt.PyJWK(jwk).key,
+        [jwk["alg"]],
+        issuer=settings.JWT_ISSUER,
+        options={"require": ["iss", "sub", "iat", "exp"]},
+    )
+
+
+def test_token_is_verified_by_standard_library(signing_keyring: SigningKeyring) -> None:
+    """стандартная проверка по jwks узнает субъект и срок действия токена."""
+    subject_id = str(uuid4())
+    token = create_token(subject_id)
+
+    payload = verify_with_jwks(token, signing_keyring)
+
+    assert payload["sub"] == subject_id
+    assert payload["exp"] - payload["iat"] == settings.ACCESS_TOKEN_TIMEDELTA.total_seconds()
+    assert decode_jwt(token, TokenType.ACCESS, USER_AGENT).token_subject == subject_id
+
+
+def test_expired_token_is_rejected(signing_keyring: SigningKeyring, monkeypatch: pytest.MonkeyPatch) -> None:
+    """истекший токен отклоняют и приложение, и стандартная проверка по jwks."""
+    monkeypatch.setattr(settings, "ACCESS_TOKEN_TIMEDELTA", timedelta(seconds=-1))
+    token = create_token(str(uuid4()))
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_with_jwks(token, signing_keyring)
+
+    with pytest.raises(HTTPException) as http_error:
+        decode_jwt(token, TokenType.ACCESS, USER_AGENT)
+
+    assert (http_error.value.status_code, http_error.value.detail) == (status.HTTP_403_FORBIDDEN, "токен истек")
+
+
+def test_token_without_registered_claims_is_rejected(signing_keyring: SigningKeyring) -> None:
+    """токен прежнего формата без exp и sub отклоняется."""
+    token = jwt.encode(
+        {
+            "token_type": TokenType.ACCESS,
+            "token_subject": str(uuid4()),
+            "token_expiration": "2999-01-01 00:00:00.000000",
+            "token_subject_user_agent": USER_AGENT,
+        },
+        signing_keyring.signing_key,
+        algorithm=signing_keyring.algorithm,
+        headers={"kid": signing_keyring.active_key_id},
+    )
+
+    with pytest.raises(HTTPException) as http_error:
+        decode_jwt(token, TokenType.ACCESS, USER_AGENT)
+
+    assert http_error.value.status_code == status.HTTP_403_FORBIDDEN
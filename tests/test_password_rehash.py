@@ -0,0 +1,85 @@
+"""тесты пересчета хешей паролей при входе.
+
+хеш, созданный с устаревшей стоимостью bcrypt, пересчитывается при успешном входе,
+а пересчет не перезаписывает хеш, который уже изменил другой запрос.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import password_hash_needs_update, verify_password
+from app.crud import user as user_crud
+from app.crud.user import authenticate_user, update_password_hash
+from app.models.user import LoginUser, User
+
+pytestmark = pytest.mark.anyio
+
+PASSWORD = "password123"
+
+outdated_crypt_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+"""хеширование с меньшей стоимостью bcrypt, чем требует текущая политика."""
+
+
+@pytest.fixture
+async def user_with_outdated_hash(database_session: AsyncSession) -> User:
+    """создает пользователя, хеш пароля которого нужно пересчитать.
+
+    Returns:
+        User: пользователь
+
+    """
+    user = User(email="user@example.com", hashed_password=outdated_crypt_context.hash(PASSWORD), referrer_id=None)
+    database_session.add(user)
+    await database_session.commit()
+    await database_session.refresh(user)
+    # отсоединенный объект хранит исходные значения и не истекает при фиксациях в тесте
+    database_session.expunge(user)
+
+    assert password_hash_needs_update(user.hashed_password)
+
+    return user
+
+
+async def get_hashed_password(user: User, database_session: AsyncSession) -> str:
+    """читает текущий хеш пароля пользователя из базы данных.
+
+    Args:
+        user (User): пользователь
+        database_session (AsyncSession): асинхронная сессия базы данных
+
+    Returns:
+        str: хеш пароля
+
+    """
+    return await database_session.scalar(select(User.hashed_password).where(User.id == user.id))
+
+
+async def test_login_rehashes_outdated_hash(user_with_outdated_hash: User, database_session: AsyncSession) -> None:
+    """после входа хеш пароля соответствует текущей политике, а пароль по-прежнему подходит."""
+    outdated_hashed_password = user_with_outdated_hash.hashed_password
+    rehashes_total = user_crud.password_rehashes_total
+
+    user_view = await authenticate_user(LoginUser(email="user@example.com", password=PASSWORD), database_session)
+    hashed_password = await get_hashed_password(user_with_outdated_hash, database_session)
+
+    assert user_view.id == user_with_outdated_hash.id
+    assert hashed_password != outdated_hashed_password
+    assert not password_hash_needs_update(hashed_password)
+    assert verify_password(PASSWORD, hashed_password)
+    assert user_crud.password_rehashes_total == rehashes_total + 1
+
+
+async def test_concurrent_rehash_is_not_overwritten(user_with_outdated_hash: User, database_session: AsyncSession) -> None:
+    """хеш, уже пересчитанный другим запросом, не перезаписывается пересчетом от прежнего хеша."""
+    outdated_hashed_password = user_with_outdated_hash.hashed_password
+    assert await update_password_hash(user_with_outdated_hash.id, outdated_hashed_password, PASSWORD, database_session)
+    hashed_password = await get_hashed_password(user_with_outdated_hash, database_session)
+    rehashes_total = user_crud.password_rehashes_total
+
+    assert not await update_password_hash(user_with_outdated_hash.id, outdated_hashed_password, PASSWORD, database_session)
+    assert await get_hashed_password(user_with_outdated_hash, database_session) == hashed_password
+    assert user_crud.password_rehashes_total == rehashes_total
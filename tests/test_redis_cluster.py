@@ -0,0 +1,349 @@
+"""тесты работы с redis cluster.
+
+функции приложения выполняются на локальном кластере из трех ведущих узлов: чтение ключей разных шардов командой mget,
+конвейер команд, пересчет рейтинга с заменой ключа командой rename, сверка кэша реферальных кодов,
+перенос ключей в текущую раскладку и события pub/sub при отказе узла, к которому подключена подписка.
+база данных заменяется сессией, возвращающей заданные строки, потому что тесты проверяют только redis.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterable
+from datetime import timedelta
+from typing import Any
+from uuid import UUID, uuid4
+
+import pytest
+from redis.asyncio.cluster import RedisCluster
+
+from app.core import referrals_events
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import RedisMode, settings
+from app.core.redis import (
+    REFERRERS_LEADERBOARD_KEY,
+    create_redis_client,
+    create_redis_pubsub_client,
+    referrals_version_key,
+    referrer_key,
+    revoked_token_key,
+)
+from app.core.referrals_events import ReferralsEventsHub
+from app.core.security import get_tokens_revocation
+from app.crud.referral_code import get_referral_codes_by_emails, remove_stale_referral_codes_from_cache
+from app.crud.user import (
+    get_referrer_rank,
+    get_referrers_leaderboard,
+    increment_referrer_rank,
+    rebuild_referrers_leaderboard,
+)
+from app.models.user import UserVerificationStatus, UserView
+from app.workers.redis_keys_migration import (
+    MOVED_KEYS_LAYOUTS,
+    migrate_keys,
+    remove_outdated_referrals_versions,
+)
+from tests.redis_servers import RedisServer
+
+pytestmark = pytest.mark.anyio
+
+EMAILS = [f"user{index}@example.com" for index in range(64)]
+
+
+class FakeResult:
+    """результат запроса к базе данных из заданных строк."""
+
+    def __init__(self, rows: list[tuple[Any, ...]]) -> None:
+        """инициализирует результат.
+
+        Args:
+            rows (list[tuple[Any, ...]]): строки результата
+
+        """
+        self.rows: list[tuple[Any, ...]] = rows
+
+    async def partitions(self) -> AsyncIterator[list[tuple[Any, ...]]]:
+        """возвращает строки пачками по две.
+
+        Yields:
+            list[tuple[Any, ...]]: пачка строк
+
+        """
+        for offset in range(0, len(self.rows), 2):
+            yield self.rows[offset : offset + 2]
+
+    def tuples(self) -> "FakeResult":
+        """возвращает результат в виде кортежей.
+
+        Returns:
+            FakeResult: результат
+
+        """
+        return self
+
+    def all(self) -> list[tuple[Any, ...]]:
+        """возвращает все строки.
+
+        Returns:
+            list[tuple[Any, ...]]: строки результата
+
+        """
+        return self.rows
+
+
+class FakeDatabaseSession:
+    """сессия базы данных, возвращающая на любой запрос заданные строки."""
+
+    def __init__(self, rows: Iterable[tuple[Any, ...]] = ()) -> None:
+        """инициализирует сессию.
+
+        Args:
+            rows (Iterable[tuple[Any, ...]]): строки, возвращаемые запросами
+
+        """
+        self.rows: list[tuple[Any, ...]] = list(rows)
+
+    async def stream(self, _statement: object) -> FakeResult:
+        """выполняет запрос с потоковым чтением результата.
+
+        Returns:
+            FakeResult: результат запроса
+
+        """
+        return FakeResult(self.rows)
+
+    async def execute(self, _statement: object, parameters: dict[str, Any]) -> FakeResult:
+        """выполняет запрос по email, возвращая строки, первый столбец которых среди переданных email.
+
+        Args:
+            parameters (dict[str, Any]): параметры запроса
+
+        Returns:
+            FakeResult: результат запроса
+
+        """
+        return FakeResult([row for row in self.rows if row[0] in parameters["emails"]])
+
+    async def close(self) -> None:
+        """закрывает сессию."""
+
+
+@pytest.fixture
+async def redis_cluster_client(
+    redis_cluster: list[RedisServer],
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[RedisCluster]:
+    """создает клиент кластера так же, как приложение в режиме cluster.
+
+    Yields:
+        RedisCluster: клиент кластера
+
+    """
+    monkeypatch.setattr(settings, "REDIS_MODE", RedisMode.CLUSTER)
+    monkeypatch.setattr(settings, "REDIS_CLUSTER_NODES", [node.address for node in redis_cluster])
+    redis = create_redis_client()
+
+    assert isinstance(redis, RedisCluster)
+
+    yield redis
+
+    await redis.aclose()
+
+
+def count_keys_nodes(redis: RedisCluster, keys: list[str]) -> int:
+    """возвращает количество узлов кластера, на которых хранятся ключи.
+
+    Args:
+        redis (RedisCluster): клиент кластера
+        keys (list[str]): ключи
+
+    Returns:
+        int: количество узлов
+
+    """
+    return len({redis.get_node_from_key(key).name for key in keys})
+
+
+async def test_mget_reads_keys_of_all_shards(redis_cluster_client: RedisCluster) -> None:
+    """реферальные коды и отозванные токены разных шардов читаются с узлов, на которых они хранятся."""
+    keys = [referrer_key(email) for email in EMAILS]
+    await redis_cluster_client.mset_nonatomic({key: f"code{index}" for index, key in enumerate(keys)})
+
+    assert count_keys_nodes(redis_cluster_client, keys) == 3
+
+    codes = await get_referral_codes_by_emails(
+        [*EMAILS, "missing@example.com"],
+        FakeDatabaseSession(),
+        redis_cluster_client,
+    )
+
+    assert codes == [*(f"code{index}" for index in range(len(EMAILS))), None]
+
+    tokens = [f"token{index}" for index in range(len(EMAILS))]
+    await redis_cluster_client.mset_nonatomic({revoked_token_key(token): 1 for token in tokens[::2]})
+
+    assert await get_tokens_revocation(tokens, redis_cluster_client) == [index % 2 == 0 for index in range(len(tokens))]
+
+
+async def test_referrers_leaderboard_pipeline(redis_cluster_client: RedisCluster) -> None:
+    """место и счет реферера читаются конвейером команд без транзакции."""
+    referrers_ids = [uuid4() for _ in range(3)]
+
+    for referrals_count, referrer_id in enumerate(referrers_ids, start=1):
+        for _ in range(referrals_count):
+            await increment_referrer_rank(referrer_id, redis_cluster_client)
+
+    rank = await get_referrer_rank(referrers_ids[0], redis_cluster_client)
+
+    assert (rank.rank, rank.referrals_count) == (3, 1)
+
+    leaderboard = await get_referrers_leaderboard(0, 2, redis_cluster_client)
+
+    assert [(rank.referrer_id, rank.referrals_count, rank.rank) for rank in leaderboard] == [
+        (referrers_ids[2], 3, 1),
+        (referrers_ids[1], 2, 2),
+    ]
+
+
+async def test_rebuild_referrers_leaderboard_renames_key(redis_cluster_client: RedisCluster) -> None:
+    """пересчитанный рейтинг заменяет прежний командой rename в слоте рейтинга."""
+    outdated_referrer_id, referrer_id, top_referrer_id = uuid4(), uuid4(), uuid4()
+    await increment_referrer_rank(outdated_referrer_id, redis_cluster_client)
+
+    referrers_count = await rebuild_referrers_leaderboard(
+        FakeDatabaseSession([(referrer_id, 2), (top_referrer_id, 5), (uuid4(), 1)]),
+        redis_cluster_client,
+        batch_size=2,
+    )
+
+    assert referrers_count == 3
+    assert await redis_cluster_client.zcard(REFERRERS_LEADERBOARD_KEY) == 3
+    assert await redis_cluster_client.zscore(REFERRERS_LEADERBOARD_KEY, str(outdated_referrer_id)) is None
+    assert (await get_referrer_rank(top_referrer_id, redis_cluster_client)).rank == 1
+    assert (await get_referrer_rank(referrer_id, redis_cluster_client)).rank == 2
+
+    assert await rebuild_referrers_leaderboard(FakeDatabaseSession(), redis_cluster_client, batch_size=2) == 0
+    assert not await redis_cluster_client.exists(REFERRERS_LEADERBOARD_KEY)
+
+
+async def test_remove_stale_referral_codes_from_all_nodes(redis_cluster_client: RedisCluster) -> None:
+    """коды, которых нет среди активных в базе данных, удаляются с каждого узла кластера."""
+    await redis_cluster_client.mset_nonatomic({referrer_key(email): f"code{index}" for index, email in enumerate(EMAILS)})
+    active_emails, replaced_emails = EMAILS[::2], EMAILS[1::4]
+
+    removed_codes_count = await remove_stale_referral_codes_from_cache(
+        FakeDatabaseSession(
+            [
+                *((email, f"code{EMAILS.index(email)}") for email in active_emails),
+                *((email, "replaced") for email in replaced_emails),
+            ],
+        ),
+        redis_cluster_client,
+        batch_size=10,
+    )
+
+    assert removed_codes_count == len(EMAILS) - len(active_emails)
+    assert await get_referral_codes_by_emails(EMAILS, FakeDatabaseSession(), redis_cluster_client) == [
+        f"code{index}" if email in active_emails else None for index, email in enumerate(EMAILS)
+    ]
+
+
+async def test_migrate_keys_between_nodes(redis_cluster_client: RedisCluster) -> None:
+    """ключи прежней раскладки переносятся на узлы своих шардов с оставшимся временем жизни."""
+    tokens = [f"token{index}" for index in range(len(EMAILS))]
+    users_ids = [uuid4() for _ in range(8)]
+    await redis_cluster_client.mset_nonatomic(
+        {
+            **{f"referrer:{email}": f"code{index}" for index, email in enumerate(EMAILS)},
+            **{f"revoked:bearer jwt {token}": 1 for token in tokens},
+            **{f"user:{user_id}:referrals_version": "version" for user_id in users_ids},
+            referrals_version_key(users_ids[0]): "version",
+        },
+    )
+    await redis_cluster_client.expire(f"referrer:{EMAILS[0]}", timedelta(hours=1))
+    # код, записанный приложением в новой раскладке до переноса, не перезаписывается
+    await redis_cluster_client.set(referrer_key(EMAILS[1]), "new")
+
+    for keep_old_keys in (True, False):
+        moved_keys_counts = [
+            await migrate_keys(redis_cluster_client, pattern, target_key, batch_size=10, keep_old_keys=keep_old_keys)
+            for pattern, target_key in MOVED_KEYS_LAYOUTS.items()
+        ]
+
+        assert moved_keys_counts == ([len(EMAILS) - 1, len(tokens)] if keep_old_keys else [0, 0])
+
+    assert await redis_cluster_client.mget_nonatomic([referrer_key(email) for email in EMAILS]) == [
+        b"code0",
+        b"new",
+        *(f"code{index}".encode() for index in range(2, len(EMAILS))),
+    ]
+    assert 0 < await redis_cluster_client.ttl(referrer_key(EMAILS[0])) <= timedelta(hours=1).total_seconds()
+    assert await get_tokens_revocation(tokens, redis_cluster_client) == [True] * len(tokens)
+    assert [key async for key in redis_cluster_client.scan_iter(match="referrer:user*")] == []
+    assert [key async for key in redis_cluster_client.scan_iter(match="revoked:bearer*")] == []
+
+    assert await remove_outdated_referrals_versions(redis_cluster_client, batch_size=3) == len(users_ids)
+    assert await remove_outdated_referrals_versions(redis_cluster_client, batch_size=3) == 0
+    assert await redis_cluster_client.get(referrals_version_key(users_ids[0])) == b"version"
+
+
+async def test_referrals_events_survive_node_failure(
+    redis_cluster: list[RedisServer],
+    redis_cluster_client: RedisCluster,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """после отказа узла, к которому подключена подписка, события публикуются и читаются через другие узлы."""
+    monkeypatch.setattr(
+        referrals_events,
+        "redis_circuit_breaker",
+        CircuitBreaker(
+            name="redis_test",
+            failure_threshold=100,
+            recovery_timedelta=timedelta(seconds=1),
+            half_open_max_calls=1,
+            call_timeout=1.0,
+            failure_exceptions=(OSError,),
+        ),
+    )
+    await redis_cluster_client.ping()
+    pubsub_redis = create_redis_pubsub_client(redis_cluster_client)
+    hub = ReferralsEventsHub(pubsub_redis, queue_size=10)
+    hub.start()
+    referrer_id = uuid4()
+    referral = UserView(
+        id=uuid4(),
+        email="referral@example.com",
+        referral_code=None,
+        referrer_id=referrer_id,
+        verification_status=UserVerificationStatus.VERIFIED,
+    )
+
+    async def publish_until_received(queue: asyncio.Queue[bytes]) -> UUID:
+        deadline = time.monotonic() + 20.0
+
+        while time.monotonic() < deadline:
+            await hub.publish(referrer_id, referral)
+
+            try:
+                return UserView.model_validate_json(await asyncio.wait_for(queue.get(), 0.5)).id
+
+            except TimeoutError:
+                continue
+
+        message = "referral registration event is not received"
+        raise TimeoutError(message)
+
+    try:
+        async with hub.subscribe(referrer_id) as queue:
+            assert await publish_until_received(queue) == referral.id
+
+            subscribed_port = hub._pubsub.connection.port  # noqa: SLF001
+            next(node for node in redis_cluster if node.port == subscribed_port).stop()
+
+            assert await publish_until_received(queue) == referral.id
+            assert hub._pubsub.connection.port != subscribed_port  # noqa: SLF001
+
+    finally:
+        await hub.stop()
+        await pubsub_redis.aclose()
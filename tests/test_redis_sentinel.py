@@ -0,0 +1,80 @@
+"""тесты работы с redis в режиме sentinel.
+
+клиент, созданный так же, как приложение в режиме sentinel, подключается к ведущему узлу, адрес которого сообщает
+локальный sentinel, и после переключения ведущего узла продолжает работу с новым.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+import pytest
+from redis.asyncio.client import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ReadOnlyError
+
+from app.core.config import RedisMode, settings
+from app.core.redis import create_redis_client
+from tests.redis_servers import RedisServer
+
+pytestmark = pytest.mark.anyio
+
+MASTER_NAME = "mymaster"
+
+
+@pytest.fixture
+async def redis_sentinel_client(
+    redis_sentinel: tuple[list[RedisServer], RedisServer],
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[Redis]:
+    """создает клиент ведущего узла так же, как приложение в режиме sentinel.
+
+    Yields:
+        Redis: клиент ведущего узла
+
+    """
+    _, sentinel = redis_sentinel
+    monkeypatch.setattr(settings, "REDIS_MODE", RedisMode.SENTINEL)
+    monkeypatch.setattr(settings, "REDIS_SENTINELS", [sentinel.address])
+    monkeypatch.setattr(settings, "REDIS_SENTINEL_MASTER_NAME", MASTER_NAME)
+    redis = create_redis_client()
+
+    yield redis
+
+    await redis.aclose()
+
+
+async def test_reconnects_to_new_master_after_failover(
+    redis_sentinel: tuple[list[RedisServer], RedisServer],
+    redis_sentinel_client: Redis,
+) -> None:
+    """после переключения ведущего узла запись и чтение выполняются на бывшей реплике."""
+    (master, replica), sentinel = redis_sentinel
+
+    await redis_sentinel_client.set("key", "before failover")
+
+    assert await redis_sentinel_client.get("key") == b"before failover"
+    assert redis_sentinel_client.connection_pool.master_address[1] == master.port
+
+    sentinel.client().execute_command("SENTINEL", "FAILOVER", MASTER_NAME)
+
+    deadline = time.monotonic() + 30.0
+
+    while True:
+        try:
+            await redis_sentinel_client.set("key", "after failover")
+            master_port = redis_sentinel_client.connection_pool.master_address[1]
+
+            if master_port == replica.port:
+                break
+
+        except (RedisConnectionError, ReadOnlyError):
+            pass
+
+        assert time.monotonic() < deadline, "client has not switched to the new master"
+        await asyncio.sleep(0.1)
+
+    assert await redis_sentinel_client.get("key") == b"after failover"
+    assert replica.client().get("key") == b"after failover"
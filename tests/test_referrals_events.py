@@ -0,0 +1,162 @@
+"""тесты потока событий о новых рефералах.
+
+раздача событий работает через локальный redis-server: событие, опубликованное в канал реферера,
+приходит в поток server-sent events подписчика, а при отсутствии событий поток отправляет комментарий.
+после отключения клиента и после закрытия раздачи в redis не остается подписок на канал.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from redis.asyncio import Redis
+from starlette.types import Message
+
+from app.api.routes import user as user_routes
+from app.core.config import settings
+from app.core.redis import referrals_events_channel
+from app.core.referrals_events import ReferralsEventsHub
+from app.core.security import TokenType
+from app.models.jwt import JWTPayload
+from app.models.user import UserVerificationStatus, UserView
+from tests.redis_servers import start_redis_server
+
+pytestmark = pytest.mark.anyio
+
+USER_AGENT = "test-client"
+
+
+@pytest.fixture
+async def redis(redis_server_path: str, tmp_path: Path) -> AsyncIterator[Redis]:
+    """запускает redis-server и создает его клиент.
+
+    Yields:
+        Redis: клиент redis
+
+    """
+    server = start_redis_server(redis_server_path, tmp_path)
+    redis = Redis(port=server.port)
+
+    yield redis
+
+    await redis.aclose()
+    server.stop()
+
+
+@pytest.fixture
+async def referrals_events_hub(redis: Redis, monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[ReferralsEventsHub]:
+    """запускает раздачу событий на redis теста и подставляет ее в маршруты пользователя.
+
+    Yields:
+        ReferralsEventsHub: раздача событий
+
+    """
+    referrals_events_hub = ReferralsEventsHub(redis, settings.REFERRALS_EVENTS_QUEUE_SIZE)
+    referrals_events_hub.start()
+    monkeypatch.setattr(user_routes, "referrals_events_hub", referrals_events_hub)
+
+    yield referrals_events_hub
+
+    referrals_events_hub.close()
+    await referrals_events_hub.stop()
+
+
+def create_token_payload(user_id: str) -> JWTPayload:
+    """создает поля токена доступа, который истечет через минуту.
+
+    Args:
+        user_id (str): идентификатор пользователя
+
+    Returns:
+        JWTPayload: поля токена
+
+    """
+    issued_at = int(time.time())
+
+    return JWTPayload(
+        iss=settings.JWT_ISSUER,
+        sub=user_id,
+        iat=issued_at,
+        exp=issued_at + 60,
+        token_type=TokenType.ACCESS,
+        token_subject=user_id,
+        token_expiration="",
+        token_subject_user_agent=USER_AGENT,
+    )
+
+
+async def count_channel_subscribers(redis: Redis, user_id: str) -> int:
+    """возвращает количество подписок redis на канал событий пользователя.
+
+    Args:
+        redis (Redis): клиент redis
+        user_id (str): идентификатор пользователя
+
+    Returns:
+        int: количество подписок
+
+    """
+    [(_, subscribers_count)] = await redis.pubsub_numsub(referrals_events_channel(user_id))
+
+    return subscribers_count
+
+
+async def test_stream_emits_referral_and_heartbeat(
+    redis: Redis,
+    referrals_events_hub: ReferralsEventsHub,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """опубликованная регистрация приходит событием referral, а без событий поток отправляет комментарий."""
+    monkeypatch.setattr(settings, "REFERRALS_EVENTS_HEARTBEAT_INTERVAL", 0.2)
+    user_id = str(uuid4())
+    referral = UserView(
+        id=uuid4(),
+        email="referral@example.com",
+        referral_code=None,
+        referrer_id=user_id,
+        verification_status=UserVerificationStatus.VERIFIED,
+    )
+    frames: asyncio.Queue[str] = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive() -> Message:
+        await disconnected.wait()
+
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body" and message.get("body"):
+            await frames.put(message["body"].decode())
+
+    response = await user_routes.get_user_referrals_events(create_token_payload(user_id))
+    streaming = asyncio.create_task(response({"type": "http"}, receive, send))
+
+    assert (await asyncio.wait_for(frames.get(), 5.0)).startswith("retry: ")
+    assert await count_channel_subscribers(redis, user_id) == 1
+
+    await referrals_events_hub.publish(referral.referrer_id, referral)
+
+    assert await asyncio.wait_for(frames.get(), 5.0) == f"event: referral\ndata: {referral.model_dump_json()}\n\n"
+    assert await asyncio.wait_for(frames.get(), 5.0) == ": heartbeat\n\n"
+
+    disconnected.set()
+    await asyncio.wait_for(streaming, 5.0)
+
+    assert await count_channel_subscribers(redis, user_id) == 0
+
+
+async def test_subscribe_after_close_does_not_subscribe(redis: Redis, referrals_events_hub: ReferralsEventsHub) -> None:
+    """после закрытия раздачи подписка получает завершенную очередь и не подписывается на канал."""
+    user_id = str(uuid4())
+    referrals_events_hub.close()
+
+    async with referrals_events_hub.subscribe(user_id) as referrals_events:
+        with pytest.raises(asyncio.QueueShutDown):
+            referrals_events.get_nowait()
+
+        assert await count_channel_subscribers(redis, user_id) == 0
@@ -0,0 +1,77 @@
+"""проверка запуска и мягкой остановки production-сервера.
+
+python -m app.core.server запускается отдельным процессом с одним воркером на свободном порту:
+сервер должен начать отвечать на /health/live, а по SIGTERM - завершить lifespan воркера и выйти с кодом 0.
+redis запускается локально, а база данных не нужна: прогрев без нее повторяется в фоне.
+
+copyright (c) 2025 vladislav mikhalev, all rights reserved.
+"""
+
+import os
+import signal
+import subprocess  # noqa: S404
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import status
+
+from tests.redis_servers import SERVER_START_TIMEOUT, find_free_port, start_redis_server
+
+PROJECT_DIRECTORY = Path(__file__).parent.parent
+SERVER_STOP_TIMEOUT = 20.0
+
+
+def test_server_starts_and_drains_on_sigterm(redis_server_path: str, tmp_path: Path) -> None:
+    """сервер отвечает на пробу живости и по SIGTERM завершается без ошибок."""
+    redis_server = start_redis_server(redis_server_path, tmp_path)
+    port = find_free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.core.server"],
+        cwd=PROJECT_DIRECTORY,
+        env={
+            **os.environ,
+            "REDIS_HOST": "127.0.0.1",
+            "REDIS_PORT": str(redis_server.port),
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(port),
+            "SERVER_WORKERS": "1",
+            "SERVER_DRAIN_TIMEOUT": "2",
+            "SERVER_SHUTDOWN_TIMEOUT": "5",
+        },
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT * 3
+
+        while True:
+            assert process.poll() is None, process.stdout.read().decode()
+            assert time.monotonic() < deadline, "server has not started"
+
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/health/live", timeout=1.0)
+
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+                continue
+
+            assert response.status_code == status.HTTP_200_OK
+
+            break
+
+        process.send_signal(signal.SIGTERM)
+        output, _ = process.communicate(timeout=SERVER_STOP_TIMEOUT)
+
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+        redis_server.stop()
+
+    assert process.returncode == 0, output.decode()
+    assert b"Application shutdown complete" in output, output.decode()